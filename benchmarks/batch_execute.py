@@ -0,0 +1,55 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare separate JSON Execute requests with one batch Execute request.
+
+Both run a process adding two literal inputs for each input set, through
+the test client of the WSGI application, with a SQLite logging database.
+
+Usage: ``python benchmarks/batch_execute.py [number of input sets]``
+"""
+
+import sys
+import tempfile
+import time
+
+from pywps import LiteralInput, LiteralOutput, Process, Service, configuration
+from pywps.tests import client_for
+
+
+def handler(request, response):
+    response.outputs['sum'].data = request.inputs['a'][0].data + request.inputs['b'][0].data
+    return response
+
+
+def main(n_sets=500):
+    with tempfile.TemporaryDirectory() as path:
+        configuration.load_hardcoded_configuration()
+        configuration.CONFIG.set('server', 'workdir', path)
+        configuration.CONFIG.set('server', 'outputpath', path)
+        configuration.CONFIG.set('logging', 'level', 'ERROR')
+        configuration.CONFIG.set('logging', 'database', 'sqlite:///{}/log.sqlite3'.format(path))
+        process = Process(handler, 'sum', 'Sum',
+                          inputs=[LiteralInput('a', 'A', data_type='integer'),
+                                  LiteralInput('b', 'B', data_type='integer')],
+                          outputs=[LiteralOutput('sum', 'Sum', data_type='integer')])
+        client = client_for(Service(processes=[process]))
+        request = {'identifier': 'sum', 'version': '1.0.0', 'operation': 'execute', 'inputs': {'b': 1}}
+
+        start = time.perf_counter()
+        for i in range(n_sets):
+            client.post_json(doc=dict(request, inputs={'a': i, 'b': 1}))
+        separate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.post_json(doc=dict(request, batch=[{'a': i} for i in range(n_sets)]))
+        batch = time.perf_counter() - start
+
+    for name, seconds in (('separate', separate), ('batch', batch)):
+        print('{:>8}: {:8.3f} s, {:8.0f} input sets per second'.format(name, seconds, n_sets / seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
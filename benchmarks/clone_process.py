@@ -0,0 +1,73 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the per request cost of copying a process for execution.
+
+``deepcopy`` is what :meth:`pywps.Service.prepare_process_for_execution`
+used to do, ``clone`` is the copy-on-write execution context.
+
+Usage: ``python benchmarks/clone_process.py [number of inputs]``
+"""
+
+import copy
+import sys
+import timeit
+
+from pywps import (
+    FORMATS,
+    BoundingBoxInput,
+    ComplexInput,
+    ComplexOutput,
+    LiteralInput,
+    LiteralOutput,
+    Process,
+)
+from pywps.app.Common import Metadata
+
+
+def build_process(n_inputs):
+    inputs = []
+    for i in range(n_inputs):
+        translations = {"fr-CA": {"title": "Entrée {}".format(i)}}
+        metadata = [Metadata('metadata {}'.format(i), 'http://example.org/{}'.format(i))]
+        if i % 3 == 0:
+            inpt = LiteralInput('literal_{}'.format(i), 'Literal', data_type='float',
+                                allowed_values=[1, 2, 3], min_occurs=0, default=1,
+                                metadata=metadata, translations=translations)
+        elif i % 3 == 1:
+            inpt = ComplexInput('complex_{}'.format(i), 'Complex',
+                                supported_formats=[FORMATS.GML, FORMATS.GEOJSON, FORMATS.NETCDF],
+                                metadata=metadata, translations=translations)
+        else:
+            inpt = BoundingBoxInput('bbox_{}'.format(i), 'BBox', crss=['epsg:4326', 'epsg:3035'],
+                                    metadata=metadata, translations=translations)
+        inputs.append(inpt)
+    outputs = [
+        LiteralOutput('literal', 'Literal', data_type='string'),
+        ComplexOutput('complex', 'Complex', supported_formats=[FORMATS.GML, FORMATS.GEOJSON]),
+    ]
+    return Process(lambda request, response: response, 'bench', 'Benchmark',
+                   inputs=inputs, outputs=outputs)
+
+
+def deepcopy_request(process):
+    process = copy.deepcopy(process)
+    return [copy.deepcopy(inpt) for inpt in process.inputs]
+
+
+def clone_request(process):
+    process = process.clone()
+    return [inpt.clone() for inpt in process.inputs]
+
+
+def main(n_inputs=50, number=200):
+    process = build_process(n_inputs)
+    for name, func in (('deepcopy', deepcopy_request), ('clone', clone_request)):
+        seconds = min(timeit.repeat(lambda: func(process), number=number, repeat=3))
+        print('{:>8}: {:8.3f} ms per request ({} inputs)'.format(name, seconds / number * 1000, n_inputs))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,56 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the peak memory of Execute responses with large inline outputs,
+built in memory or rendered while they are sent (``stream_execute_response``).
+
+Usage: ``python benchmarks/execute_streaming.py [size of each output in MB]``
+"""
+
+import sys
+import tempfile
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+from pywps import FORMATS, ComplexOutput, Process, Service, configuration
+
+OUTPUTS = 4
+
+
+def main(size=10):
+    text = 'line of text\n' * (size * 1024 * 1024 // 13)
+
+    def handler(request, response):
+        for i in range(OUTPUTS):
+            response.outputs['text{}'.format(i)].data = text
+        return response
+
+    process = Process(handler, 'text', 'Text',
+                      outputs=[ComplexOutput('text{}'.format(i), 'Text', supported_formats=[FORMATS.TEXT])
+                               for i in range(OUTPUTS)])
+    service = Service(processes=[process])
+    with tempfile.TemporaryDirectory() as path:
+        configuration.load_hardcoded_configuration()
+        configuration.CONFIG.set('server', 'workdir', path)
+        configuration.CONFIG.set('server', 'outputpath', path)
+        configuration.CONFIG.set('logging', 'level', 'ERROR')
+        configuration.CONFIG.set('logging', 'database', 'sqlite:///{}/log.sqlite3'.format(path))
+        configuration.CONFIG.set('server', 'compression_codings', '')
+        for stream in ('false', 'true'):
+            configuration.CONFIG.set('server', 'stream_execute_response', stream)
+            environ = EnvironBuilder('?service=wps&version=1.0.0&request=execute&identifier=text').get_environ()
+            tracemalloc.start()
+            app_iter = service(environ, lambda status, headers: None)
+            sent = sum(len(chunk) for chunk in app_iter)
+            app_iter.close()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('{:>10}: {:8.1f} MB sent, {:8.1f} MB peak'.format(
+                'streamed' if stream == 'true' else 'built', sent / 2 ** 20, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
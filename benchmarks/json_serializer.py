@@ -0,0 +1,35 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the JSON serializers on a document with a NumPy array.
+
+``ArrayEncoder`` is the :class:`json.JSONEncoder` the responses used to be
+serialized with, the others are the serializers of :mod:`pywps.serializer`.
+
+Usage: ``python benchmarks/json_serializer.py [number of values]``
+"""
+
+import json
+import sys
+import timeit
+
+import numpy
+
+from pywps.inout.array_encode import ArrayEncoder
+from pywps.serializer import SERIALIZERS
+
+
+def main(size=1000000):
+    doc = {'identifier': 'array', 'data': numpy.random.default_rng(0).random(size)}
+    funcs = {'ArrayEncoder': lambda: json.dumps(doc, cls=ArrayEncoder)}
+    for name, serializer in SERIALIZERS.items():
+        funcs[name] = lambda serializer=serializer: serializer.dumps(doc)
+    for name, func in funcs.items():
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        print('{:>12}: {:8.1f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
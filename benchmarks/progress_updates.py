@@ -0,0 +1,55 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the time a process reporting its progress in a loop takes with
+every update written from the thread of the process
+(``status_update_interval = 0``) and with coalesced updates written in the
+background.
+
+The process is executed synchronously, through the test client of the
+WSGI application, with a SQLite logging database.
+
+Usage: ``python benchmarks/progress_updates.py [number of updates]``
+"""
+
+import sys
+import tempfile
+import time
+
+from pywps import LiteralOutput, Process, Service, configuration, status_writer
+from pywps.tests import client_for
+
+
+def main(n_updates=2000):
+    def handler(request, response):
+        for i in range(n_updates):
+            response.update_status('Step {}'.format(i), 100 * i // n_updates)
+        response.outputs['steps'].data = n_updates
+        return response
+
+    with tempfile.TemporaryDirectory() as path:
+        configuration.load_hardcoded_configuration()
+        configuration.CONFIG.set('server', 'workdir', path)
+        configuration.CONFIG.set('server', 'outputpath', path)
+        configuration.CONFIG.set('logging', 'level', 'ERROR')
+        configuration.CONFIG.set('logging', 'database', 'sqlite:///{}/log.sqlite3'.format(path))
+        process = Process(handler, 'progress', 'Progress',
+                          outputs=[LiteralOutput('steps', 'Steps', data_type='integer')],
+                          store_supported=True, status_supported=True)
+        client = client_for(Service(processes=[process]))
+        url = '?service=wps&version=1.0.0&request=execute&identifier=progress'
+
+        for interval in ('0', '0.5'):
+            configuration.CONFIG.set('server', 'status_update_interval', interval)
+            start = time.perf_counter()
+            client.get(url)
+            seconds = time.perf_counter() - start
+            status_writer.join()
+            print('interval {:>4} s: {:8.3f} s, {:8.0f} updates per second'.format(
+                interval, seconds, n_updates / seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,46 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the size and the time of DescribeProcess ``all`` responses with
+the content codings of the responses.
+
+Usage: ``python benchmarks/response_compression.py [number of processes]``
+"""
+
+import sys
+import time
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from pywps import LiteralInput, LiteralOutput, Process, Service, configuration
+from pywps.compression import COMPRESSORS
+
+
+def handler(request, response):
+    return response
+
+
+def main(n_processes=100):
+    configuration.load_hardcoded_configuration()
+    configuration.CONFIG.set('logging', 'level', 'ERROR')
+    processes = [Process(handler, 'process{}'.format(i), 'Process {}'.format(i), abstract='Process number {}'.format(i),
+                         inputs=[LiteralInput('input{}'.format(j), 'Input', data_type='string') for j in range(10)],
+                         outputs=[LiteralOutput('output{}'.format(j), 'Output', data_type='string') for j in range(10)])
+                 for i in range(n_processes)]
+    client = Client(Service(processes=processes), Response)
+    url = '?service=wps&version=1.0.0&request=describeprocess&identifier=all'
+    client.get(url)
+
+    for coding in ['identity'] + sorted(COMPRESSORS):
+        start = time.perf_counter()
+        for _ in range(10):
+            size = len(client.get(url, headers={'Accept-Encoding': coding}).data)
+        seconds = (time.perf_counter() - start) / 10
+        print('{:>8}: {:10d} bytes, {:8.2f} ms'.format(coding, size, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
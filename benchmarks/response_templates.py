@@ -0,0 +1,67 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the cost of getting the response templates.
+
+``per response`` builds a Jinja environment for each response, like
+:class:`pywps.response.basic.WPSResponse` used to do, ``shared`` uses
+:func:`pywps.response.get_template_env`. ``cold`` compiles all the
+templates in a new interpreter, without and with the bytecode cache.
+
+Usage: ``python benchmarks/response_templates.py [number of responses]``
+"""
+
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from jinja2 import PackageLoader
+
+from pywps.response import RelEnvironment, get_template_env
+
+TEMPLATES = ['1.0.0/execute/main.xml', '1.0.0/describe/main.xml', '1.0.0/capabilities/main.xml']
+
+COLD = '''
+import time
+from pywps import configuration
+from pywps.response import precompile_templates
+configuration.load_hardcoded_configuration()
+configuration.CONFIG.set('server', 'template_cache_path', {path!r})
+start = time.perf_counter()
+precompile_templates()
+print(time.perf_counter() - start)
+'''
+
+
+def per_response():
+    template_env = RelEnvironment(loader=PackageLoader('pywps', 'templates'),
+                                  trim_blocks=True, lstrip_blocks=True, autoescape=True)
+    for name in TEMPLATES:
+        template_env.get_template(name)
+
+
+def shared():
+    template_env = get_template_env()
+    for name in TEMPLATES:
+        template_env.get_template(name)
+
+
+def cold(path):
+    output = subprocess.run([sys.executable, '-c', COLD.format(path=path)], check=True, capture_output=True, text=True)
+    return float(output.stdout.split()[-1])
+
+
+def main(number=50):
+    for name, func in (('per response', per_response), ('shared', shared)):
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print('{:>12}: {:8.3f} ms per response'.format(name, seconds / number * 1000))
+    with tempfile.TemporaryDirectory() as path:
+        first, cached = cold(path), cold(path)
+    print('{:>12}: {:8.3f} s compiling, {:8.3f} s from the bytecode cache'.format('cold', first, cached))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
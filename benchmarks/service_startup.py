@@ -0,0 +1,78 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the start up time of a service with eager and lazy processes.
+
+Process modules are generated in a temporary directory, importing each of
+them costs ``import_ms`` milliseconds to mimic heavy scientific imports.
+``eager`` builds every process like ``Service(processes=[...])`` used to
+require, ``lazy`` registers :class:`pywps.LazyProcess` objects. Each
+variant runs in a fresh interpreter.
+
+Usage: ``python benchmarks/service_startup.py [number of processes] [import_ms]``
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULE = '''
+import time
+time.sleep({import_seconds})
+
+from pywps import LiteralInput, LiteralOutput, Process
+
+
+class Bench{index}(Process):
+    def __init__(self):
+        super().__init__(self._handler, identifier='bench_{index}', title='Benchmark {index}',
+                         inputs=[LiteralInput('value', 'Value', data_type='float')],
+                         outputs=[LiteralOutput('result', 'Result', data_type='float')])
+
+    @staticmethod
+    def _handler(request, response):
+        response.outputs['result'].data = request.inputs['value'][0].data
+        return response
+'''
+
+EAGER = '''
+import importlib
+from pywps import Service
+processes = [getattr(importlib.import_module('bench_{{}}'.format(i)), 'Bench{{}}'.format(i))()
+             for i in range({n_processes})]
+Service(processes=processes)
+'''
+
+LAZY = '''
+from pywps import LazyProcess, Service
+Service(processes=[LazyProcess('bench_{{}}'.format(i), 'bench_{{0}}:Bench{{0}}'.format(i))
+                   for i in range({n_processes})])
+'''
+
+
+def run(script, path):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([path, os.getcwd(), os.environ.get('PYTHONPATH', '')]))
+    # import pywps first, its import time is the same in both cases
+    script = 'import pywps, time\nstart = time.perf_counter()\n{}\nprint(time.perf_counter() - start)'.format(script)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout.split()[-1]), time.perf_counter() - start
+
+
+def main(n_processes=300, import_ms=20):
+    with tempfile.TemporaryDirectory() as path:
+        for index in range(n_processes):
+            with open(os.path.join(path, 'bench_{}.py'.format(index)), 'w') as f:
+                f.write(MODULE.format(index=index, import_seconds=import_ms / 1000.))
+        for name, script in (('eager', EAGER), ('lazy', LAZY)):
+            service, total = run(script.format(n_processes=n_processes), path)
+            print('{:>5}: {:8.3f} s to build the service, {:8.3f} s interpreter total ({} processes)'.format(
+                name, service, total, n_processes))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
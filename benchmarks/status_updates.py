@@ -0,0 +1,54 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the cost of rendering the status document of a running process.
+
+``full`` renders the whole ``execute/main.xml`` template for each update,
+like :class:`pywps.response.execute.ExecuteResponse` used to do,
+``incremental`` renders only the status, after the first update.
+
+Usage: ``python benchmarks/status_updates.py [number of updates]``
+"""
+
+import sys
+import timeit
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from pywps import LiteralInput, LiteralOutput, Process, configuration
+from pywps.app.WPSRequest import WPSRequest
+from pywps.response.execute import ExecuteResponse
+from pywps.response.status import WPS_STATUS
+
+
+def handler(request, response):
+    return response
+
+
+def main(number=1000):
+    configuration.load_hardcoded_configuration()
+    process = Process(handler, 'process', 'Process',
+                      inputs=[LiteralInput('input{}'.format(i), 'Input', data_type='string') for i in range(20)],
+                      outputs=[LiteralOutput('output{}'.format(i), 'Output', data_type='string') for i in range(20)])
+    process._set_uuid('benchmark')
+    wps_request = WPSRequest()
+    wps_request.http_request = Request(EnvironBuilder(headers={'Accept': 'text/xml'}).get_environ())
+    wps_request.language = 'en-US'
+    wps_request.version = '1.0.0'
+    response = ExecuteResponse(wps_request, uuid='benchmark', process=process)
+    response.status = WPS_STATUS.STARTED
+    template = response.template_env.get_template('1.0.0/execute/main.xml')
+
+    def full():
+        template.render(**response.json)
+
+    for name, func in (('full', full), ('incremental', response._construct_doc)):
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print('{:>12}: {:8.3f} ms per update'.format(name, seconds / number * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,62 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""Compare the parsing of Execute requests with string and compiled xpath expressions.
+
+``string`` evaluates each expression with ``element.xpath()``, like
+:func:`pywps.app.basic.get_xpath_ns` used to do, ``compiled`` uses the
+cached :class:`lxml.etree.XPath` objects. The request has literal, complex
+and reference inputs.
+
+Usage: ``python benchmarks/xpath_parsing.py [number of inputs]``
+"""
+
+import sys
+import timeit
+from unittest import mock
+
+from pywps import namespaces100
+from pywps import xml_util as etree
+from pywps.app.WPSRequest import get_inputs_from_xml, get_output_from_xml
+
+INPUTS = [
+    '<wps:Input><ows:Identifier>literal_{i}</ows:Identifier>'
+    '<wps:Data><wps:LiteralData>{i}</wps:LiteralData></wps:Data></wps:Input>',
+    '<wps:Input><ows:Identifier>complex_{i}</ows:Identifier>'
+    '<wps:Data><wps:ComplexData mimeType="text/plain">value {i}</wps:ComplexData></wps:Data></wps:Input>',
+    '<wps:Input><ows:Identifier>reference_{i}</ows:Identifier>'
+    '<wps:Reference xlink:href="http://example.org/{i}.txt"/></wps:Input>',
+]
+
+REQUEST = '''<wps:Execute service="WPS" version="1.0.0" xmlns:wps="http://www.opengis.net/wps/1.0.0"
+ xmlns:ows="http://www.opengis.net/ows/1.1" xmlns:xlink="http://www.w3.org/1999/xlink">
+<ows:Identifier>bench</ows:Identifier><wps:DataInputs>{inputs}</wps:DataInputs>
+<wps:ResponseForm><wps:ResponseDocument><wps:Output><ows:Identifier>output</ows:Identifier></wps:Output>
+</wps:ResponseDocument></wps:ResponseForm></wps:Execute>'''
+
+
+def string_xpath_ns(version):
+    def xpath_ns(ele, path):
+        return ele.xpath(path, namespaces=namespaces100)
+    return xpath_ns
+
+
+def parse(doc):
+    get_inputs_from_xml(doc)
+    get_output_from_xml(doc)
+
+
+def main(n_inputs=300, number=20):
+    inputs = ''.join(INPUTS[i % len(INPUTS)].format(i=i) for i in range(n_inputs))
+    doc = etree.fromstring(REQUEST.format(inputs=inputs))
+    with mock.patch('pywps.app.WPSRequest.get_xpath_ns', string_xpath_ns):
+        string = min(timeit.repeat(lambda: parse(doc), number=number, repeat=3))
+    compiled = min(timeit.repeat(lambda: parse(doc), number=number, repeat=3))
+    for name, seconds in (('string', string), ('compiled', compiled)):
+        print('{:>8}: {:8.3f} ms per request ({} inputs)'.format(name, seconds / number * 1000, n_inputs))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
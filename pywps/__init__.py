@@ -87,7 +87,7 @@ OGCUNIT = {
     'feet': 'urn:ogc:def:uom:OGC:1.0:feet'
 }
 
-from pywps.app import Process, Service, WPSRequest
+from pywps.app import LazyProcess, Process, Service, WPSRequest
 from pywps.app.WPSRequest import get_inputs_from_xml, get_output_from_xml
 from pywps.inout import UOM
 from pywps.inout.formats import FORMATS, Format, get_format
@@ -3,16 +3,19 @@
 # licensed under MIT, Please consult LICENSE.txt for details     #
 ##################################################################
 
+import copy
 import importlib
+import inspect
 import json
 import logging
 import os
-import shutil
 import sys
 import traceback
+import types
+import uuid
 
 import pywps.configuration as config
-from pywps import dblog
+from pywps import dblog, grass_pool, janitor, metrics, result_cache
 from pywps.app.exceptions import ProcessError
 from pywps.app.WPSRequest import WPSRequest
 from pywps.exceptions import (
@@ -23,6 +26,7 @@ from pywps.exceptions import (
     StorageNotSupported,
 )
 from pywps.inout.outputs import ComplexOutput
+from pywps.inout.prefetch import Prefetcher, iter_inputs
 from pywps.inout.storage.builder import StorageBuilder
 from pywps.response import get_response
 from pywps.response.execute import ExecuteResponse
@@ -55,11 +59,15 @@ class Process(object):
     :param dict[str,dict[str,str]] translations: The first key is the RFC 4646 language code,
         and the nested mapping contains translated strings accessible by a string property.
         e.g. {"fr-CA": {"title": "Mon titre", "abstract": "Une description"}}
+    :param bool cacheable: The process is deterministic, the result of a request is reused
+        for the same requests, see :mod:`pywps.result_cache`.
+    :param int cache_ttl: Number of seconds a cached result is reused, without limit by default.
     """
 
     def __init__(self, handler, identifier, title, abstract='', keywords=None, profile=None,
                  metadata=None, inputs=None, outputs=None, version='None', store_supported=False,
-                 status_supported=False, grass_location=None, translations=None):
+                 status_supported=False, grass_location=None, translations=None, cacheable=False,
+                 cache_ttl=None):
         self.identifier = identifier
         self.handler = handler
         self.title = title
@@ -74,11 +82,16 @@ class Process(object):
         self._status_store = None
         # self.status_location = ''
         # self.status_url = ''
-        self.workdir = None
+        self._workdir = None
+        self._workdir_created = False
         self._grass_mapset = None
         self.grass_location = grass_location
         self.service = None
         self.translations = lower_case_dict(translations)
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        # hash of the request being executed, for the result cache
+        self.cache_key = None
 
         if store_supported:
             self.store_supported = 'true'
@@ -124,6 +137,24 @@ class Process(object):
         new_process.set_workdir(value['workdir'])
         return new_process
 
+    def clone(self):
+        """Create copy of yourself for a single execution
+
+        The process definition (title, metadata, translations, ...) and the
+        IO definitions are shared with the original, only the per-execution
+        state (uuid, workdir, inputs and outputs, status store) is copied.
+        """
+        process = copy.copy(self)
+        process.inputs = [inpt.clone() for inpt in self.inputs]
+        process.outputs = [outpt.clone() for outpt in self.outputs]
+        process._status_store = None
+        process._grass_mapset = None
+        process.cache_key = None
+        # a handler defined as method of the process must see the copy
+        if inspect.ismethod(self.handler) and self.handler.__self__ is self:
+            process.handler = types.MethodType(self.handler.__func__, process)
+        return process
+
     def execute(self, wps_request, uuid):
         self._set_uuid(uuid)
         self._setup_status_storage()
@@ -249,59 +280,79 @@ class Process(object):
         LOGGER.debug("Started processing request: {} with pid: {}".format(self.uuid, os.getpid()))
         # Update the actual pid of current process to check if failed latter
         dblog.update_pid(self.uuid, os.getpid())
+        labels = metrics.set_labels('execute', self.identifier)
         try:
-            self._set_grass(wps_request)
-            # if required set HOME to the current working directory.
-            if config.get_config_value('server', 'sethomedir') is True:
-                os.environ['HOME'] = self.workdir
-                LOGGER.info('Setting HOME to current working directory: {}'.format(os.environ['HOME']))
-            LOGGER.debug('ProcessID={}, HOME={}'.format(self.uuid, os.environ.get('HOME')))
-            wps_response._update_status(WPS_STATUS.STARTED, 'PyWPS Process started', 0)
-            self.handler(wps_request, wps_response)  # the user must update the wps_response.
-            # Ensure process termination
-            if wps_response.status != WPS_STATUS.SUCCEEDED and wps_response.status != WPS_STATUS.FAILED:
-                # if (not wps_response.status_percentage) or (wps_response.status_percentage != 100):
-                LOGGER.debug('Updating process status to 100% if everything went correctly')
-                wps_response._update_status(WPS_STATUS.SUCCEEDED, f'PyWPS Process {self.title} finished', 100)
+            self._setup_environment(wps_request)
+            self._run_handler(wps_request, wps_response)
+            if self.cache_key is not None and wps_response.status == WPS_STATUS.SUCCEEDED:
+                result_cache.store(self, wps_response)
         except Exception as e:
-            traceback.print_exc()
-            LOGGER.debug('Retrieving file and line number where exception occurred')
-            exc_type, exc_obj, exc_tb = sys.exc_info()
-            found = False
-            while not found:
-                # search for the _handler method
-                m_name = exc_tb.tb_frame.f_code.co_name
-                if m_name == '_handler':
-                    found = True
-                else:
-                    if exc_tb.tb_next is not None:
-                        exc_tb = exc_tb.tb_next
-                    else:
-                        # if not found then take the first
-                        exc_tb = sys.exc_info()[2]
-                        break
-            fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-            method_name = exc_tb.tb_frame.f_code.co_name
-
-            # update the process status to display process failed
-
-            msg = 'Process error: method={}.{}, line={}, msg={}'.format(fname, method_name, exc_tb.tb_lineno, e)
-            LOGGER.error(msg)
-            # In case of a ProcessError use the validated exception message.
-            if isinstance(e, ProcessError):
-                msg = "Process error: {}".format(e)
-            # Only in debug mode we use the log message including the traceback ...
-            elif config.get_config_value("logging", "level") != "DEBUG":
-                # ... otherwise we use a sparse common error message.
-                msg = 'Process failed, please check server error log'
-            wps_response._update_status(WPS_STATUS.FAILED, msg, 100)
+            self._report_failure(wps_response, e)
 
         finally:
             # The run of the next pending request if finished here, weather or not it successful
             self.launch_next_process()
+            metrics.reset_labels(labels)
+            metrics.flush()
 
         return wps_response
 
+    def _setup_environment(self, wps_request):
+        """Set up GRASS GIS and the HOME directory before the handler runs."""
+        self._set_grass(wps_request)
+        # if required set HOME to the current working directory.
+        if config.get_config_value('server', 'sethomedir') is True:
+            os.environ['HOME'] = self.workdir
+            LOGGER.info('Setting HOME to current working directory: {}'.format(os.environ['HOME']))
+        LOGGER.debug('ProcessID={}, HOME={}'.format(self.uuid, os.environ.get('HOME')))
+
+    def _run_handler(self, wps_request, wps_response):
+        """Run the handler, the response is succeeded afterwards unless the handler failed it."""
+        wps_response._update_status(WPS_STATUS.STARTED, 'PyWPS Process started', 0)
+        with metrics.timer('handler'), Prefetcher.from_config() as prefetcher:
+            # the references are downloaded concurrently, while the handler runs
+            prefetcher.fetch(iter_inputs(wps_request.inputs))
+            self.handler(wps_request, wps_response)  # the user must update the wps_response.
+        # Ensure process termination
+        if wps_response.status != WPS_STATUS.SUCCEEDED and wps_response.status != WPS_STATUS.FAILED:
+            # if (not wps_response.status_percentage) or (wps_response.status_percentage != 100):
+            LOGGER.debug('Updating process status to 100% if everything went correctly')
+            wps_response._update_status(WPS_STATUS.SUCCEEDED, f'PyWPS Process {self.title} finished', 100)
+
+    def _report_failure(self, wps_response, e):
+        """Fail the response with the exception `e` being handled."""
+        traceback.print_exc()
+        LOGGER.debug('Retrieving file and line number where exception occurred')
+        exc_type, exc_obj, exc_tb = sys.exc_info()
+        found = False
+        while not found:
+            # search for the _handler method
+            m_name = exc_tb.tb_frame.f_code.co_name
+            if m_name == '_handler':
+                found = True
+            else:
+                if exc_tb.tb_next is not None:
+                    exc_tb = exc_tb.tb_next
+                else:
+                    # if not found then take the first
+                    exc_tb = sys.exc_info()[2]
+                    break
+        fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
+        method_name = exc_tb.tb_frame.f_code.co_name
+
+        # update the process status to display process failed
+
+        msg = 'Process error: method={}.{}, line={}, msg={}'.format(fname, method_name, exc_tb.tb_lineno, e)
+        LOGGER.error(msg)
+        # In case of a ProcessError use the validated exception message.
+        if isinstance(e, ProcessError):
+            msg = "Process error: {}".format(e)
+        # Only in debug mode we use the log message including the traceback ...
+        elif config.get_config_value("logging", "level") != "DEBUG":
+            # ... otherwise we use a sparse common error message.
+            msg = 'Process failed, please check server error log'
+        wps_response._update_status(WPS_STATUS.FAILED, msg, 100)
+
     def launch_next_process(self):
         """Look at the queue of async process, if the queue is not empty launch the next pending request.
         """
@@ -319,7 +370,7 @@ class Process(object):
             new_wps_request = WPSRequest()
             new_wps_request.json = json.loads(request_json)
             process_identifier = new_wps_request.identifier
-            process = self.service.prepare_process_for_execution(process_identifier)
+            process = self.service.prepare_process_for_execution(process_identifier, new_wps_request.workdir)
             process._set_uuid(uuid)
             process._setup_status_storage()
             process.async_ = True
@@ -334,17 +385,28 @@ class Process(object):
         """Clean the process working dir and other temporary files
         """
         if config.get_config_value('server', 'cleantempdir'):
-            LOGGER.info("Removing temporary working directory: {}".format(self.workdir))
-            try:
-                if os.path.isdir(self.workdir):
-                    shutil.rmtree(self.workdir)
-                if self._grass_mapset and os.path.isdir(self._grass_mapset):
-                    LOGGER.info("Removing temporary GRASS GIS mapset: {}".format(self._grass_mapset))
-                    shutil.rmtree(self._grass_mapset)
-            except Exception as err:
-                LOGGER.error('Unable to remove directory: {}'.format(err))
+            # removed in the background, not to delay the final status update
+            LOGGER.info("Removing temporary working directory: {}".format(self._workdir))
+            janitor.remove(self._workdir)
+            if self._grass_mapset:
+                LOGGER.info("Removing temporary GRASS GIS mapset: {}".format(self._grass_mapset))
+                grass_pool.release_mapset(self._grass_mapset)
         else:
-            LOGGER.warning('Temporary working directory is not removed: {}'.format(self.workdir))
+            LOGGER.warning('Temporary working directory is not removed: {}'.format(self._workdir))
+
+    @property
+    def workdir(self):
+        """Working directory of the process, created on first access."""
+        if self._workdir is not None and not self._workdir_created:
+            # private, like the directories of tempfile.mkdtemp
+            os.makedirs(self._workdir, mode=0o700, exist_ok=True)
+            self._workdir_created = True
+        return self._workdir
+
+    @workdir.setter
+    def workdir(self, workdir):
+        self._workdir = workdir
+        self._workdir_created = False
 
     def set_workdir(self, workdir):
         """Set working dir for all inputs and outputs
@@ -366,91 +428,61 @@ class Process(object):
 
         In the first case, new temporary mapset within the location will be created.
 
-        In the second case, location will be created in self.workdir.
+        In the second case, the location is created once in the ``locations_path`` of
+        the ``grass`` configuration and new temporary mapset within it will be created.
+
+        In the third case, location will be created in self.workdir.
 
         The mapset should be deleted automatically using self.clean() method
         """
         if self.grass_location:
 
-            import random
-            import string
-
-            from grass.script import core as grass
-            from grass.script import setup as gsetup
-
             # HOME needs to be set - and that is usually not the case for httpd server
             os.environ['HOME'] = self.workdir
 
-            # GISRC envvariable needs to be set
-            gisrc = open(os.path.join(self.workdir, 'GISRC'), 'w')
-            gisrc.write("GISDBASE: {}\n".format(self.workdir))
-            gisrc.write("GUI: txt\n")
-            gisrc.close()
-            os.environ['GISRC'] = gisrc.name
-
-            new_loc_args = dict()
-            mapset_name = 'pywps_ms_{}'.format(
-                ''.join(random.sample(string.ascii_letters, 5)))
-
             if self.grass_location.startswith('complexinput:'):
+                from grass.script import core as grass
+                from grass.script import setup as gsetup
+
                 # create new location from a georeferenced file
                 ref_file_parameter = self.grass_location.split(':')[1]
                 ref_file = wps_request.inputs[ref_file_parameter][0].file
-                new_loc_args.update({'filename': ref_file})
-            elif self.grass_location.lower().startswith('epsg:'):
-                # create new location from epsg code
-                epsg = self.grass_location.lower().replace('epsg:', '')
-                new_loc_args.update({'epsg': epsg})
 
-            if new_loc_args:
                 dbase = self.workdir
-                location = str()
-                while os.path.isdir(os.path.join(dbase, location)):
-                    location = 'pywps_loc_{}'.format(
-                        ''.join(random.sample(string.ascii_letters, 5)))
-
+                location = 'pywps_loc_{}'.format(uuid.uuid4().hex)
                 gsetup.init(os.environ['GISBASE'], dbase,
                             location, 'PERMANENT')
-
                 grass.create_location(dbase=dbase,
                                       location=location,
-                                      **new_loc_args)
-                LOGGER.debug('GRASS location based on {} created'.format(
-                    list(new_loc_args.keys())[0]))
-                grass.run_command('g.mapset',
-                                  mapset=mapset_name,
-                                  flags='c',
-                                  dbase=dbase,
-                                  location=location,
-                                  quiet=True)
+                                      filename=ref_file)
+                LOGGER.debug('GRASS location based on filename created')
+                location_path = os.path.join(dbase, location)
+                # the location is used once, a pool of mapsets would be wasted
+                pooled = False
+
+            elif self.grass_location.lower().startswith('epsg:'):
+                # shared location created once from epsg code
+                epsg = self.grass_location.lower().replace('epsg:', '')
+                location_path = grass_pool.epsg_location(epsg)
+                pooled = True
 
             # create temporary mapset within existing location
             elif os.path.isdir(self.grass_location):
-                from grass.pygrass.gis import make_mapset
-
-                LOGGER.debug('Temporary mapset will be created')
-
-                dbase = os.path.dirname(self.grass_location)
-                location = os.path.basename(self.grass_location)
-
-                grass.run_command('g.gisenv', set="GISDBASE={}".format(dbase))
-                grass.run_command('g.gisenv', set="LOCATION_NAME=%s" % location)
-
-                while os.path.isdir(os.path.join(dbase, location, mapset_name)):
-                    mapset_name = 'pywps_ms_{}'.format(
-                        ''.join(random.sample(string.ascii_letters, 5)))
-                make_mapset(mapset=mapset_name, location=location,
-                            gisdbase=dbase)
-                grass.run_command('g.gisenv', set="MAPSET=%s" % mapset_name)
+                location_path = os.path.abspath(self.grass_location)
+                pooled = True
 
             else:
-                # FIXME: This will fail as location is not set.
                 raise NoApplicableCode('Location does exists or does not seem '
                                        'to be in "EPSG:XXXX" form nor is it existing directory: '
-                                       '{}'.format(location))
+                                       '{}'.format(self.grass_location))
 
             # set _grass_mapset attribute - will be deleted once handler ends
-            self._grass_mapset = mapset_name
+            self._grass_mapset = grass_pool.lease_mapset(location_path, pooled)
+
+            dbase, location = os.path.split(location_path)
+            mapset_name = os.path.basename(self._grass_mapset)
+            # GISRC envvariable needs to be set
+            grass_pool.write_gisrc(self.workdir, dbase, location, mapset_name)
 
             # final initialization
             LOGGER.debug('GRASS Mapset set to {}'.format(mapset_name))
@@ -458,7 +490,7 @@ class Process(object):
             LOGGER.debug('GRASS environment initialised')
             LOGGER.debug('GISRC {}, GISBASE {}, GISDBASE {}, LOCATION {}, MAPSET {}'.format(
                          os.environ.get('GISRC'), os.environ.get('GISBASE'),
-                         dbase, location, os.path.basename(mapset_name)))
+                         dbase, location, mapset_name))
 
     def setup_outputs_from_wps_request(self, wps_request):
         # set as_reference to True for all the outputs specified as reference
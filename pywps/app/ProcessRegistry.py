@@ -0,0 +1,124 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import importlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+LOGGER = logging.getLogger("PYWPS")
+
+
+class LazyProcess(object):
+    """Placeholder of a process, which is imported when it is needed the first time.
+
+    >>> process = LazyProcess('say_hello', 'processes.sayhello:SayHello')
+    >>> process.identifier
+    'say_hello'
+
+    :param identifier: identifier of the process
+    :param import_path: ``module:name`` of the :class:`~Process` subclass,
+                        of a function returning the process or of the
+                        process instance
+    :param description: optional description of the process, as given by
+                        :attr:`Process.json`, used for GetCapabilities
+                        responses so that the process needs not be
+                        imported for them
+    """
+
+    def __init__(self, identifier, import_path, description=None):
+        self.identifier = identifier
+        self.import_path = import_path
+        self.description = description
+        self._process = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """Whether the process has been imported."""
+        return self._process is not None
+
+    def load(self):
+        """Import and instantiate the process, once.
+
+        :returns: the :class:`~Process`
+        """
+        if self._process is None:
+            with self._lock:
+                if self._process is None:
+                    LOGGER.debug('Importing process {} from {}'.format(self.identifier, self.import_path))
+                    module, name = self.import_path.split(':')
+                    obj = getattr(importlib.import_module(module), name)
+                    process = obj() if callable(obj) else obj
+                    if process.identifier != self.identifier:
+                        raise ValueError('Process imported from {} has identifier {}, expected {}'.format(
+                            self.import_path, process.identifier, self.identifier))
+                    self._process = process
+        return self._process
+
+    @property
+    def json(self):
+        """Description of the process, the process is imported unless a description was given."""
+        if self.description is not None:
+            return self.description
+        return self.load().json
+
+    def __repr__(self):
+        return 'LazyProcess({!r}, {!r})'.format(self.identifier, self.import_path)
+
+
+class ProcessRegistry(MutableMapping):
+    """Processes of a service by identifier.
+
+    Processes registered as :class:`LazyProcess` are imported when they are
+    accessed the first time, so the values are always :class:`~Process`
+    instances.
+
+    :param processes: :class:`~Process` or :class:`LazyProcess` objects
+    """
+
+    def __init__(self, processes=()):
+        self._processes = OrderedDict()
+        for process in processes:
+            self[process.identifier] = process
+
+    def __getitem__(self, identifier):
+        process = self._processes[identifier]
+        if isinstance(process, LazyProcess):
+            return process.load()
+        return process
+
+    def __setitem__(self, identifier, process):
+        self._processes[identifier] = process
+
+    def __delitem__(self, identifier):
+        del self._processes[identifier]
+
+    def __contains__(self, identifier):
+        return identifier in self._processes
+
+    def __iter__(self):
+        return iter(self._processes)
+
+    def __len__(self):
+        return len(self._processes)
+
+    def entries(self):
+        """Registered :class:`~Process` and :class:`LazyProcess` objects by identifier, without importing."""
+        return list(self._processes.items())
+
+    def loaded(self, identifier):
+        """Whether the process `identifier` is imported, it can then be accessed without importing it."""
+        process = self._processes[identifier]
+        return not isinstance(process, LazyProcess) or process.loaded
+
+    def description(self, identifier):
+        """Description of a process, as given by :attr:`Process.json`.
+
+        A lazy process is not imported if it was registered with a
+        description.
+        """
+        return self._processes[identifier].json
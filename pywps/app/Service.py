@@ -3,31 +3,46 @@
 # licensed under MIT, Please consult LICENSE.txt for details     #
 ##################################################################
 
+import asyncio
+import configparser
 import copy
+import datetime
+import hashlib
+import io
+import json
 import logging
 import os
 import sys
 import tempfile
+import time
 import uuid
-from collections import OrderedDict, deque
+from collections import deque
 from typing import Dict, Optional, Sequence
 from urllib.parse import urlparse
 
 from werkzeug.exceptions import HTTPException
-from werkzeug.wrappers import Request
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+from werkzeug.wrappers import Request, Response
 
 import pywps.configuration as config
-from pywps import response
+from pywps import __version__, dblog, grass_pool, janitor, metrics, response, result_cache
+from pywps.app.basic import get_response_type, make_response
+from pywps.app.ProcessRegistry import LazyProcess, ProcessRegistry
 from pywps.app.WPSRequest import WPSRequest
+from pywps.compression import CHUNK_SIZE, compress_response
 from pywps.dblog import log_request, store_status
 from pywps.exceptions import (
+    FileSizeExceeded,
     FileURLNotSupported,
     InvalidParameterValue,
     MissingParameterValue,
     NoApplicableCode,
+    ServerBusy,
 )
 from pywps.inout.inputs import BoundingBoxInput, ComplexInput, LiteralInput
+from pywps.inout.prefetch import Prefetcher, iter_inputs
 from pywps.response.status import WPS_STATUS
+from pywps.validator.mode import MODE
 
 LOGGER = logging.getLogger("PYWPS")
 
@@ -35,18 +50,22 @@ LOGGER = logging.getLogger("PYWPS")
 class Service(object):
     """The top-level object that represents a WPS service.
 
-    A WSGI application.
+    A WSGI application, :meth:`asgi` serves it as an ASGI application.
 
     :param processes: A list of :class:`~Process` objects that are
-                      provided by this service.
+                      provided by this service. :class:`~LazyProcess`
+                      objects are imported on first use.
 
     :param cfgfiles: A list of configuration files
     """
 
     def __init__(self, processes: Sequence = [], cfgfiles=None, preprocessors: Optional[Dict] = None):
-        # ordered dict of processes
-        self.processes = OrderedDict((p.identifier, p) for p in processes)
+        # processes by identifier, lazy processes are imported on first use
+        self.processes = ProcessRegistry(processes)
         self.preprocessors = preprocessors or dict()
+        # rendered responses, see _get_cache
+        self._cache = {}
+        self._cache_token = None
 
         if cfgfiles:
             config.load_configuration(cfgfiles)
@@ -61,16 +80,55 @@ class Service(object):
             if not LOGGER.handlers:
                 LOGGER.addHandler(logging.NullHandler())
 
+        response.precompile_templates()
+
+    def _get_cache(self, name):
+        """Get the cache of rendered documents for the operation ``name``.
+
+        All caches are emptied when the list of processes or the
+        configuration has changed since they were filled.
+        """
+        token = (
+            config.get_config_generation(),
+            tuple((identifier, id(process)) for identifier, process in self.processes.entries()),
+        )
+        if token != self._cache_token:
+            self._cache = {}
+            self._cache_token = token
+        return self._cache.setdefault(name, {})
+
+    def _get_validators(self, wps_request):
+        """Get the ETag and Last-Modified validators of a GetCapabilities
+        or DescribeProcess response.
+
+        The response only depends on the processes, the configuration and
+        the request parameters, so the validators are known before the
+        response is built. The Last-Modified date is the one of the newest
+        configuration file or process module, the same in every worker.
+        """
+        cache = self._get_cache('validators')
+        if 'registry' not in cache:
+            cache['registry'] = _registry_hash(self.processes)
+            cache['last_modified'] = _registry_mtime(self.processes)
+
+        _, mimetype = get_response_type(
+            wps_request.http_request.accept_mimetypes, wps_request.default_mimetype)
+        parts = [cache['registry'], wps_request.operation, wps_request.version, wps_request.language,
+                 mimetype, ','.join(wps_request.identifiers or [])]
+        etag = hashlib.sha1('\n'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return etag, cache['last_modified']
+
     def get_capabilities(self, wps_request, uuid):
 
         response_cls = response.get_response("capabilities")
-        return response_cls(wps_request, uuid, version=wps_request.version, processes=self.processes)
+        return response_cls(wps_request, uuid, version=wps_request.version, processes=self.processes,
+                            cache=self._get_cache('capabilities'))
 
     def describe(self, wps_request, uuid, identifiers):
 
         response_cls = response.get_response("describe")
         return response_cls(wps_request, uuid, processes=self.processes,
-                            identifiers=identifiers)
+                            identifiers=identifiers, cache=self._get_cache('describe'))
 
     def execute(self, identifier, wps_request, uuid):
         """Parse and perform Execute WPS request call
@@ -80,31 +138,107 @@ class Service(object):
         :param uuid: string identifier of the request
         """
         self._set_grass()
-        process = self.prepare_process_for_execution(identifier)
-        return self._parse_and_execute(process, wps_request, uuid)
+        workdir = getattr(wps_request, 'workdir', None)
+        try:
+            process = self.prepare_process_for_execution(identifier, workdir)
+            if getattr(wps_request, 'batch', None) is not None:
+                return self._execute_batch(process, wps_request, uuid)
+            return self._parse_and_execute(process, wps_request, uuid)
+        except Exception:
+            # the process did not start, its spooled inputs are not needed anymore
+            janitor.remove(workdir)
+            raise
 
-    def prepare_process_for_execution(self, identifier):
+    def prepare_process_for_execution(self, identifier, workdir=None):
         """Prepare the process identified by ``identifier`` for execution.
+
+        :param workdir: working directory of the request, holding its spooled inputs,
+                        a new one is acquired by default
         """
         try:
             process = self.processes[identifier]
         except KeyError:
             raise InvalidParameterValue("Unknown process '{}'".format(identifier), 'Identifier')
-        # make deep copy of the process instance
+        # make a copy of the process instance
         # so that processes are not overriding each other
         # just for execute
-        process = copy.deepcopy(process)
+        process = process.clone()
         process.service = self
-        workdir = os.path.abspath(config.get_config_value('server', 'workdir'))
-        tempdir = tempfile.mkdtemp(prefix='pywps_process_', dir=workdir)
-        process.set_workdir(tempdir)
+        if workdir is None:
+            workdir = janitor.acquire_workdir(os.path.abspath(config.get_config_value('server', 'workdir')))
+        process.set_workdir(workdir)
         return process
 
     def _parse_and_execute(self, process, wps_request, uuid):
         """Parse and execute request
         """
 
+        self._setup_inputs(process, wps_request)
+
+        process.setup_outputs_from_wps_request(wps_request)
+
+        cached = result_cache.lookup(process, wps_request)
+        if cached is not None:
+            doc, content_type = cached
+            store_status(uuid, WPS_STATUS.SUCCEEDED, 'PyWPS Process result taken from the cache', 100)
+            process.clean()
+            return compress_response(Response(doc, mimetype=content_type), wps_request.http_request)
+
+        wps_response = process.execute(wps_request, uuid)
+        return wps_response
+
+    def _execute_batch(self, process, wps_request, uuid):
+        """Execute the process once per input set of a batch Execute request
+
+        The process is prepared and the request logged once, each input set
+        runs synchronously on a copy of the process, in a subdirectory of the
+        working directory of the request. Failures are reported per input
+        set, in the aggregated response.
+        """
+        try:
+            maxparallel = int(config.get_config_value('server', 'parallelprocesses'))
+            running, _ = dblog.get_process_counts()
+            if running >= maxparallel != -1:
+                raise ServerBusy('Maximum number of parallel running processes reached. Please try later.')
+
+            process._set_uuid(uuid)
+            batch_response = response.get_response('batch')(wps_request, uuid, process=process)
+            # running, like a single execution, until the aggregated response is generated
+            batch_response._update_status(WPS_STATUS.STARTED, 'PyWPS Process started', 0)
+            LOGGER.info('Executing process {} for {} input sets'.format(process.identifier, len(wps_request.batch)))
+            for index, inputs in enumerate(wps_request.batch):
+                item_request = copy.copy(wps_request)
+                item_request.batch = None
+                item_request.inputs = inputs
+                item_process = process.clone()
+                item_process.set_workdir(os.path.join(process.workdir, 'item_{}'.format(index)))
+                item_response = batch_response.add_item(item_request, item_process)
+                try:
+                    self._setup_inputs(item_process, item_request)
+                    item_process.setup_outputs_from_wps_request(item_request)
+                except NoApplicableCode as e:
+                    item_response.fail(e)
+                except HTTPException as e:
+                    item_response.fail(NoApplicableCode(e.description, code=e.code))
+                except Exception:
+                    LOGGER.exception('Input set {} of the batch failed'.format(index))
+                    item_response.fail(NoApplicableCode('No applicable error code, please check error log.', code=500))
+                else:
+                    try:
+                        item_process._setup_environment(item_request)
+                        item_process._run_handler(item_request, item_response)
+                    except Exception as e:
+                        item_process._report_failure(item_response, e)
+            batch_response.get_response_doc()
+            return batch_response
+        finally:
+            process.clean()
+
+    def _setup_inputs(self, process, wps_request):
+        """Replace the inputs of `wps_request` with inputs of `process` holding the request values."""
+
         LOGGER.debug('Checking if all mandatory inputs have been passed')
+        prefetcher = Prefetcher.from_config()
         data_inputs = {}
         for inpt in process.inputs:
             # Replace the dicts with the dict of Literal/Complex inputs
@@ -124,7 +258,7 @@ class Service(object):
 
                 if isinstance(inpt, ComplexInput):
                     data_inputs[inpt.identifier] = self.create_complex_inputs(
-                        inpt, request_inputs)
+                        inpt, request_inputs, validate=not prefetcher.enabled)
                 elif isinstance(inpt, LiteralInput):
                     data_inputs[inpt.identifier] = self.create_literal_inputs(
                         inpt, request_inputs)
@@ -140,19 +274,25 @@ class Service(object):
                     raise MissingParameterValue(
                         inpt.identifier, inpt.identifier)
 
-        wps_request.inputs = data_inputs
-
-        process.setup_outputs_from_wps_request(wps_request)
+        if prefetcher.enabled:
+            # validation reads the references, download them all at once
+            unvalidated = [inpt for inpt in iter_inputs(data_inputs)
+                           if isinstance(inpt, ComplexInput) and not inpt.data_set]
+            with prefetcher:
+                prefetcher.fetch(inpt for inpt in unvalidated if inpt.valid_mode != MODE.NONE)
+                for inpt in unvalidated:
+                    inpt._check_valid()
 
-        wps_response = process.execute(wps_request, uuid)
-        return wps_response
+        wps_request.inputs = data_inputs
 
-    def create_complex_inputs(self, source, inputs):
+    @metrics.timed('fetch_inputs')
+    def create_complex_inputs(self, source, inputs, validate=True):
         """Create new ComplexInput as clone of original ComplexInput
         because of inputs can be more than one, take it just as Prototype.
 
         :param source: The process's input definition.
         :param inputs: The request input data.
+        :param validate: Whether to validate references, see :meth:`ComplexInput.process`.
         :return collections.deque:
         """
 
@@ -175,7 +315,7 @@ class Service(object):
                     'mimeType')
 
             data_input.method = inpt.get('method', 'GET')
-            data_input.process(inpt)
+            data_input.process(inpt, validate=validate)
             outinputs.append(data_input)
 
         if len(outinputs) < source.min_occurs:
@@ -220,26 +360,7 @@ class Service(object):
         """
         gisbase = config.get_config_value('grass', 'gisbase')
         if gisbase and os.path.isdir(gisbase):
-            LOGGER.debug('GRASS GISBASE set to {}'.format(gisbase))
-
-            os.environ['GISBASE'] = gisbase
-
-            os.environ['LD_LIBRARY_PATH'] = '{}:{}'.format(
-                os.environ.get('LD_LIBRARY_PATH'),
-                os.path.join(gisbase, 'lib'))
-            os.putenv('LD_LIBRARY_PATH', os.environ.get('LD_LIBRARY_PATH'))
-
-            os.environ['PATH'] = '{}:{}:{}'.format(
-                os.environ.get('PATH'),
-                os.path.join(gisbase, 'bin'),
-                os.path.join(gisbase, 'scripts'))
-            os.putenv('PATH', os.environ.get('PATH'))
-
-            python_path = os.path.join(gisbase, 'etc', 'python')
-            os.environ['PYTHONPATH'] = '{}:{}'.format(os.environ.get('PYTHONPATH'),
-                                                      python_path)
-            os.putenv('PYTHONPATH', os.environ.get('PYTHONPATH'))
-            sys.path.insert(0, python_path)
+            grass_pool.setup_environment(gisbase)
 
     def create_bbox_inputs(self, source, inputs):
         """ Takes the http_request and parses the input to objects
@@ -267,6 +388,14 @@ class Service(object):
 
     # May not raise exceptions, this function must return a valid werkzeug.wrappers.Response.
     def call(self, http_request):
+        with metrics.labels():
+            try:
+                with metrics.timer('request'):
+                    return self._call(http_request)
+            finally:
+                metrics.flush()
+
+    def _call(self, http_request):
 
         try:
             # This try block handle Exception generated before the request is accepted. Once the request is accepted
@@ -286,20 +415,34 @@ class Service(object):
                 LOGGER.debug('Setting PYWPS_CFG to {}'.format(environ_cfg))
                 os.environ['PYWPS_CFG'] = environ_cfg
 
-            wps_request = WPSRequest(http_request, self.preprocessors)
+            with metrics.timer('parse'):
+                wps_request = WPSRequest(http_request, self.preprocessors)
+                # only known identifiers, the labels must not be chosen by the client
+                identifier = wps_request.identifier if wps_request.identifier in self.processes else None
+                metrics.set_labels(wps_request.operation, identifier)
             LOGGER.info('Request: {}'.format(wps_request.operation))
             if wps_request.operation in ['getcapabilities',
                                          'describeprocess',
                                          'execute']:
+                validators = {}
+                if wps_request.operation in ['getcapabilities', 'describeprocess']:
+                    etag, last_modified = self._get_validators(wps_request)
+                    validators = {'ETag': quote_etag(etag), 'Last-Modified': http_date(last_modified)}
+                    if not is_resource_modified(http_request.environ, etag=etag, last_modified=last_modified):
+                        LOGGER.debug('Request: {} not modified'.format(wps_request.operation))
+                        return Response(status=304, headers=validators)
+
                 log_request(request_uuid, wps_request)
                 try:
                     response = None
                     if wps_request.operation == 'getcapabilities':
                         response = self.get_capabilities(wps_request, request_uuid)
+                        response.headers.update(validators)
                         response._update_status(WPS_STATUS.SUCCEEDED, '', 100)
 
                     elif wps_request.operation == 'describeprocess':
                         response = self.describe(wps_request, request_uuid, wps_request.identifiers)
+                        response.headers.update(validators)
                         response._update_status(WPS_STATUS.SUCCEEDED, '', 100)
 
                     elif wps_request.operation == 'execute':
@@ -329,6 +472,290 @@ class Service(object):
     def __call__(self, http_request):
         return self.call(http_request)
 
+    def _cached_response(self, http_request):
+        """Answer a GET GetCapabilities or DescribeProcess request from what
+        is already computed, without blocking.
+
+        The request is answered when it is not modified or when its document
+        is cached, it is not when its validators, its document or a process
+        still have to be computed or imported, or when it is invalid.
+
+        :returns: None, or the response and the parsed request, which still
+                  has to be logged when it is not a 304 response
+        """
+        if http_request.method != 'GET' or 'PYWPS_CFG' in http_request.environ:
+            return None
+        operation = next((value for key, value in http_request.args.items() if key.lower() == 'request'), '')
+        if operation.lower() not in ('getcapabilities', 'describeprocess') or \
+                'registry' not in self._get_cache('validators'):
+            return None
+        try:
+            wps_request = WPSRequest(http_request, self.preprocessors)
+        except Exception:
+            # reported by the full processing of the request
+            return None
+        metrics.set_labels(wps_request.operation)
+
+        etag, last_modified = self._get_validators(wps_request)
+        validators = {'ETag': quote_etag(etag), 'Last-Modified': http_date(last_modified)}
+        if not is_resource_modified(http_request.environ, etag=etag, last_modified=last_modified):
+            return Response(status=304, headers=validators), None
+
+        _, mimetype = get_response_type(http_request.accept_mimetypes, wps_request.default_mimetype)
+        if wps_request.operation == 'getcapabilities':
+            if (wps_request.version, wps_request.language, mimetype) not in self._get_cache('capabilities'):
+                return None
+            wps_response = self.get_capabilities(wps_request, None)
+        else:
+            identifiers = wps_request.identifiers or []
+            if 'all' in (identifier.lower() for identifier in identifiers):
+                identifiers = list(self.processes)
+            if not identifiers:
+                return None
+            cache = self._get_cache('describe')
+            for identifier in identifiers:
+                # unknown processes are reported, and lazy ones imported, by call
+                if identifier not in self.processes or not self.processes.loaded(identifier):
+                    return None
+                if (identifier, self.processes[identifier].version, wps_request.language, mimetype) not in cache:
+                    return None
+            wps_response = self.describe(wps_request, None, wps_request.identifiers)
+        try:
+            # without the status updates of get_response_doc, done by _log_cached
+            doc, content_type = wps_response._construct_doc()
+        except Exception:
+            return None
+        headers = dict(wps_response.headers, **validators)
+        return make_response(doc, content_type=content_type, headers=headers, http_request=http_request), wps_request
+
+    def _log_cached(self, request_uuid, wps_request):
+        """Log a request answered by :meth:`_cached_response` like :meth:`call` does, it blocks on the database."""
+        if wps_request is not None:
+            log_request(request_uuid, wps_request)
+            store_status(request_uuid, WPS_STATUS.SUCCEEDED, 'Response generated', 100)
+        metrics.flush()
+
+    async def asgi(self, scope, receive, send):
+        """ASGI entry point, adapter of the WSGI :meth:`__call__`.
+
+        GET GetCapabilities and DescribeProcess requests which are not
+        modified or whose document is cached are answered on the event loop,
+        only their logging in the database runs in a thread of the default
+        executor, once the response is sent.
+
+        The other requests are processed by :meth:`call` in a thread of the
+        default executor, as it blocks on the database, storage and process
+        handlers. Only the request and response bodies are transferred on
+        the event loop: the request body is handed to the thread through a
+        bounded queue while it is received, up to ``maxrequestsize``, and the
+        response is iterated in the thread. Serve it with any ASGI server,
+        e.g. ``uvicorn module:service.asgi``.
+        """
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type {}'.format(scope['type']))
+
+        loop = asyncio.get_running_loop()
+        if scope['method'] == 'GET':
+            request_uuid = uuid.uuid1()
+            with metrics.labels():
+                start = time.perf_counter()
+                cached = self._cached_response(Request(_asgi_environ(scope, io.BytesIO())))
+                if cached is not None:
+                    if metrics.is_enabled():
+                        # not timed when the request is processed by call
+                        metrics.observe('request', time.perf_counter() - start)
+                    http_response, wps_request = cached
+                    try:
+                        await _asgi_send(http_response, send)
+                    finally:
+                        await loop.run_in_executor(None, self._log_cached, request_uuid, wps_request)
+                    return
+
+        maxsize = config.get_size_mb(config.get_config_value('server', 'maxrequestsize')) * 1024 * 1024
+        body = _AsgiInput(loop)
+        receiving = asyncio.ensure_future(body.receive(receive, maxsize))
+        try:
+            environ = _asgi_environ(scope, io.BufferedReader(body, CHUNK_SIZE))
+            http_response = await loop.run_in_executor(None, self._asgi_response, environ)
+        finally:
+            # the rest of the body is not read
+            receiving.cancel()
+            await asyncio.gather(receiving, return_exceptions=True)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': http_response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in http_response.headers.items()],
+            })
+            await loop.run_in_executor(None, _asgi_send_body, http_response, send, loop)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            http_response.close()
+
+    def _asgi_response(self, environ):
+        """Run the WSGI pipeline for `environ` and return the werkzeug response."""
+        return Response.from_app(self, environ)
+
+
+def _registry_hash(processes):
+    """Hash the descriptions of the processes and the configuration."""
+    sha = hashlib.sha1(__version__.encode('utf-8'))
+    defaults = config.CONFIG.defaults()
+    for section in config.CONFIG.sections():
+        for option in config.CONFIG.options(section):
+            raw = config.CONFIG.get(section, option, raw=True)
+            if option in defaults and raw == defaults[option]:
+                # the environment, which only matters where it is interpolated
+                continue
+            try:
+                value = config.CONFIG.get(section, option)
+            except configparser.Error:
+                value = raw
+            sha.update('{}:{}={}\n'.format(section, option, value).encode('utf-8'))
+    for identifier, process in processes.entries():
+        if isinstance(process, LazyProcess):
+            # not to import all processes
+            description = [identifier, process.import_path, process.description]
+        else:
+            description = process.json
+        sha.update(json.dumps(description, sort_keys=True, default=str).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _registry_mtime(processes):
+    """Get the modification date of the newest configuration file or module
+    of the loaded processes, PyWPS itself when there is none."""
+    paths = [sys.modules['pywps'].__file__] + config.get_config_files()
+    for _, process in processes.entries():
+        if isinstance(process, LazyProcess):
+            # not to import all processes
+            module = sys.modules.get(process.import_path.split(':')[0])
+        else:
+            module = sys.modules.get(getattr(process.handler, '__module__', None) or type(process).__module__)
+        paths.append(getattr(module, '__file__', None))
+    mtime = max(os.stat(path).st_mtime for path in paths if path and os.path.exists(path))
+    return datetime.datetime.fromtimestamp(int(mtime), datetime.timezone.utc)
+
+
+class _AsgiInput(io.RawIOBase):
+    """Body of an ASGI request, received on the event loop `loop` and read by
+    the thread processing the request.
+
+    At most `maxchunks` received chunks wait to be read, the body is not
+    received faster than it is parsed.
+    """
+
+    def __init__(self, loop, maxchunks=4):
+        self.loop = loop
+        self.chunks = asyncio.Queue(maxchunks)
+        self.chunk = b''
+        self.eof = False
+
+    async def receive(self, receive, maxsize):
+        """Receive the body with the ASGI `receive`, at most `maxsize` bytes.
+
+        A read fails once the body is larger, or if the client disconnected.
+        """
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    await self.chunks.put(OSError('The client disconnected'))
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > maxsize:
+                    await self.chunks.put(FileSizeExceeded(
+                        'File size for input exceeded. Maximum request size allowed: {} megabytes'.format(
+                            maxsize / 1024 / 1024)))
+                    return
+                if chunk:
+                    await self.chunks.put(chunk)
+                if not message.get('more_body', False):
+                    await self.chunks.put(b'')
+                    return
+        except Exception as e:
+            await self.chunks.put(OSError('Receiving the request failed: {}'.format(e)))
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.chunk and not self.eof:
+            chunk = asyncio.run_coroutine_threadsafe(self.chunks.get(), self.loop).result()
+            if isinstance(chunk, Exception):
+                raise chunk
+            self.chunk, self.eof = chunk, not chunk
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+async def _asgi_send(http_response, send):
+    """Send the werkzeug `http_response`, whose body is in memory, with the ASGI `send`."""
+    await send({
+        'type': 'http.response.start',
+        'status': http_response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in http_response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': b''.join(http_response.iter_encoded())})
+
+
+def _asgi_send_body(http_response, send, loop):
+    """Send the body of the werkzeug `http_response`, with the ASGI `send` of
+    the event loop `loop`, while it is iterated in this thread.
+    """
+    for chunk in http_response.iter_encoded():
+        if chunk:
+            message = {'type': 'http.response.body', 'body': chunk, 'more_body': True}
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+
+def _asgi_environ(scope, body):
+    """Translate an ASGI HTTP `scope` and the binary file-like request `body` into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # the body ends with the last message, with or without Content-Length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = 'HTTP_{}'.format(name)
+        environ[key] = '{},{}'.format(environ[key], value) if key in environ else value
+    return environ
+
 
 def _build_input_file_name(href, workdir, extension=None):
     href = href or ''
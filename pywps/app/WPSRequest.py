@@ -4,17 +4,18 @@
 ##################################################################
 
 import base64
-import datetime
 import json
 import logging
+from contextlib import ExitStack
 from urllib.parse import unquote
 
 import lxml
 from werkzeug.exceptions import MethodNotAllowed
 
-from pywps import configuration, get_ElementMakerForVersion, get_version_from_ns
+from pywps import configuration, get_ElementMakerForVersion, get_version_from_ns, serializer
 from pywps import xml_util as etree
 from pywps.app.basic import get_xpath_ns, parse_http_url
+from pywps.compression import request_stream
 from pywps.configuration import wps_strict
 from pywps.exceptions import (
     FileSizeExceeded,
@@ -25,6 +26,15 @@ from pywps.exceptions import (
     VersionNegotiationFailed,
 )
 from pywps.inout.inputs import input_from_json
+from pywps.inout.spool import (
+    CHUNK_SIZE,
+    EXECUTE_INPUT_VALUES,
+    INPUT_VALUES,
+    Spool,
+    SpooledFile,
+    decode_base64,
+    load_json,
+)
 
 LOGGER = logging.getLogger("PYWPS")
 default_version = '1.0.0'
@@ -46,12 +56,15 @@ class WPSRequest(object):
         self.status = None
         self.lineage = None
         self.inputs = {}
+        # input sets of a batch Execute request
+        self.batch = None
         self.output_ids = None
         self.outputs = {}
         self.raw = None
         self.WPS = None
         self.OWS = None
         self.xpath_ns = None
+        self.workdir = None
         self.preprocessors = preprocessors or dict()
         self.preprocess_request = None
         self.preprocess_response = None
@@ -100,61 +113,88 @@ class WPSRequest(object):
         # check if input file size was not exceeded
         maxsize = configuration.get_config_value('server', 'maxrequestsize')
         maxsize = configuration.get_size_mb(maxsize) * 1024 * 1024
-        if self.http_request.content_length > maxsize:
+        if (self.http_request.content_length or 0) > maxsize:
             raise FileSizeExceeded('File size for input exceeded.'
                                    ' Maximum request size allowed: {} megabytes'.format(maxsize / 1024 / 1024))
+        # compressed bodies are limited while they are decompressed
+        stream = request_stream(self.http_request, maxsize)
 
         content_type = self.http_request.content_type or []  # or self.http_request.mimetype
         json_input = 'json' in content_type
-        if not json_input:
-            try:
-                doc = etree.fromstring(self.http_request.get_data())
-            except Exception as e:
-                raise NoApplicableCode(str(e))
-            operation = doc.tag
-            version = get_version_from_ns(doc.nsmap[doc.prefix])
-            self.set_version(version)
+        # large inline inputs are written to the working directory of the request
+        spool = Spool.from_config()
+        try:
+            if not json_input:
+                self._post_xml_request(stream, spool)
+            else:
+                self._post_json_request(stream, spool)
+        except Exception:
+            spool.discard()
+            raise
+        self.workdir = spool.workdir
+
+    def _post_xml_request(self, stream, spool):
+        spooled = {}
+        try:
+            if spool.enabled:
+                doc, spooled = _iterparse(stream, spool)
+            else:
+                doc = etree.fromstring(stream.read())
+        except FileSizeExceeded:
+            raise
+        except Exception as e:
+            raise NoApplicableCode(str(e))
+        operation = doc.tag
+        version = get_version_from_ns(doc.nsmap[doc.prefix])
+        self.set_version(version)
 
-            language = doc.attrib.get('language')
-            self.check_and_set_language(language)
+        language = doc.attrib.get('language')
+        self.check_and_set_language(language)
 
-            request_parser = self._post_request_parser(operation)
-            request_parser(doc)
-        else:
-            try:
-                jdoc = json.loads(self.http_request.get_data())
-            except Exception as e:
-                raise NoApplicableCode(str(e))
-            if self.identifier is not None:
-                jdoc = {'inputs': jdoc}
+        request_parser = self._post_request_parser(operation)
+        request_parser(doc, spooled)
+
+    def _post_json_request(self, stream, spool):
+        try:
+            if spool.enabled:
+                # the document holds only the inputs when the process is in the URL
+                jdoc = load_json(stream, spool, INPUT_VALUES if self.identifier is not None else EXECUTE_INPUT_VALUES)
             else:
-                self.identifier = jdoc.get('identifier', None)
+                jdoc = json.loads(stream.read())
+        except FileSizeExceeded:
+            raise
+        except Exception as e:
+            raise NoApplicableCode(str(e))
+        if self.identifier is not None:
+            jdoc = {'inputs': jdoc}
+        else:
+            self.identifier = jdoc.get('identifier', None)
 
-            self.operation = jdoc.get('operation', self.operation)
+        self.operation = jdoc.get('operation', self.operation)
 
-            preprocessor_tuple = self.preprocessors.get(self.identifier, None)
-            if preprocessor_tuple:
-                self.identifier = preprocessor_tuple[0]
-                self.preprocess_request = preprocessor_tuple[1]
-                self.preprocess_response = preprocessor_tuple[2]
+        preprocessor_tuple = self.preprocessors.get(self.identifier, None)
+        if preprocessor_tuple:
+            self.identifier = preprocessor_tuple[0]
+            self.preprocess_request = preprocessor_tuple[1]
+            self.preprocess_response = preprocessor_tuple[2]
 
-            jdoc['operation'] = self.operation
-            jdoc['identifier'] = self.identifier
-            jdoc['api'] = self.api
-            jdoc['default_mimetype'] = self.default_mimetype
+        jdoc['operation'] = self.operation
+        jdoc['identifier'] = self.identifier
+        jdoc['api'] = self.api
+        jdoc['default_mimetype'] = self.default_mimetype
 
-            if self.preprocess_request is not None:
-                jdoc = self.preprocess_request(jdoc, http_request=self.http_request)
-            self.json = jdoc
+        if self.preprocess_request is not None:
+            jdoc = self.preprocess_request(jdoc, http_request=self.http_request)
+        self.json = jdoc
 
-            version = jdoc.get('version')
-            self.set_version(version)
+        version = jdoc.get('version')
+        self.set_version(version)
 
-            language = jdoc.get('language')
-            self.check_and_set_language(language)
+        language = jdoc.get('language')
+        self.check_and_set_language(language)
 
-            request_parser = self._post_json_request_parser()
-            request_parser(jdoc)
+        request_parser = self._post_json_request_parser()
+        request_parser(jdoc)
 
     def _get_request_parser(self, operation):
         """Factory function returning proper parsing function."""
@@ -238,7 +278,7 @@ class WPSRequest(object):
 
         wpsrequest = self
 
-        def parse_post_getcapabilities(doc):
+        def parse_post_getcapabilities(doc, spooled):
             """Parse POST GetCapabilities request
             """
             acceptedversions = self.xpath_ns(
@@ -247,7 +287,7 @@ class WPSRequest(object):
                 [v.text for v in acceptedversions])
             wpsrequest.check_accepted_versions(acceptedversions)
 
-        def parse_post_describeprocess(doc):
+        def parse_post_describeprocess(doc, spooled):
             """Parse POST DescribeProcess request."""
 
             version = doc.attrib.get('version')
@@ -257,7 +297,7 @@ class WPSRequest(object):
             wpsrequest.identifiers = [identifier_el.text for identifier_el in
                                       self.xpath_ns(doc, './ows:Identifier')]
 
-        def parse_post_execute(doc):
+        def parse_post_execute(doc, spooled):
             """Parse POST Execute request."""
             version = doc.attrib.get('version')
             wpsrequest.check_and_set_version(version)
@@ -274,7 +314,7 @@ class WPSRequest(object):
             wpsrequest.lineage = 'false'
             wpsrequest.store_execute = 'false'
             wpsrequest.status = 'false'
-            wpsrequest.inputs = get_inputs_from_xml(doc)
+            wpsrequest.inputs = get_inputs_from_xml(doc, spooled)
             wpsrequest.outputs = get_output_from_xml(doc)
             wpsrequest.raw = False
             if self.xpath_ns(doc, '/wps:Execute/wps:ResponseForm/wps:RawDataOutput'):
@@ -350,6 +390,17 @@ class WPSRequest(object):
                 # executeResponse XML will not be stored
                 wpsrequest.store_execute = 'false'
 
+            batch = jdoc.get('batch')
+            if batch is not None:
+                if wpsrequest.raw:
+                    raise InvalidParameterValue('Raw outputs are not supported by batch requests', 'raw')
+                if not isinstance(batch, list) or not all(isinstance(inputs, dict) for inputs in batch):
+                    raise InvalidParameterValue('The batch must be a list of input sets', 'batch')
+                # the inputs of the request are shared by the input sets, they are parsed once,
+                # a spooled value is decoded in place
+                wpsrequest.batch = [dict(wpsrequest.inputs, **get_inputs_from_json({'inputs': inputs}))
+                                    for inputs in batch]
+
             # todo: parse response_document like in the xml version?
 
         self.operation = 'execute' if self.operation is None else self.operation.lower()
@@ -424,14 +475,6 @@ class WPSRequest(object):
     @property
     def json(self):
         """Return JSON encoded representation of the request."""
-        class ExtendedJSONEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if isinstance(obj, datetime.date) or isinstance(obj, datetime.time):
-                    encoded_object = obj.isoformat()
-                else:
-                    encoded_object = json.JSONEncoder.default(self, obj)
-                return encoded_object
-
         obj = {
             'operation': self.operation,
             'version': self.version,
@@ -445,10 +488,11 @@ class WPSRequest(object):
             'lineage': self.lineage,
             'inputs': dict((i, [inpt.json for inpt in self.inputs[i]]) for i in self.inputs),
             'outputs': self.outputs,
-            'raw': self.raw
+            'raw': self.raw,
+            'workdir': self.workdir
         }
 
-        return json.dumps(obj, allow_nan=False, cls=ExtendedJSONEncoder)
+        return serializer.dumps(obj, allow_nan=False)
 
     @json.setter
     def json(self, value):
@@ -469,6 +513,7 @@ class WPSRequest(object):
         self.lineage = value.get('lineage', False)
         self.outputs = value.get('outputs')
         self.raw = value.get('raw', False)
+        self.workdir = value.get('workdir')
         self.inputs = {}
 
         for identifier in value.get('inputs', []):
@@ -490,7 +535,12 @@ class WPSRequest(object):
                     pass
 
 
-def get_inputs_from_xml(doc):
+def get_inputs_from_xml(doc, spooled=None):
+    """Get the inputs of an Execute request.
+
+    :param doc: root element of the request
+    :param spooled: dict of the spooled file paths by ``wps:ComplexData`` element, see :func:`_iterparse`
+    """
     the_inputs = {}
     version = get_version_from_ns(doc.nsmap[doc.prefix])
     xpath_ns = get_xpath_ns(version)
@@ -524,7 +574,9 @@ def get_inputs_from_xml(doc):
                 'method': complex_data_el.attrib.get('method', 'GET')
             }
 
-            if len(complex_data_el.getchildren()) > 0:
+            if spooled and complex_data_el in spooled:
+                inpt['data'] = spooled[complex_data_el]
+            elif len(complex_data_el.getchildren()) > 0:
                 value_el = complex_data_el[0]
                 inpt['data'] = _get_dataelement_value(value_el)
             else:
@@ -625,7 +677,7 @@ def get_inputs_from_json(jdoc):
             data_type = inpt_def.get('type', 'literal')
             inpt = {'identifier': identifier}
             if data_type == 'literal':
-                inpt['data'] = inpt_def.get('data')
+                inpt['data'] = _get_spooled_literal(inpt_def.get('data'))
                 inpt['uom'] = inpt_def.get('uom', '')
                 inpt['datatype'] = inpt_def.get('datatype', '')
                 the_inputs[identifier].append(inpt)
@@ -634,7 +686,7 @@ def get_inputs_from_json(jdoc):
                 inpt['encoding'] = inpt_def.get('encoding', '').lower()
                 inpt['schema'] = inpt_def.get('schema', '')
                 inpt['method'] = inpt_def.get('method', 'GET')
-                inpt['data'] = _get_rawvalue_value(inpt_def.get('data', ''), inpt['encoding'])
+                inpt['data'] = _get_spooled_value(inpt_def.get('data', ''), inpt['encoding'])
                 the_inputs[identifier].append(inpt)
             elif data_type == 'reference':
                 inpt[identifier] = inpt_def
@@ -723,6 +775,177 @@ def get_data_from_kvp(data, part=None):
     return the_data
 
 
+# maximum depth of the elements of a request, the one of libxml2, which does
+# not check it for parser targets
+MAX_DEPTH = 256
+
+
+class _SpoolingTarget(object):
+    """Parser target building the tree of an XML request, see :func:`_iterparse`.
+
+    :param spool: :class:`pywps.inout.spool.Spool`
+    """
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.builder = etree.TreeBuilder()
+        # dict of the spooled file paths by ComplexData element
+        self.spooled = {}
+        self.depth = 0
+        # ComplexData element being parsed, its depth, and the root element of its content
+        self.complex_data = None
+        self.complex_depth = 0
+        self.root = None
+        # text of the content held until it is spooled, and the size of the content
+        self.text = []
+        self.size = 0
+        # spool file of the content, and the incremental writer of embedded XML
+        self.path = self.spool_file = self.xmlfile = None
+        self.writer = ExitStack()
+
+    def _open_spool(self):
+        if self.spool_file is None:
+            self.path, self.spool_file = self.spool.open()
+        else:
+            # text followed by embedded XML, only the XML is kept
+            self.spool_file.seek(0)
+            self.spool_file.truncate()
+        if self.root is not None:
+            self.xmlfile = self.writer.enter_context(etree.xmlfile(self.spool_file, encoding='utf-8'))
+            self.writer.enter_context(self.xmlfile.element(self.root.tag, self.root.attrib, nsmap=self.root.nsmap))
+            if self.root.text:
+                self.xmlfile.write(self.root.text)
+        else:
+            for text in self.text:
+                self.spool_file.write(text.encode('utf-8'))
+        self.text = []
+
+    def _write_children(self):
+        for child in self.root:
+            self.xmlfile.write(child)
+        del self.root[:]
+
+    def start(self, tag, attrib, nsmap=None):
+        # the default namespace is an empty prefix for parser targets
+        elem = self.builder.start(tag, attrib, {prefix or None: uri for prefix, uri in (nsmap or {}).items()})
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ValueError('Excessive depth in document: {}'.format(MAX_DEPTH))
+        if self.complex_data is None:
+            parent = elem.getparent()
+            if tag.endswith('}ComplexData') and parent is not None and parent.tag.endswith('}Data'):
+                self.complex_data, self.complex_depth, self.size = elem, self.depth, 0
+        elif self.root is None and self.depth == self.complex_depth + 1:
+            self.root = elem
+            if self.spool_file is not None:
+                self._open_spool()
+            else:
+                # text before the embedded document, whitespace usually
+                self.complex_data.text = ''.join(self.text) or None
+                self.text = []
+        return elem
+
+    def data(self, data):
+        if self.complex_data is None or self.root is not None or self.depth != self.complex_depth:
+            self.builder.data(data)
+        elif self.spool_file is not None:
+            self.spool_file.write(data.encode('utf-8'))
+        else:
+            # text content of the ComplexData, not held in the tree
+            self.text.append(data)
+            self.size += len(data)
+            if self.size > self.spool.size:
+                self._open_spool()
+
+    def end(self, tag):
+        if self.text and self.depth == self.complex_depth and self.root is None:
+            self.builder.data(''.join(self.text))
+            self.text = []
+        elem = self.builder.end(tag)
+        self.depth -= 1
+        if self.complex_data is None:
+            return elem
+
+        if self.root is not None and self.depth == self.complex_depth + 1 and elem.getparent() is self.root:
+            # a child of the embedded document is complete
+            if self.spool_file is None:
+                self.size += len(etree.tostring(elem))
+                if self.size > self.spool.size:
+                    self._open_spool()
+            if self.spool_file is not None:
+                self._write_children()
+
+        elif elem is self.root:
+            if self.spool_file is None and self.size + len(elem.text or '') > self.spool.size:
+                self._open_spool()
+            if self.spool_file is not None:
+                self._write_children()
+                # end tag of the root element
+                self.writer.close()
+
+        elif elem is self.complex_data:
+            if self.spool_file is not None:
+                self.spool_file.close()
+                path = self.path
+                if self.root is None and elem.attrib.get('encoding', '').lower() not in ('', 'utf-8'):
+                    try:
+                        path = decode_base64(path)
+                    except ValueError:
+                        LOGGER.warning("failed to decode base64")
+                self.spooled[elem] = path
+                elem.text = None
+                del elem[:]
+            self.complex_data = self.root = self.spool_file = self.xmlfile = None
+        return elem
+
+    def comment(self, text):
+        return self.builder.comment(text)
+
+    def pi(self, target, data=None):
+        return self.builder.pi(target, data)
+
+    def close(self):
+        if self.depth:
+            # parsing failed, the parser raises the error
+            return None
+        return self.builder.close()
+
+    def discard(self):
+        if self.spool_file is not None:
+            self.spool_file.close()
+
+
+def _iterparse(stream, spool):
+    """Parse an XML request from `stream`, spooling large inline ComplexData.
+
+    The content of a ``wps:ComplexData`` element larger than the size of
+    `spool` is written to a spool file while the request is read, and
+    removed from the tree. Embedded XML is written child by child of its
+    root element, so that the whole document is never held in memory. Text
+    is written as the parser reports it, base64 encoded text is then
+    decoded chunk by chunk. Text nodes are not limited in size, the
+    request is limited by ``maxrequestsize``, the other limits of libxml2
+    apply and the depth is limited to :data:`MAX_DEPTH`.
+
+    :param stream: binary file-like object
+    :param spool: :class:`pywps.inout.spool.Spool`
+    :returns: the root element and a dict of the spooled file paths by ``wps:ComplexData`` element
+    """
+    target = _SpoolingTarget(spool)
+    parser = etree.target_parser(target)
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+        root = parser.close()
+    finally:
+        target.discard()
+
+    return root, target.spooled
+
+
 def _check_version(version):
     """Check given version."""
     if version not in ['1.0.0', '2.0.0']:
@@ -777,6 +1000,28 @@ def _get_rawvalue_value(data, encoding=None):
         return data
 
 
+def _get_spooled_value(data, encoding=None):
+    """Return real value of inline data, which may have been spooled to a file"""
+
+    if not isinstance(data, SpooledFile):
+        return _get_rawvalue_value(data, encoding)
+    if encoding == 'base64':
+        try:
+            return decode_base64(data)
+        except Exception:
+            LOGGER.warning("failed to decode base64")
+    return data
+
+
+def _get_spooled_literal(data):
+    """Return the value of a literal input, a spooled value is read back"""
+
+    if isinstance(data, SpooledFile):
+        with open(data, encoding='utf-8') as f:
+            return f.read()
+    return data
+
+
 def _get_reference_header(header_element):
     """Parses ReferenceInput Header element."""
     header = {
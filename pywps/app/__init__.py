@@ -4,6 +4,7 @@
 ##################################################################
 
 from pywps.app.Process import Process  # noqa: F401
+from pywps.app.ProcessRegistry import LazyProcess, ProcessRegistry  # noqa: F401
 from pywps.app.Service import Service  # noqa: F401
 from pywps.app.WPSRequest import WPSRequest  # noqa: F401
 from pywps.app.WPSRequest import get_inputs_from_xml  # noqa: F401
@@ -7,44 +7,62 @@ XML tools
 """
 
 import logging
+from functools import lru_cache
 from typing import Tuple
 
 from werkzeug.wrappers import Response
 
 import pywps.configuration as config
+from pywps import xml_util as etree
 
 LOGGER = logging.getLogger('PYWPS')
 
 
+@lru_cache(maxsize=512)
+def _compile_xpath(version, path):
+    """Compile an xpath expression with the namespaces of the WPS version, once."""
+    if version == "1.0.0":
+        from pywps import namespaces100
+        nsp = namespaces100
+    elif version == "2.0.0":
+        from pywps import namespaces200
+        nsp = namespaces200
+    else:
+        raise NotImplementedError(version)
+    return etree.XPath(path, namespaces=nsp)
+
+
+@lru_cache(maxsize=8)
 def get_xpath_ns(version):
     """Get xpath namespace for specified WPS version.
 
-    Versions 1.0.0 or 2.0.0 are supported.
+    Versions 1.0.0 or 2.0.0 are supported. The expressions are compiled
+    the first time they are used, and reused afterwards.
     """
 
     def xpath_ns(ele, path):
         """Function, which will return xpath namespace for given
         element and xpath
         """
-        if version == "1.0.0":
-            from pywps import namespaces100
-            nsp = namespaces100
-        elif version == "2.0.0":
-            from pywps import namespaces200
-            nsp = namespaces200
-        else:
-            raise NotImplementedError(version)
-        return ele.xpath(path, namespaces=nsp)
+        return _compile_xpath(version, path)(ele)
 
     return xpath_ns
 
 
-def make_response(doc, content_type):
-    """Response serializer."""
+def make_response(doc, content_type, headers=None, http_request=None):
+    """Response serializer.
+
+    :param http_request: :class:`werkzeug.wrappers.Request`, the document is
+        compressed with a content coding it accepts
+    """
+    from pywps.compression import compress_response
+
     if not content_type:
         content_type = get_default_response_mimetype()
-    response = Response(doc, content_type=content_type)
+    response = Response(doc, content_type=content_type, headers=headers)
     response.status_percentage = 100
+    if http_request is not None:
+        compress_response(response, http_request)
     return response
 
 
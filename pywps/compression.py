@@ -0,0 +1,257 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+HTTP content codings of request and response bodies
+
+POST requests may be compressed with the ``gzip`` or ``deflate`` content
+coding (``Content-Encoding`` header). The body is decompressed while it is
+parsed, and the ``maxrequestsize`` option of the ``server`` section limits
+the decompressed size, so that a small compressed request can not expand
+without bounds.
+
+Response documents are compressed with the content coding preferred by the
+client (``Accept-Encoding`` header) among the ``compression_codings`` option
+of the ``server`` section: ``gzip``, and ``br`` and ``zstd`` when the
+``brotli`` and ``zstandard`` packages are installed. Documents smaller than
+``compression_min_size`` are sent as they are, large ones are compressed
+chunk by chunk while they are sent.
+"""
+
+import logging
+import zlib
+
+import pywps.configuration as config
+from pywps.exceptions import FileSizeExceeded, InvalidParameterValue
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOGGER = logging.getLogger("PYWPS")
+
+CHUNK_SIZE = 64 * 1024
+
+# documents larger than this are compressed while they are sent, without Content-Length
+STREAM_SIZE = 1024 * 1024
+
+# gzip header, or zlib header for deflate, raw deflate data is tried as well
+_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+class LimitedReader(object):
+    """File-like wrapper of a request body raising :class:`FileSizeExceeded` above `maxsize` bytes.
+
+    :param stream: binary file-like object
+    :param maxsize: maximal number of bytes read
+    """
+
+    def __init__(self, stream, maxsize):
+        self.stream = stream
+        self.maxsize = maxsize
+        self.count = 0
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            chunk = self._read(CHUNK_SIZE if size < 0 else min(CHUNK_SIZE, size))
+            if not chunk:
+                break
+            self.count += len(chunk)
+            if self.count > self.maxsize:
+                raise FileSizeExceeded('File size for input exceeded.'
+                                       ' Maximum request size allowed: {} megabytes'.format(self.maxsize / 1024 / 1024))
+            parts.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(parts)
+
+    def _read(self, size):
+        return self.stream.read(size)
+
+
+class DecompressingReader(LimitedReader):
+    """File-like wrapper of a compressed request body, decompressing it chunk by chunk.
+
+    The decompressed output of each chunk is bounded, the limit applies to
+    the decompressed bytes.
+
+    :param stream: binary file-like object
+    :param encoding: ``gzip`` or ``deflate``
+    :param maxsize: maximal number of decompressed bytes
+    """
+
+    def __init__(self, stream, encoding, maxsize):
+        super().__init__(stream, maxsize)
+        self.wbits = _WBITS[encoding]
+        self.decompressor = zlib.decompressobj(self.wbits)
+        self.started = False
+
+    def _read(self, size):
+        while not self.decompressor.eof:
+            data = self.decompressor.unconsumed_tail
+            if not data:
+                data = self.stream.read(CHUNK_SIZE)
+                if not data:
+                    raise ValueError('Compressed request body is truncated')
+            try:
+                chunk = self.decompressor.decompress(data, size)
+            except zlib.error:
+                if self.started or self.wbits != zlib.MAX_WBITS:
+                    raise
+                # deflate data without zlib header, sent by some clients
+                self.wbits = -zlib.MAX_WBITS
+                self.decompressor = zlib.decompressobj(self.wbits)
+                chunk = self.decompressor.decompress(data, size)
+            self.started = True
+            if chunk:
+                return chunk
+        return b''
+
+
+def request_stream(http_request, maxsize):
+    """Get the body of a request as a file-like object, decompressed according to its ``Content-Encoding``.
+
+    :param http_request: :class:`werkzeug.wrappers.Request`
+    :param maxsize: maximal size of the (decompressed) body in bytes
+    :raises InvalidParameterValue: unsupported content coding
+    """
+    encoding = (http_request.headers.get('Content-Encoding') or 'identity').strip().lower()
+    if encoding == 'identity':
+        return LimitedReader(http_request.stream, maxsize)
+    if encoding not in _WBITS:
+        raise InvalidParameterValue('Content-Encoding {} is not supported'.format(encoding), 'Content-Encoding')
+    LOGGER.debug('Decompressing {} request body'.format(encoding))
+    return DecompressingReader(http_request.stream, encoding, maxsize)
+
+
+class _BrotliCompressor(object):
+    """Compressor of the brotli package, with the interface of zlib's compressobj."""
+
+    def __init__(self):
+        # the default quality (11) is meant for static content, it is far too slow for documents
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _gzip_compressor():
+    return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _zstd_compressor():
+    return zstandard.ZstdCompressor().compressobj()
+
+
+# compressor factories of the available response codings
+COMPRESSORS = {'gzip': _gzip_compressor}
+if brotli is not None:
+    COMPRESSORS['br'] = _BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _zstd_compressor
+
+
+def get_response_codings():
+    """Content codings of the responses, in the order of preference of the
+    server, from the ``compression_codings`` option of the ``server`` section
+    without the unavailable ones.
+    """
+    codings = [coding.strip().lower() for coding in
+               (config.get_config_value('server', 'compression_codings') or '').split(',')]
+    return [coding for coding in codings if coding in COMPRESSORS]
+
+
+class CompressingIterator(object):
+    """Iterable compressing the `chunks` of a response body.
+
+    :param chunks: iterable of bytes or str, encoded in UTF-8
+    :param coding: content coding, a key of :data:`COMPRESSORS`
+    """
+
+    def __init__(self, chunks, coding):
+        self.chunks = chunks
+        self.coding = coding
+
+    def __iter__(self):
+        compressor = COMPRESSORS[self.coding]()
+        for chunk in self.chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def close(self):
+        if hasattr(self.chunks, 'close'):
+            self.chunks.close()
+
+
+def _is_compressible(mimetype):
+    """Whether documents of `mimetype` are text, worth being compressed."""
+    if not mimetype:
+        return False
+    maintype, _, subtype = mimetype.partition('/')
+    return maintype == 'text' or any(name in subtype for name in ('xml', 'json', 'gml', 'javascript'))
+
+
+def _split(data):
+    view = memoryview(data)
+    return (view[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE))
+
+
+def compress_response(response, http_request):
+    """Compress the body of `response` with the best content coding accepted by `http_request`.
+
+    Responses which are not text, sent from a file (``direct_passthrough``),
+    already encoded, partial or without content are not changed. An ``ETag`` of a compressed
+    response becomes weak, so that it still matches the uncompressed
+    document in ``If-None-Match``.
+
+    :param response: :class:`werkzeug.wrappers.Response`
+    :param http_request: :class:`werkzeug.wrappers.Request`
+    :returns: `response`
+    """
+    codings = get_response_codings()
+    if not codings or response.direct_passthrough or 'Content-Encoding' in response.headers \
+            or response.status_code not in (200, 201, 202) or not _is_compressible(response.mimetype):
+        return response
+    if response.is_sequence:
+        data = response.get_data()
+        min_size = config.get_size_mb(config.get_config_value('server', 'compression_min_size') or '0') * 1024 * 1024
+        if len(data) < min_size:
+            return response
+    response.vary.add('Accept-Encoding')
+    coding = http_request.accept_encodings.best_match(codings)
+    if coding is None:
+        return response
+
+    if response.is_sequence and len(data) <= STREAM_SIZE:
+        compressor = COMPRESSORS[coding]()
+        response.set_data(compressor.compress(data) + compressor.flush())
+    else:
+        chunks = _split(data) if response.is_sequence else response.response
+        response.response = CompressingIterator(chunks, coding)
+        response.headers.pop('Content-Length', None)
+    response.content_encoding = coding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    LOGGER.debug('Response compressed with {}'.format(coding))
+    return response
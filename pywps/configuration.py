@@ -26,6 +26,9 @@ LOGGER = logging.getLogger("PYWPS")
 
 wps_strict = True
 
+_generation = 0
+_config_files = []
+
 
 class EnvInterpolation(configparser.BasicInterpolation):
     """
@@ -57,6 +60,70 @@ class EnvInterpolation(configparser.BasicInterpolation):
         return os.path.expandvars(value)
 
 
+class TrackedConfigParser(configparser.ConfigParser):
+    """
+    Configuration parser keeping track of changes.
+
+    Every change of the configuration increases the value returned by
+    :func:`get_config_generation`, which allows caches built from the
+    configuration to detect that they are outdated.
+    """
+
+    def set(self, section, option, value=None):
+        super().set(section, option, value)
+        _config_changed()
+
+    def add_section(self, section):
+        super().add_section(section)
+        _config_changed()
+
+    def remove_section(self, section):
+        removed = super().remove_section(section)
+        _config_changed()
+        return removed
+
+    def remove_option(self, section, option):
+        removed = super().remove_option(section, option)
+        _config_changed()
+        return removed
+
+    def read(self, filenames, encoding=None):
+        loaded_files = super().read(filenames, encoding=encoding)
+        _config_changed()
+        return loaded_files
+
+    def read_file(self, f, source=None):
+        super().read_file(f, source=source)
+        _config_changed()
+
+    def read_dict(self, dictionary, source='<dict>'):
+        super().read_dict(dictionary, source=source)
+        _config_changed()
+
+
+def _config_changed():
+    global _generation
+    _generation += 1
+
+
+def get_config_generation():
+    """Get a number which changes each time the configuration is modified
+
+    :returns: configuration generation
+    :rtype: int
+    """
+    return _generation
+
+
+def get_config_files():
+    """Get the configuration files loaded by :func:`load_configuration`
+
+    :returns: paths of the loaded configuration files
+    :rtype: list
+    """
+    return list(_config_files)
+
+
 def get_config_value(section, option, default_value=''):
     """Get desired value from  configuration files
 
@@ -94,7 +161,7 @@ def load_hardcoded_configuration():
     global CONFIG
 
     LOGGER.debug('loading harcoded configuration')
-    CONFIG = configparser.ConfigParser(os.environ, interpolation=EnvInterpolation())
+    CONFIG = TrackedConfigParser(os.environ, interpolation=EnvInterpolation())
 
     tmpdir = tempfile.gettempdir()
 
@@ -111,6 +178,16 @@ def load_hardcoded_configuration():
     CONFIG.set('server', 'outputpath', tmpdir)
     CONFIG.set('server', 'allowedinputpaths', '')
     CONFIG.set('server', 'workdir', tmpdir)
+    CONFIG.set('server', 'workdir_pool_size', '0')
+    CONFIG.set('server', 'input_prefetch_workers', '0')
+    CONFIG.set('server', 'inline_spool_size', '0')
+    CONFIG.set('server', 'result_cache_size', '100mb')
+    CONFIG.set('server', 'result_cache_reference_ttl', '60')
+    CONFIG.set('server', 'template_cache_path', '')
+    CONFIG.set('server', 'status_update_interval', '0.5')
+    CONFIG.set('server', 'compression_codings', 'zstd,br,gzip')
+    CONFIG.set('server', 'compression_min_size', '1kb')
+    CONFIG.set('server', 'stream_execute_response', 'true')
     CONFIG.set('server', 'parallelprocesses', '2')
     CONFIG.set('server', 'sethomedir', 'false')
     CONFIG.set('server', 'cleantempdir', 'true')
@@ -118,6 +195,7 @@ def load_hardcoded_configuration():
     CONFIG.set('server', 'storage_copy_function', 'copy')
     CONFIG.set("server", "default_mimetype", "text/xml")
     CONFIG.set("server", "json_indent", "2")
+    CONFIG.set("server", "json_serializer", "auto")
 
     CONFIG.add_section('processing')
     CONFIG.set('processing', 'mode', 'default')
@@ -157,6 +235,8 @@ def load_hardcoded_configuration():
 
     CONFIG.add_section('grass')
     CONFIG.set('grass', 'gisbase', '')
+    CONFIG.set('grass', 'locations_path', '')
+    CONFIG.set('grass', 'mapset_pool_size', '0')
 
     CONFIG.add_section('s3')
     CONFIG.set('s3', 'bucket', '')
@@ -165,6 +245,11 @@ def load_hardcoded_configuration():
     CONFIG.set('s3', 'encrypt', 'false')
     CONFIG.set('s3', 'region', '')
 
+    CONFIG.add_section('metrics')
+    CONFIG.set('metrics', 'enabled', 'false')
+    CONFIG.set('metrics', 'path', '')
+    CONFIG.set('metrics', 'flush_interval', '10')
+
 
 def load_configuration(cfgfiles=None):
     """Load PyWPS configuration from configuration files.
@@ -189,6 +274,7 @@ def load_configuration(cfgfiles=None):
         cfgfiles.append(os.environ['PYWPS_CFG'])
 
     loaded_files = CONFIG.read(cfgfiles, encoding='utf-8')
+    _config_files[:] = loaded_files
     if loaded_files:
         LOGGER.info('Configuration file(s) {} loaded'.format(loaded_files))
     else:
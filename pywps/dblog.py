@@ -18,7 +18,7 @@ from sqlalchemy import VARCHAR, Column, DateTime, Float, Integer, LargeBinary, S
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool, StaticPool
 
-from pywps import configuration
+from pywps import configuration, metrics
 from pywps.exceptions import NoApplicableCode
 
 try:
@@ -62,6 +62,21 @@ class RequestInstance(Base):
     request = Column(LargeBinary, nullable=False)
 
 
+class CachedResult(Base):
+    """Index of the results of :mod:`pywps.result_cache`, stored in the storage."""
+    __tablename__ = '{}cached_results'.format(_tableprefix)
+
+    key = Column(VARCHAR(64), primary_key=True, nullable=False)
+    identifier = Column(VARCHAR(255), nullable=False)
+    destination = Column(VARCHAR(255), nullable=False)
+    content_type = Column(VARCHAR(255), nullable=True)
+    size = Column(Integer, nullable=False)
+    time_created = Column(DateTime(), nullable=False)
+    time_expires = Column(DateTime(), nullable=True)
+    time_used = Column(DateTime(), nullable=False)
+
+
+@metrics.timed('log_request')
 def log_request(uuid, request):
     """Write OGC WPS request (only the necessary parts) to database logging
     system
@@ -118,6 +133,7 @@ def pop_first_stored():
     return request
 
 
+@metrics.timed('store_status')
 def store_status(uuid, wps_status, message=None, status_percentage=None):
     """Writes response to database
     """
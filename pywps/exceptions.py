@@ -11,7 +11,6 @@ Based on OGC OWS, WPS and
 https://lists.ogc.org/pipermail/wps-dev/2013-October/000335.html
 """
 
-import json
 import logging
 
 from markupsafe import escape
@@ -20,7 +19,7 @@ from werkzeug.exceptions import HTTPException
 from werkzeug.http import parse_accept_header
 from werkzeug.wrappers import Response
 
-from pywps import __version__
+from pywps import __version__, serializer
 from pywps.app.basic import get_json_indent, get_response_type, parse_http_url
 
 __author__ = "Alex Morega & Calin Ciociu"
@@ -75,7 +74,7 @@ class NoApplicableCode(HTTPException):
             default_mimetype = parse_http_url(request).get('default_mimetype')
         json_response, mimetype = get_response_type(accept_mimetypes, default_mimetype)
         if json_response:
-            doc = json.dumps(args, indent=get_json_indent())
+            doc = serializer.dumps(args, indent=get_json_indent())
         else:
             doc = str((
                 '<?xml version="1.0" encoding="UTF-8"?>\n'
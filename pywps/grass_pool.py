@@ -0,0 +1,178 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Reusable GRASS GIS locations and mapsets
+
+Processes with a ``grass_location`` get a temporary mapset in a location:
+
+* ``epsg:XXXX`` locations are created once, in the ``locations_path`` of
+  the ``grass`` configuration section, and shared by the jobs.
+* existing locations are used directly.
+
+The mapsets are leased per job and removed in the background afterwards.
+With ``mapset_pool_size`` set, mapsets are created in advance in each used
+location. Leases and pools only rely on atomic renames, so the server
+workers and processing processes share them.
+"""
+
+import logging
+import os
+import shutil
+import sys
+import threading
+import uuid
+
+import pywps.configuration as config
+from pywps import janitor
+
+LOGGER = logging.getLogger("PYWPS")
+
+MAPSET_PREFIX = 'pywps_ms_'
+POOL_PREFIX = 'pywps_pool_'
+_TMP_PREFIX = '.pywps_tmp_'
+
+# gisbase the environment of this process has been set up for
+_environment = None
+_lock = threading.Lock()
+
+
+def setup_environment(gisbase):
+    """Set the environment variables needed for GRASS GIS, once per process.
+
+    :param gisbase: GRASS GIS installation directory
+    """
+    global _environment
+    if _environment == gisbase:
+        return
+    with _lock:
+        if _environment == gisbase:
+            return
+        LOGGER.debug('GRASS GISBASE set to {}'.format(gisbase))
+
+        os.environ['GISBASE'] = gisbase
+
+        os.environ['LD_LIBRARY_PATH'] = '{}:{}'.format(
+            os.environ.get('LD_LIBRARY_PATH'),
+            os.path.join(gisbase, 'lib'))
+        os.putenv('LD_LIBRARY_PATH', os.environ.get('LD_LIBRARY_PATH'))
+
+        os.environ['PATH'] = '{}:{}:{}'.format(
+            os.environ.get('PATH'),
+            os.path.join(gisbase, 'bin'),
+            os.path.join(gisbase, 'scripts'))
+        os.putenv('PATH', os.environ.get('PATH'))
+
+        python_path = os.path.join(gisbase, 'etc', 'python')
+        os.environ['PYTHONPATH'] = '{}:{}'.format(os.environ.get('PYTHONPATH'),
+                                                  python_path)
+        os.putenv('PYTHONPATH', os.environ.get('PYTHONPATH'))
+        sys.path.insert(0, python_path)
+        _environment = gisbase
+
+
+def _locations_path():
+    path = config.get_config_value('grass', 'locations_path')
+    if not path:
+        path = os.path.join(config.get_config_value('server', 'workdir'), 'pywps_grass_locations')
+    return os.path.abspath(path)
+
+
+def _publish(tmp_path, path):
+    """Rename the directory `tmp_path` to `path`, unless another process was faster."""
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def epsg_location(epsg):
+    """Return the path of the location for an EPSG code, created the first time.
+
+    :param epsg: EPSG code
+    :returns: path of the location
+    """
+    dbase = _locations_path()
+    path = os.path.join(dbase, 'epsg_{}'.format(epsg))
+    if os.path.isdir(path):
+        return path
+
+    from grass.script import core as grass
+    from grass.script import setup as gsetup
+
+    LOGGER.debug('Creating GRASS location for EPSG:{}'.format(epsg))
+    os.makedirs(dbase, exist_ok=True)
+    tmp_location = _TMP_PREFIX + uuid.uuid4().hex
+    gsetup.init(os.environ['GISBASE'], dbase, tmp_location, 'PERMANENT')
+    grass.create_location(dbase=dbase, location=tmp_location, epsg=epsg)
+    _publish(os.path.join(dbase, tmp_location), path)
+    return path
+
+
+def _create_mapset(location_path, name):
+    """Create a mapset like ``g.mapset -c``, with the default region of the location."""
+    tmp_path = os.path.join(location_path, _TMP_PREFIX + uuid.uuid4().hex)
+    os.mkdir(tmp_path)
+    shutil.copy(os.path.join(location_path, 'PERMANENT', 'DEFAULT_WIND'), os.path.join(tmp_path, 'WIND'))
+    path = os.path.join(location_path, name)
+    os.rename(tmp_path, path)
+    return path
+
+
+def _fill_pool(location_path, size):
+    pooled = [name for name in os.listdir(location_path) if name.startswith(POOL_PREFIX)]
+    for _ in range(size - len(pooled)):
+        _create_mapset(location_path, POOL_PREFIX + uuid.uuid4().hex)
+
+
+def lease_mapset(location_path, pooled=True):
+    """Lease a new mapset in the location `location_path` for a job.
+
+    The mapset is taken from the pool if there is one, the pool is then
+    refilled in the background. Give it back with :func:`release_mapset`.
+
+    :param location_path: path of the location
+    :param pooled: use the pool of mapsets of the location
+    :returns: path of the mapset
+    """
+    size = int(config.get_config_value('grass', 'mapset_pool_size') or 0) if pooled else 0
+    path = None
+    if size > 0:
+        for name in os.listdir(location_path):
+            if name.startswith(POOL_PREFIX):
+                path = os.path.join(location_path, name.replace(POOL_PREFIX, MAPSET_PREFIX, 1))
+                try:
+                    os.rename(os.path.join(location_path, name), path)
+                    break
+                except OSError:
+                    # leased by another process
+                    path = None
+        janitor.submit(_fill_pool, location_path, size)
+    if path is None:
+        path = _create_mapset(location_path, MAPSET_PREFIX + uuid.uuid4().hex)
+    LOGGER.debug('GRASS mapset {} leased'.format(path))
+    return path
+
+
+def release_mapset(path):
+    """Remove a leased mapset in the background."""
+    janitor.remove(path)
+
+
+def write_gisrc(directory, dbase, location, mapset):
+    """Write a GISRC file selecting the mapset and point ``GISRC`` to it.
+
+    :returns: path of the GISRC file
+    """
+    gisrc = os.path.join(directory, 'GISRC')
+    with open(gisrc, 'w') as f:
+        f.write("GISDBASE: {}\n".format(dbase))
+        f.write("LOCATION_NAME: {}\n".format(location))
+        f.write("MAPSET: {}\n".format(mapset))
+        f.write("GUI: txt\n")
+    os.environ['GISRC'] = gisrc
+    return gisrc
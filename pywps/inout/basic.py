@@ -8,9 +8,10 @@ import logging
 import os
 import shutil
 import tempfile
+import threading
 import weakref
 from collections import namedtuple
-from copy import deepcopy
+from copy import copy, deepcopy
 from io import BytesIO, StringIO, open
 from pathlib import PurePath
 from urllib.parse import urlparse
@@ -34,6 +35,7 @@ from pywps.inout.literaltypes import (
     is_values_reference,
     make_allowedvalues,
 )
+from pywps.inout.spool import SpooledFile
 from pywps.inout.types import Translations
 from pywps.translations import lower_case_dict
 from pywps.validator import get_validator
@@ -51,6 +53,8 @@ SOURCE_TYPE = _SOURCE_TYPE(0, 1, 2, 3, 4)
 
 LOGGER = logging.getLogger("PYWPS")
 
+_file_name_lock = threading.Lock()
+
 
 def _is_textfile(filename):
     try:
@@ -96,6 +100,12 @@ class NoneIOHandler(object):
     def __init__(self, ref):
         self._ref = weakref.ref(ref)
 
+    def clone(self, ref):
+        """Return a copy of this handler bound to `ref`."""
+        new = copy(self)
+        new._ref = weakref.ref(ref)
+        return new
+
     @property
     def file(self):
         """Return filename."""
@@ -197,6 +207,7 @@ class IOHandler(object):
 
         # Internal defaults for class and subclass properties.
         self._workdir = None
+        self._workdir_created = False
 
         # Set public defaults
         self.workdir = workdir
@@ -223,17 +234,18 @@ class IOHandler(object):
 
     @property
     def workdir(self):
+        # the directory is created on first access
+        if self._workdir is not None and not self._workdir_created:
+            # private, like the directories of tempfile.mkdtemp
+            os.makedirs(self._workdir, mode=0o700, exist_ok=True)
+            self._workdir_created = True
         return self._workdir
 
     @workdir.setter
     def workdir(self, path):
         """Set working temporary directory for files to be stored in."""
-
-        if path is not None:
-            if not os.path.exists(path):
-                os.makedirs(path)
-
         self._workdir = path
+        self._workdir_created = False
 
     @property
     def validator(self):
@@ -303,8 +315,18 @@ class IOHandler(object):
 
     def clone(self):
         """Create copy of yourself
+
+        The definition (formats, metadata, translations, allowed values, ...)
+        is shared with the original, only the per-execution state (data
+        handler, workdir, uuid, storage) is copied.
         """
-        return deepcopy(self)
+        new = copy(self)
+        new._iohandler = self._iohandler.clone(new)
+        new.inpt = dict(self.inpt)
+        # outputs keep a cache of stored files in their storage
+        if getattr(self, '_storage', None) is not None:
+            new._storage = deepcopy(self._storage)
+        return new
 
     @property
     def base64(self):
@@ -382,6 +404,15 @@ class IOHandler(object):
     def prop(self):
         return self._iohandler.prop
 
+    def prefetch(self, executor, cancelled=None):
+        """Start fetching referenced data with `executor`, see :meth:`UrlHandler.prefetch`.
+
+        :returns: future of the download, None if there is nothing to fetch
+        """
+        if isinstance(self._iohandler, UrlHandler):
+            return self._iohandler.prefetch(executor, cancelled)
+        return None
+
 
 class FileHandler(NoneIOHandler):
     prop = 'file'
@@ -392,6 +423,12 @@ class FileHandler(NoneIOHandler):
         self._stream = None
         self._file = os.path.abspath(value)
 
+    def clone(self, ref):
+        """Return a copy of this handler bound to `ref`, without the open stream."""
+        new = NoneIOHandler.clone(self, ref)
+        new._stream = None
+        return new
+
     @property
     def file(self):
         """Return filename."""
@@ -511,6 +548,10 @@ class StreamHandler(DataHandler):
         self._data = None
         self._stream = value
 
+    def clone(self, ref):
+        """Return a copy of this handler bound to `ref`, sharing the stream."""
+        return NoneIOHandler.clone(self, ref)
+
     @property
     def stream(self):
         """Return the stream."""
@@ -534,21 +575,45 @@ class UrlHandler(FileHandler):
         self._stream = None
         self._url = value
         self._post_data = None
+        self._fetch = None
 
     @property
     def url(self):
         """Return the URL."""
         return self._url
 
+    def prefetch(self, executor, cancelled=None):
+        """Start downloading the URL with `executor`.
+
+        Errors are raised when the file is accessed, as without prefetch.
+
+        :param executor: :class:`concurrent.futures.Executor` to download with
+        :param cancelled: :class:`threading.Event` aborting the download when set
+        :returns: future of the download, None if already downloaded
+        """
+        if self._file is None and self._fetch is None:
+            self._fetch = executor.submit(self._download, cancelled)
+        return self._fetch
+
     @property
     def file(self):
         """Downloads URL and return file pointer.
         Checks if size is allowed before download.
         """
-        if self._file is not None:
-            return self._file
+        if self._file is None:
+            fetch, self._fetch = self._fetch, None
+            if fetch is not None and not fetch.cancel():
+                # already running or done
+                self._file = fetch.result()
+            else:
+                self._file = self._download()
+        return self._file
 
-        self._file = self._ref()._build_file_name(href=self.url)
+    def _download(self, cancelled=None):
+        # downloads may run concurrently, the file name is reserved at once
+        with _file_name_lock:
+            file_name = self._ref()._build_file_name(href=self.url)
+            open(file_name, 'wb').close()
 
         max_byte_size = self.max_size()
 
@@ -567,20 +632,22 @@ class UrlHandler(FileHandler):
                 raise FileSizeExceeded(error_message)
 
         try:
-            with open(self._file, 'wb') as f:
+            with open(file_name, 'wb') as f:
                 data_size = 0
                 for chunk in reference_file.iter_content(chunk_size=1024):
+                    if cancelled is not None and cancelled.is_set():
+                        raise NoApplicableCode('Download of {} cancelled'.format(self.url))
                     data_size += len(chunk)
                     if int(max_byte_size) > 0:
                         if int(data_size) > int(max_byte_size):
                             raise FileSizeExceeded(error_message)
                     f.write(chunk)
-        except FileSizeExceeded:
+        except (FileSizeExceeded, NoApplicableCode):
             raise
         except Exception as e:
             raise NoApplicableCode(e)
 
-        return self._file
+        return file_name
 
     @property
     def post_data(self):
@@ -1034,8 +1101,13 @@ class ComplexInput(BasicIO, BasicComplex, IOHandler):
 
         return inpt.get('href')
 
-    def process(self, inpt):
-        """Subclass with the appropriate handler given the data input."""
+    def process(self, inpt, validate=True):
+        """Subclass with the appropriate handler given the data input.
+
+        :param validate: if False, references are not validated, which
+                         would download them; call :meth:`_check_valid`
+                         later
+        """
         href = inpt.get('href', None)
         self.inpt = inpt
 
@@ -1043,10 +1115,16 @@ class ComplexInput(BasicIO, BasicComplex, IOHandler):
             if urlparse(href).scheme == 'file':
                 self.file = self.file_handler(inpt)
 
-            else:
+            elif validate:
                 # No file download occurs here. The file content will
                 # only be retrieved when the file property is accessed.
                 self.url = self.url_handler(inpt)
+            else:
+                self._iohandler = UrlHandler(self.url_handler(inpt), self)
+
+        elif isinstance(inpt.get('data'), SpooledFile):
+            # inline data written to a file while parsing the request
+            self.file = inpt['data']
 
         else:
             self.data = inpt.get('data')
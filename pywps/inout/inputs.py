@@ -99,11 +99,6 @@ class BoundingBoxInput(basic.BBoxInput):
 
         return instance
 
-    def clone(self):
-        """Create copy of yourself
-        """
-        return deepcopy(self)
-
 
 class ComplexInput(basic.ComplexInput):
     """
@@ -258,11 +253,6 @@ class ComplexInput(basic.ComplexInput):
 
         return data
 
-    def clone(self):
-        """Create copy of yourself
-        """
-        return deepcopy(self)
-
 
 class LiteralInput(basic.LiteralInput):
     """
@@ -371,11 +361,6 @@ class LiteralInput(basic.LiteralInput):
 
         return instance
 
-    def clone(self):
-        """Create copy of yourself
-        """
-        return deepcopy(self)
-
 
 def input_from_json(json_data):
     data_type = json_data.get('type', 'literal')
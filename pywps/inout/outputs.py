@@ -523,16 +523,9 @@ class MetaLink:
         return config.get_config_value('server', 'url')
 
     def _load_template(self):
-        from jinja2 import PackageLoader
+        from pywps.response import get_template_env
 
-        from pywps.response import RelEnvironment
-
-        template_env = RelEnvironment(
-            loader=PackageLoader('pywps', 'templates'),
-            trim_blocks=True, lstrip_blocks=True,
-            autoescape=True, )
-
-        self._template = template_env.get_template(self._xml_template)
+        self._template = get_template_env().get_template(self._xml_template)
 
 
 class MetaLink4(MetaLink):
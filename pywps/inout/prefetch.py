@@ -0,0 +1,104 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Concurrent download of the referenced inputs of a request
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pywps.configuration as config
+
+LOGGER = logging.getLogger("PYWPS")
+
+
+class Prefetcher(object):
+    """Download the URL references of inputs concurrently, with a bounded thread pool.
+
+    The downloads respect ``maxsingleinputsize`` like any download of a
+    reference. Errors are raised when the input is accessed, so a broken
+    reference only fails a process which uses it. On :meth:`close` the
+    downloads, which have not been needed, are cancelled.
+
+    >>> with Prefetcher(4) as prefetcher:
+    ...     prefetcher.fetch([])
+
+    :param max_workers: maximal number of concurrent downloads, 0 disables
+                        prefetching
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = []
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_config(cls):
+        """Create a prefetcher with the number of workers of the ``input_prefetch_workers`` option."""
+        return cls(int(config.get_config_value('server', 'input_prefetch_workers') or 0))
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0
+
+    def fetch(self, inputs):
+        """Start the downloads of the references of `inputs`.
+
+        :param inputs: iterable of inputs
+        """
+        if not self.enabled:
+            return
+        for inpt in inputs:
+            prefetch = getattr(inpt, 'prefetch', None)
+            if prefetch is None:
+                continue
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='pywps-prefetch')
+            future = prefetch(self._executor, self._cancelled)
+            if future is not None:
+                self._futures.append(future)
+        LOGGER.debug('Prefetching {} references'.format(len(self._futures)))
+
+    def map(self, func, items):
+        """Call `func` for each of `items` concurrently, in the thread pool.
+
+        :returns: list of the results, in the order of `items`
+        """
+        items = list(items)
+        if not self.enabled or len(items) < 2:
+            return [func(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='pywps-prefetch')
+        return list(self._executor.map(func, items))
+
+    def wait(self):
+        """Wait until all downloads have finished."""
+        wait(self._futures)
+
+    def close(self):
+        """Cancel the pending downloads and wait for the running ones to stop."""
+        if self._executor is None:
+            return
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_inputs(inputs):
+    """Iterate over the inputs of a request, as in :attr:`WPSRequest.inputs`."""
+    for values in inputs.values():
+        yield from values
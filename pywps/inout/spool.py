@@ -0,0 +1,419 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Spooling of large inline inputs to files while a request is parsed
+
+Inline inputs larger than the ``inline_spool_size`` option of the ``server``
+section are written to files in the working directory of the request, which
+becomes the working directory of the process. The inputs are then file based
+like downloaded references, instead of being held in memory several times.
+
+The XML requests are parsed with :func:`pywps.app.WPSRequest._iterparse`,
+the JSON requests with :func:`load_json`. Base64 encoded values are decoded
+chunk by chunk with :class:`Base64Decoder`.
+"""
+
+import base64
+import codecs
+import json
+import logging
+import os
+import re
+import tempfile
+
+import pywps.configuration as config
+from pywps import janitor
+
+LOGGER = logging.getLogger("PYWPS")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class SpooledFile(str):
+    """Path of the file an inline input has been spooled to.
+
+    Only the request parsers create it, a client can not pass a file path
+    as input value.
+    """
+
+
+class Spool(object):
+    """Files of the spooled inline inputs of a request.
+
+    The working directory is acquired with the first file.
+
+    :param size: inline inputs larger than `size` bytes are spooled, 0 disables spooling
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.workdir = None
+
+    @classmethod
+    def from_config(cls):
+        """Create a spool with the size of the ``inline_spool_size`` option."""
+        size = config.get_size_mb(config.get_config_value('server', 'inline_spool_size') or '0')
+        return cls(int(size * 1024 * 1024))
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def open(self):
+        """Open a new file for an inline input.
+
+        :returns: the path as :class:`SpooledFile` and the file opened for binary writing
+        """
+        if self.workdir is None:
+            parent = os.path.abspath(config.get_config_value('server', 'workdir'))
+            self.workdir = janitor.acquire_workdir(parent)
+            os.makedirs(self.workdir, mode=0o700, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='input_', dir=self.workdir)
+        LOGGER.debug('Spooling inline input to {}'.format(path))
+        return SpooledFile(path), os.fdopen(fd, 'wb')
+
+    def discard(self):
+        """Remove the spooled files, when the request is not executed."""
+        janitor.remove(self.workdir)
+        self.workdir = None
+
+
+_NOT_BASE64 = bytes(c for c in range(256)
+                    if c not in b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+
+
+class Base64Decoder(object):
+    """Decode base64 text written in chunks to a binary file.
+
+    The result is the one of :func:`base64.b64decode` on the whole text:
+    characters outside of the base64 alphabet are ignored, and incorrect
+    padding raises :class:`binascii.Error`.
+
+    :param target: binary file-like object
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.rest = b''
+        self.padded = False
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        data = self.rest + data.translate(None, _NOT_BASE64)
+        if not self.padded and b'=' in data:
+            # the decoding of the padding depends on what follows, the rest
+            # is decoded at once when closing
+            self.padded = True
+            start = data.index(b'=') // 4 * 4
+            self.target.write(base64.b64decode(data[:start]))
+            self.rest = data[start:]
+        elif self.padded:
+            self.rest = data
+        else:
+            # decode whole groups of 4 characters only
+            end = len(data) // 4 * 4
+            self.target.write(base64.b64decode(data[:end]))
+            self.rest = data[end:]
+
+    def close(self):
+        """Decode the last characters, the target file is not closed."""
+        self.target.write(base64.b64decode(self.rest))
+        self.rest = b''
+
+
+def decode_base64(path):
+    """Decode the base64 content of the spooled file `path` chunk by chunk.
+
+    :returns: the path of the decoded file, in the same directory, the
+              original file is removed
+    """
+    fd, decoded_path = tempfile.mkstemp(prefix='input_', dir=os.path.dirname(path))
+    try:
+        with open(path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+            decoder = Base64Decoder(target)
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                decoder.write(chunk)
+            decoder.close()
+    except Exception:
+        os.remove(decoded_path)
+        raise
+    os.remove(path)
+    return SpooledFile(decoded_path)
+
+
+class _Capture(object):
+    """Text of a JSON value, kept in memory until it exceeds the size of the spool."""
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.parts = []
+        self.size = 0
+        self.path = None
+        self.file = None
+
+    def write(self, text):
+        if self.file is not None:
+            self.file.write(text.encode('utf-8'))
+            return
+        self.parts.append(text)
+        self.size += len(text)
+        if self.spool.enabled and self.size > self.spool.size:
+            self.path, self.file = self.spool.open()
+            self.file.write(''.join(self.parts).encode('utf-8'))
+            self.parts = []
+
+    def close(self):
+        """Return the captured text, or the :class:`SpooledFile` it has been written to."""
+        if self.file is None:
+            return ''.join(self.parts)
+        self.file.close()
+        return self.path
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_CHUNK = re.compile(r'[^"\\\x00-\x1f]+')
+# a surrogate pair is decoded at once
+_ESCAPE = re.compile(r'\\(?:u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|["\\/bfnrt])')
+_SCALAR = re.compile(r'[^,:{}\[\]" \t\n\r]+')
+# complete strings and anything else, brackets outside of strings
+_RAW_SPAN = re.compile(r'(?:[^"]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+_RAW_BRACKET = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|([{}\[\]])', re.DOTALL)
+_RAW_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+
+# paths of the values of the inputs in a JSON Execute request, ``*`` is any
+# member of an object, None any item of an array
+EXECUTE_INPUT_VALUES = (
+    ('inputs', '*', 'data'),
+    ('inputs', '*', None, 'data'),
+    ('batch', None, '*', 'data'),
+    ('batch', None, '*', None, 'data'),
+)
+# paths of the values of the inputs in a JSON document holding only the inputs
+INPUT_VALUES = (
+    ('*', 'data'),
+    ('*', None, 'data'),
+)
+
+
+def _match(pattern, path):
+    return len(pattern) == len(path) and all(
+        name == key or (name == '*' and key is not None) for name, key in zip(pattern, path))
+
+
+class _JsonDecoder(object):
+    """Decode a JSON document from a binary stream, with the values at `paths` spooled.
+
+    Spooled strings are decoded, spooled objects and arrays are written as
+    JSON text. Everything else is decoded like :func:`json.load` would.
+    """
+
+    def __init__(self, stream, spool, paths):
+        self.stream = stream
+        self.spool = spool
+        self.paths = paths
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        """Read more text into the buffer, returns False at the end of the stream."""
+        while not self.eof:
+            data = self.stream.read(CHUNK_SIZE)
+            self.eof = not data
+            text = self.decoder.decode(data, final=self.eof)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+
+    def _peek(self, required=True):
+        """Return the next non-whitespace character, without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                if required:
+                    raise ValueError('Unexpected end of JSON data')
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError('Expecting {!r} at position {}'.format(char, self.pos))
+        self.pos += 1
+
+    def decode(self):
+        value = self._value(())
+        if self._peek(required=False) is not None:
+            raise ValueError('Extra data after JSON document')
+        return value
+
+    def _value(self, path):
+        char = self._peek()
+        if char == '{':
+            return self._object(path)
+        elif char == '[':
+            return self._array(path)
+        elif char == '"':
+            capture = _Capture(_NO_SPOOL)
+            self._string(capture)
+            return capture.close()
+        return self._scalar()
+
+    def _spooled_value(self):
+        char = self._peek()
+        if char not in '{["':
+            return self._scalar()
+        capture = _Capture(self.spool)
+        try:
+            if char == '"':
+                self._string(capture)
+                return capture.close()
+            self._raw(capture)
+        except Exception:
+            capture.discard()
+            raise
+        value = capture.close()
+        return value if isinstance(value, SpooledFile) else json.loads(value)
+
+    def _object(self, path):
+        self.pos += 1
+        obj = {}
+        if self._peek() == '}':
+            self.pos += 1
+            return obj
+        while True:
+            if self._peek() != '"':
+                raise ValueError('Expecting property name at position {}'.format(self.pos))
+            key = self._value(None)
+            self._expect(':')
+            member = path + (key,)
+            if any(_match(pattern, member) for pattern in self.paths):
+                obj[key] = self._spooled_value()
+            else:
+                obj[key] = self._value(member)
+            char = self._peek()
+            self.pos += 1
+            if char == '}':
+                return obj
+            if char != ',':
+                raise ValueError('Expecting \',\' delimiter at position {}'.format(self.pos - 1))
+
+    def _array(self, path):
+        self.pos += 1
+        array = []
+        if self._peek() == ']':
+            self.pos += 1
+            return array
+        item = path + (None,)
+        while True:
+            array.append(self._value(item))
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return array
+            if char != ',':
+                raise ValueError('Expecting \',\' delimiter at position {}'.format(self.pos - 1))
+
+    def _scalar(self):
+        while True:
+            match = _SCALAR.match(self.buf, self.pos)
+            # the token may continue in the next chunk
+            if match and (match.end() < len(self.buf) or not self._more()):
+                break
+            if not match:
+                raise ValueError('Unexpected character at position {}'.format(self.pos))
+        self.pos = match.end()
+        return json.loads(match.group())
+
+    def _string(self, capture):
+        """Decode a string into `capture`."""
+        self.pos += 1
+        while True:
+            match = _STRING_CHUNK.match(self.buf, self.pos)
+            if match:
+                capture.write(match.group())
+                self.pos = match.end()
+            if len(self.buf) - self.pos < 12 and not self.eof:
+                # an escape sequence needs up to 12 characters
+                self._more()
+                continue
+            if self.pos >= len(self.buf):
+                raise ValueError('Unterminated string')
+            char = self.buf[self.pos]
+            if char == '"':
+                self.pos += 1
+                return
+            match = _ESCAPE.match(self.buf, self.pos)
+            if char != '\\' or not match:
+                raise ValueError('Invalid string character at position {}'.format(self.pos))
+            capture.write(json.loads('"{}"'.format(match.group())))
+            self.pos = match.end()
+
+    def _raw(self, capture):
+        """Copy the text of an object or array into `capture`."""
+        depth = 0
+        in_string = False
+        while True:
+            start = self.pos
+            if in_string:
+                # the rest of a string started in a previous chunk
+                end = _RAW_STRING_REST.match(self.buf, start).end()
+                if end < len(self.buf) and self.buf[end] == '"':
+                    in_string = False
+                    end += 1
+            else:
+                end = _RAW_SPAN.match(self.buf, start).end()
+                for match in _RAW_BRACKET.finditer(self.buf, start, end):
+                    bracket = match.group(1)
+                    if bracket is None:
+                        continue
+                    depth += 1 if bracket in '{[' else -1
+                    if depth == 0:
+                        capture.write(self.buf[start:match.end()])
+                        self.pos = match.end()
+                        return
+                if end < len(self.buf):
+                    # a string continues in the next chunk
+                    in_string = True
+                    end += 1
+            capture.write(self.buf[start:end])
+            self.pos = end
+            if end == start or end == len(self.buf):
+                if not self._more():
+                    raise ValueError('Unexpected end of JSON data')
+
+
+_NO_SPOOL = Spool(0)
+
+
+def load_json(stream, spool, paths=EXECUTE_INPUT_VALUES):
+    """Decode a JSON document from a binary stream, spooling the large values at `paths`.
+
+    Strings longer than the size of `spool` are decoded into a spool file,
+    objects and arrays are written as JSON text. The value is then a
+    :class:`SpooledFile`. The memory used does not depend on the size of
+    the spooled values.
+
+    :param stream: binary file-like object
+    :param spool: :class:`Spool`
+    :param paths: paths of the values to spool, tuples of member names
+        (``*`` for any member) and None for any item of an array. The values
+        of the inputs of an Execute request by default.
+    :raises ValueError: invalid JSON document
+    """
+    return _JsonDecoder(stream, spool, paths).decode()
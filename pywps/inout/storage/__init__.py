@@ -66,6 +66,20 @@ class StorageAbstract(object, metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def read(self, destination):
+        """
+        :param destination: the name of data written with :meth:`write`
+        :returns: the data as string
+        """
+        raise NotImplementedError
+
+    def delete(self, destination):
+        """
+        :param destination: the name of data written with :meth:`write`,
+                            missing data is ignored
+        """
+        raise NotImplementedError
+
 
 class CachedStorage(StorageAbstract):
     def __init__(self):
@@ -8,6 +8,7 @@ import os
 from urllib.parse import urljoin
 
 from pywps import configuration as config
+from pywps import metrics
 from pywps.exceptions import FileStorageError, NotEnoughStorage
 from pywps.inout.basic import IOHandler
 
@@ -68,6 +69,7 @@ class FileStorage(CachedStorage):
         self.output_url = output_url
         self.copy_function = copy_function
 
+    @metrics.timed('storage_store')
     def _do_store(self, output):
         """Copy output to final storage location.
 
@@ -108,8 +110,9 @@ class FileStorage(CachedStorage):
         output_name, suffix = _build_output_name(output)
         # build tempfile in case of duplicates
         if os.path.exists(os.path.join(target, output_name)):
-            output_name = tempfile.mkstemp(suffix=suffix, prefix=file_name + '_',
-                                           dir=target)[1]
+            prefix = output_name[:len(output_name) - len(suffix)] if suffix else output_name
+            fd, output_name = tempfile.mkstemp(suffix=suffix, prefix=prefix + '_', dir=target)
+            os.close(fd)
 
         full_output_name = os.path.join(target, output_name)
         LOGGER.info(f'Storing file output to {full_output_name} ({self.copy_function}).')
@@ -147,6 +150,7 @@ class FileStorage(CachedStorage):
         else:
             shutil.copy2(src, dst)
 
+    @metrics.timed('storage_write')
     def write(self, data, destination, data_format=None):
         """Write data to self.target."""
         if not os.path.exists(os.path.dirname(self.target)):
@@ -175,6 +179,16 @@ class FileStorage(CachedStorage):
     def location(self, destination):
         return os.path.join(self.target, destination)
 
+    def read(self, destination):
+        with open(self.location(destination)) as file:
+            return file.read()
+
+    def delete(self, destination):
+        try:
+            os.remove(self.location(destination))
+        except FileNotFoundError:
+            pass
+
 
 def get_free_space(folder):
     """Return folder/drive free space (in bytes)."""
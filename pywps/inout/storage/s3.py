@@ -7,6 +7,7 @@ import logging
 import os
 
 import pywps.configuration as wpsConfig
+from pywps import metrics
 
 from . import STORE_TYPE, StorageAbstract
 from .implementationbuilder import StorageImplementationBuilder
@@ -100,6 +101,7 @@ class S3Storage(StorageAbstract):
             url = self.uploadData(data, s3_path, extraArgs)
         return url
 
+    @metrics.timed('storage_store')
     def store(self, output):
         """
         :param output: Of type IOHandler
@@ -116,6 +118,7 @@ class S3Storage(StorageAbstract):
         url = self.uploadFileToS3(filename, extra_args)
         return (STORE_TYPE.S3, s3_path, url)
 
+    @metrics.timed('storage_write')
     def write(self, data, destination, data_format=None):
         """
         :param data: Data that will be written to S3. Can be binary or text
@@ -160,3 +163,24 @@ class S3Storage(StorageAbstract):
                   request
         """
         return self.url(destination)
+
+    def read(self, destination):
+        """
+        :param destination: File of object to read. This should not include
+                            any prefix configured in the server configuration.
+        :returns: content of the object as string
+        """
+        import boto3
+        s3 = boto3.resource('s3', region_name=self.region)
+        s3_path = _build_s3_file_path(self.prefix, destination)
+        return s3.Object(self.bucket, s3_path).get()['Body'].read().decode('utf-8')
+
+    def delete(self, destination):
+        """
+        :param destination: File of object to delete. This should not include
+                            any prefix configured in the server configuration.
+        """
+        import boto3
+        s3 = boto3.resource('s3', region_name=self.region)
+        s3.Object(self.bucket, _build_s3_file_path(self.prefix, destination)).delete()
+        LOGGER.debug('S3 Delete: {} from bucket {}'.format(destination, self.bucket))
@@ -0,0 +1,174 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Working directories of the processes
+
+Working directories are handed out by :func:`acquire_workdir`, either
+drawn from a pool of directories created in advance (see the
+``workdir_pool_size`` option of the ``server`` section) or as a new name the
+directory gets created with on first access. :func:`remove` hands the
+removal of a directory to a background thread, so that the request does not
+wait for it.
+
+The background thread is not a daemon thread, pending removals are finished
+before the Python process terminates. The child processes running the
+asynchronous executions exit without that, they call :func:`shutdown`.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import threading
+import uuid
+from collections import deque
+
+import pywps.configuration as config
+
+LOGGER = logging.getLogger("PYWPS")
+
+WORKDIR_PREFIX = 'pywps_process_'
+
+
+class Janitor(object):
+    """Run tasks one after another in a background thread.
+
+    The thread is started on demand and stops once it has been idle for
+    `idle_timeout` seconds.
+
+    :param idle_timeout: seconds the thread waits for new tasks
+    """
+
+    def __init__(self, idle_timeout=1.0):
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, *args):
+        """Run ``func(*args)`` in the background thread."""
+        self._queue.put((func, args))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pywps-janitor')
+                self._thread.start()
+
+    def join(self):
+        """Wait until all submitted tasks are done."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            try:
+                func, args = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            try:
+                func(*args)
+            except Exception:
+                LOGGER.exception('Janitor task {} failed'.format(func.__name__))
+            finally:
+                self._queue.task_done()
+
+
+_janitor = Janitor()
+# pre-created working directories by parent directory
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def _after_fork():
+    # the parent finishes its pending tasks and keeps its pool
+    global _janitor
+    _janitor = Janitor()
+    _pool.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _new_workdir_name(parent):
+    return os.path.join(parent, WORKDIR_PREFIX + uuid.uuid4().hex)
+
+
+def _get_pool_size():
+    return int(config.get_config_value('server', 'workdir_pool_size') or 0)
+
+
+def _fill_pool(parent, size):
+    with _pool_lock:
+        pool = _pool.setdefault(parent, deque())
+    while len(pool) < size:
+        path = _new_workdir_name(parent)
+        os.makedirs(path, mode=0o700)
+        pool.append(path)
+
+
+def acquire_workdir(parent):
+    """Return a new working directory in `parent`.
+
+    The directory is taken from the pool of pre-created directories, which
+    gets refilled in the background. Without pool, or when it is exhausted,
+    a new unique name is returned and the directory does not exist yet.
+
+    :param parent: directory to create the working directory in
+    :returns: path of the working directory
+    """
+    size = _get_pool_size()
+    if size > 0:
+        with _pool_lock:
+            pool = _pool.setdefault(parent, deque())
+            path = pool.popleft() if pool else None
+        _janitor.submit(_fill_pool, parent, size)
+        if path:
+            return path
+    return _new_workdir_name(parent)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        LOGGER.debug('Removing directory: {}'.format(path))
+        shutil.rmtree(path)
+
+
+def remove(path):
+    """Remove the directory `path` and its content in the background."""
+    if path:
+        _janitor.submit(_remove, path)
+
+
+def submit(func, *args):
+    """Run ``func(*args)`` in the background, errors are logged."""
+    _janitor.submit(func, *args)
+
+
+def join():
+    """Wait until the pending background tasks are done."""
+    _janitor.join()
+
+
+def _discard_pool():
+    for pool in _pool.values():
+        while pool:
+            _remove(pool.popleft())
+
+
+def shutdown():
+    """Finish the pending background tasks and remove the unused pre-created
+    directories, for a process exiting without running the :mod:`atexit`
+    handlers.
+    """
+    join()
+    _discard_pool()
+
+
+atexit.register(_discard_pool)
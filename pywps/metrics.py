@@ -0,0 +1,362 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Timing metrics of the request processing phases
+
+Durations of the phases (request parsing, database logging, input fetching,
+process handler, response rendering, output storage, ...) are collected in
+histograms labelled by phase, operation and process identifier, failures in a
+counter. Collection is enabled with the ``enabled`` option of the ``metrics``
+configuration section.
+
+Each process keeps its own metrics. If the ``path`` option of the
+``metrics`` section points to a directory shared by the processes (server
+workers, processes started by the ``multiprocessing`` processing mode or
+the scheduler) each process dumps its metrics there, at most once every
+``flush_interval`` seconds and when it exits, and :func:`render`
+aggregates them. The files of the terminated processes are merged into
+one file.
+
+The metrics are served in the Prometheus text format by the
+:func:`application` WSGI application.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from werkzeug.wrappers import Request, Response
+
+from pywps import configuration
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOGGER = logging.getLogger("PYWPS")
+
+#: upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_FILE_PREFIX = 'pywps_metrics_'
+
+_labels = contextvars.ContextVar('pywps_metrics_labels', default=('', ''))
+_lock = threading.Lock()
+_durations = {}
+_errors = {}
+_settings = (None, False, '', 0.0)
+# time of the last dump of the metrics
+_flushed = None
+# whether a file with our pid, left by a terminated process, has been retired
+_retired_previous = False
+
+
+def _reset():
+    """Drop the metrics collected by this process."""
+    global _flushed, _retired_previous
+    with _lock:
+        _durations.clear()
+        _errors.clear()
+        _flushed = None
+        _retired_previous = False
+
+
+# a forked process starts from scratch, the metrics of the parent are
+# reported by the parent
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset)
+
+
+def _get_settings():
+    global _settings
+    generation = configuration.get_config_generation()
+    if _settings[0] != generation:
+        enabled = configuration.get_config_value('metrics', 'enabled') is True
+        path = configuration.get_config_value('metrics', 'path')
+        interval = float(configuration.get_config_value('metrics', 'flush_interval') or 0)
+        _settings = (configuration.get_config_generation(), enabled, path, interval)
+    return _settings[1:]
+
+
+def is_enabled():
+    """Return whether metrics are collected."""
+    return _get_settings()[0]
+
+
+def set_labels(operation, process=''):
+    """Set the operation and process identifier labelling the phases timed in the current context.
+
+    :returns: token to restore the previous labels with :func:`reset_labels`
+    """
+    return _labels.set((operation or '', process or ''))
+
+
+def reset_labels(token):
+    """Restore the labels replaced by :func:`set_labels`."""
+    _labels.reset(token)
+
+
+@contextlib.contextmanager
+def labels(operation='', process=''):
+    """Context manager labelling the phases timed inside of it."""
+    token = set_labels(operation, process)
+    try:
+        yield
+    finally:
+        reset_labels(token)
+
+
+def observe(phase, seconds, failed=False):
+    """Record the duration of a phase, labelled with the current labels.
+
+    :param phase: name of the phase
+    :param seconds: duration of the phase
+    :param failed: whether the phase ended with an exception
+    """
+    key = (phase,) + _labels.get()
+    with _lock:
+        histogram = _durations.get(key)
+        if histogram is None:
+            histogram = _durations[key] = [0] * (len(BUCKETS) + 2)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            index = len(BUCKETS)
+        histogram[index] += 1
+        histogram[-1] += seconds
+        if failed:
+            _errors[key] = _errors.get(key, 0) + 1
+
+
+@contextlib.contextmanager
+def timer(phase):
+    """Context manager timing the phase `phase`.
+
+    The labels are read when the phase ends, so that labels set inside of
+    the phase are used.
+    """
+    if not is_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe(phase, time.perf_counter() - start, failed=True)
+        raise
+    observe(phase, time.perf_counter() - start)
+
+
+def timed(phase):
+    """Decorator timing each call of the decorated function as phase `phase`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _to_snapshot(durations, errors):
+    return {
+        'durations': [[list(key), list(values)] for key, values in durations.items()],
+        'errors': [[list(key), value] for key, value in errors.items()],
+    }
+
+
+def _snapshot():
+    with _lock:
+        return _to_snapshot(_durations, _errors)
+
+
+def _merge(target, snapshot):
+    durations, errors = target
+    for key, values in snapshot['durations']:
+        key = tuple(key)
+        if key in durations:
+            durations[key] = [a + b for a, b in zip(durations[key], values)]
+        else:
+            durations[key] = list(values)
+    for key, value in snapshot['errors']:
+        key = tuple(key)
+        errors[key] = errors.get(key, 0) + value
+
+
+def _metrics_file(path, pid):
+    return os.path.join(path, '{}{}.json'.format(_FILE_PREFIX, pid))
+
+
+def _read(filename):
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        LOGGER.debug('Could not read metrics file {}'.format(filename))
+        return None
+
+
+def _write(path, filename, snapshot):
+    fd, tmp = tempfile.mkstemp(prefix=_FILE_PREFIX, suffix='.tmp', dir=path)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, filename)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # e.g. running as another user
+        return True
+    return True
+
+
+def _retire(path, own_file=False):
+    """Merge the files of the terminated processes into the file of the terminated processes.
+
+    The directory is locked meanwhile. Only done on the systems with
+    :mod:`fcntl`, the files of terminated processes are kept otherwise.
+
+    :param own_file: also retire the file with our pid, left by a terminated process
+    """
+    if fcntl is None:
+        return
+    own = os.getpid()
+    terminated = _metrics_file(path, 'terminated')
+    try:
+        with open(os.path.join(path, _FILE_PREFIX + 'lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stale = []
+            for name in os.listdir(path):
+                pid = name[len(_FILE_PREFIX):-len('.json')]
+                if name.startswith(_FILE_PREFIX) and name.endswith('.json') and pid.isdigit():
+                    if (own_file and int(pid) == own) or (int(pid) != own and not _is_alive(int(pid))):
+                        stale.append(os.path.join(path, name))
+            if not stale:
+                return
+            result = ({}, {})
+            for filename in [terminated] + stale:
+                snapshot = _read(filename) if os.path.exists(filename) else None
+                if snapshot:
+                    _merge(result, snapshot)
+            _write(path, terminated, _to_snapshot(*result))
+            for filename in stale:
+                os.remove(filename)
+    except OSError as e:
+        LOGGER.warning('Could not merge the metrics of terminated processes in {}: {}'.format(path, e))
+
+
+def flush(force=False):
+    """Dump the metrics of this process to the directory shared by the processes.
+
+    Does nothing unless the ``path`` option of the ``metrics`` section is
+    set, nor if the metrics have been dumped less than ``flush_interval``
+    seconds ago.
+
+    :param force: dump the metrics anyway, e.g. before the process exits
+    """
+    global _flushed, _retired_previous
+    enabled, path, interval = _get_settings()
+    if not enabled or not path:
+        return
+    now = time.monotonic()
+    if not force and _flushed is not None and now - _flushed < interval:
+        return
+    _flushed = now
+
+    try:
+        os.makedirs(path, exist_ok=True)
+        if not _retired_previous:
+            _retire(path, own_file=True)
+            _retired_previous = True
+        _write(path, _metrics_file(path, os.getpid()), _snapshot())
+    except OSError as e:
+        LOGGER.warning('Could not write metrics to {}: {}'.format(path, e))
+
+
+def _flush_at_exit():
+    flush(force=True)
+
+
+atexit.register(_flush_at_exit)
+
+
+def collect():
+    """Aggregate the metrics of all processes.
+
+    :returns: durations and errors, dictionaries indexed by
+              ``(phase, operation, process)``
+    """
+    global _retired_previous
+    result = ({}, {})
+    _, path, _ = _get_settings()
+    own = _metrics_file(path, os.getpid()) if path else None
+    if path and os.path.isdir(path):
+        _retire(path, own_file=not _retired_previous)
+        _retired_previous = True
+        for name in sorted(os.listdir(path)):
+            filename = os.path.join(path, name)
+            if not name.startswith(_FILE_PREFIX) or not name.endswith('.json'):
+                continue
+            # our own metrics are up to date in memory
+            if filename != own:
+                snapshot = _read(filename)
+                if snapshot:
+                    _merge(result, snapshot)
+    _merge(result, _snapshot())
+    return result
+
+
+def _format_labels(key, **extra):
+    names = ('phase', 'operation', 'process')
+    items = list(zip(names, key)) + list(extra.items())
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for name, value in items)
+
+
+def render():
+    """Render the aggregated metrics in the Prometheus text exposition format."""
+    durations, errors = collect()
+    lines = [
+        '# HELP pywps_phase_duration_seconds Time spent in the phases of the request processing.',
+        '# TYPE pywps_phase_duration_seconds histogram',
+    ]
+    for key in sorted(durations):
+        values = durations[key]
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), values):
+            cumulative += count
+            lines.append('pywps_phase_duration_seconds_bucket{{{}}} {}'.format(
+                _format_labels(key, le=bound), cumulative))
+        lines.append('pywps_phase_duration_seconds_sum{{{}}} {}'.format(_format_labels(key), values[-1]))
+        lines.append('pywps_phase_duration_seconds_count{{{}}} {}'.format(_format_labels(key), cumulative))
+    lines += [
+        '# HELP pywps_phase_errors_total Phases of the request processing which raised an exception.',
+        '# TYPE pywps_phase_errors_total counter',
+    ]
+    for key in sorted(errors):
+        lines.append('pywps_phase_errors_total{{{}}} {}'.format(_format_labels(key), errors[key]))
+    return '\n'.join(lines) + '\n'
+
+
+@Request.application
+def application(http_request):
+    """WSGI application serving the metrics to a Prometheus scraper."""
+    return Response(render(), content_type=CONTENT_TYPE)
@@ -4,9 +4,20 @@
 ##################################################################
 import os
 
+from pywps import janitor, metrics
 from pywps.processing.job import Job
 
 
+def _run_job(process, method, wps_request, wps_response):
+    """Run the job in a child process, which exits without running the :mod:`atexit` handlers."""
+    try:
+        getattr(process, method)(wps_request, wps_response)
+    finally:
+        metrics.flush(force=True)
+        # the working directory is removed by the janitor thread, which dies with the process
+        janitor.shutdown()
+
+
 class Processing(object):
     """
     :class:`Processing` is an interface for running jobs.
@@ -31,8 +42,8 @@ class MultiProcessing(Processing):
     def start(self):
         import multiprocessing
         process = multiprocessing.Process(
-            target=getattr(self.job.process, self.job.method),
-            args=(self.job.wps_request, self.job.wps_response)
+            target=_run_job,
+            args=(self.job.process, self.job.method, self.job.wps_request, self.job.wps_response)
         )
         process.start()
 
@@ -59,7 +70,7 @@ class DetachProcessing(Processing):
 
         # We are the detached child, run the actual process
         try:
-            getattr(self.job.process, self.job.method)(self.job.wps_request, self.job.wps_response)
+            _run_job(self.job.process, self.job.method, self.job.wps_request, self.job.wps_response)
         except Exception:
             pass
         # Ensure to stop ourself here what ever append.
@@ -9,7 +9,7 @@ import os
 import tempfile
 
 import pywps.configuration as config
-from pywps import Process, WPSRequest
+from pywps import Process, WPSRequest, serializer
 from pywps.response.execute import ExecuteResponse
 
 LOGGER = logging.getLogger("PYWPS")
@@ -46,7 +46,7 @@ class Job(object):
             'wps_request': self.wps_request.json,
         }
 
-        return json.dumps(obj, allow_nan=False)
+        return serializer.dumps(obj, allow_nan=False)
 
     @classmethod
     def from_json(cls, value):
@@ -1,7 +1,17 @@
-
+import logging
 import os
+import threading
+
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
+
+import pywps.configuration as config
+from pywps.translations import get_translation
 
-from jinja2 import Environment
+LOGGER = logging.getLogger("PYWPS")
+
+# environment of the response templates, shared by all the responses
+_template_env = None
+_template_env_lock = threading.Lock()
 
 
 class RelEnvironment(Environment):
@@ -10,8 +20,45 @@ class RelEnvironment(Environment):
         return os.path.dirname(parent) + '/' + template
 
 
+def get_template_env():
+    """Get the Jinja environment of the response templates, built on first use.
+
+    Compiled templates are kept in memory, the templates of the package are
+    not checked for changes. They are also cached as bytecode in the
+    ``template_cache_path`` directory of the ``server`` section, so that new
+    worker processes do not compile them again.
+    """
+    global _template_env
+    if _template_env is None:
+        with _template_env_lock:
+            if _template_env is None:
+                cache_path = config.get_config_value('server', 'template_cache_path')
+                if cache_path:
+                    os.makedirs(cache_path, exist_ok=True)
+                template_env = RelEnvironment(
+                    loader=PackageLoader('pywps', 'templates'),
+                    trim_blocks=True, lstrip_blocks=True,
+                    autoescape=True,
+                    auto_reload=False,
+                    # the default directory is private to the user, in the temporary directory
+                    bytecode_cache=FileSystemBytecodeCache(cache_path or None),
+                )
+                template_env.globals.update(get_translation=get_translation)
+                _template_env = template_env
+    return _template_env
+
+
+def precompile_templates():
+    """Compile all the response templates, so that the first requests do not wait for it."""
+    template_env = get_template_env()
+    for name in template_env.list_templates(extensions=['xml']):
+        template_env.get_template(name)
+    LOGGER.debug('Response templates compiled')
+
+
 def get_response(operation):
 
+    from .batch import BatchResponse
     from .capabilities import CapabilitiesResponse
     from .describe import DescribeResponse
     from .execute import ExecuteResponse
@@ -22,3 +69,5 @@ def get_response(operation):
         return DescribeResponse
     elif operation == "execute":
         return ExecuteResponse
+    elif operation == "batch":
+        return BatchResponse
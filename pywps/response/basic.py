@@ -4,14 +4,9 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pywps import WPSRequest
 
-import os
-
-from jinja2 import Environment, PackageLoader
-
 from pywps.dblog import store_status
-from pywps.translations import get_translation
 
-from . import RelEnvironment
+from . import get_template_env
 from .status import WPS_STATUS
 
 
@@ -26,13 +21,9 @@ class WPSResponse(object):
         self.status_percentage = 0
         self.doc = None
         self.content_type = None
+        self.headers = {}
         self.version = version
-        self.template_env = RelEnvironment(
-            loader=PackageLoader('pywps', 'templates'),
-            trim_blocks=True, lstrip_blocks=True,
-            autoescape=True,
-        )
-        self.template_env.globals.update(get_translation=get_translation)
+        self.template_env = get_template_env()
 
     def _update_status(self, status, message, status_percentage):
         """
@@ -0,0 +1,108 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import logging
+
+from werkzeug.wrappers import Request
+
+from pywps import serializer
+from pywps.app.basic import get_json_indent, make_response
+from pywps.exceptions import NoApplicableCode
+from pywps.response.status import WPS_STATUS
+
+from .basic import WPSResponse
+from .execute import ExecuteResponse
+
+LOGGER = logging.getLogger("PYWPS")
+
+
+class BatchItemResponse(ExecuteResponse):
+    """Response to one input set of a batch Execute request
+
+    The status is neither stored in the database nor rendered while the
+    handler runs. Once the input set succeeded or failed, ``doc`` is the
+    JSON object of a JSON Execute response.
+    """
+
+    def __init__(self, wps_request, uuid, **kwargs):
+        super(BatchItemResponse, self).__init__(wps_request, uuid, **kwargs)
+        self.exception = None
+        # nothing to write, progress updates go through _update_status
+        self._status_interval = 0
+
+    def _update_status(self, status, message, status_percentage, clean=True):
+        self.message = message
+        self.status = status
+        self.status_percentage = status_percentage
+        if self.status == WPS_STATUS.SUCCEEDED or self.status == WPS_STATUS.FAILED:
+            self._update_status_doc()
+            if clean:
+                self.process.clean()
+
+    def fail(self, exception):
+        """Fail the input set with an exception raised before the handler runs.
+
+        :param pywps.exceptions.NoApplicableCode exception: e.g. a missing input
+        """
+        self.exception = exception
+        self._update_status(WPS_STATUS.FAILED, exception.description, 100)
+
+    def _process_failed(self):
+        data = super(BatchItemResponse, self)._process_failed()
+        if self.exception is not None:
+            data.update({
+                "code": self.exception.name,
+                "locator": self.exception.locator or "None",
+            })
+        return data
+
+    def _construct_doc(self):
+        self._preprocess_outputs()
+        if self.status == WPS_STATUS.SUCCEEDED:
+            status, outputs = self._process_succeeded(), [self.outputs[o].json for o in self.outputs]
+        else:
+            status, outputs = self._process_failed(), []
+        return self._render_json_response({'status': status, 'process': {'outputs': outputs}}), 'application/json'
+
+
+class BatchResponse(WPSResponse):
+    """Aggregated response to a batch Execute request, with a result per input set."""
+
+    def __init__(self, wps_request, uuid, **kwargs):
+        super(BatchResponse, self).__init__(wps_request, uuid)
+
+        self.process = kwargs["process"]
+        self.items = []
+
+    def add_item(self, wps_request, process):
+        """Add the response to an input set.
+
+        :param wps_request: request of the input set
+        :param process: copy of the process running the input set
+        :returns: :class:`BatchItemResponse`
+        """
+        item = BatchItemResponse(wps_request, self.uuid, process=process)
+        self.items.append(item)
+        return item
+
+    @property
+    def json(self):
+        succeeded = sum(1 for item in self.items if item.status == WPS_STATUS.SUCCEEDED)
+        return {
+            'identifier': self.process.identifier,
+            'succeeded': succeeded,
+            'failed': len(self.items) - succeeded,
+            'results': [item.doc for item in self.items],
+        }
+
+    def _construct_doc(self):
+        doc = serializer.dumps(self.json, indent=get_json_indent())
+        return doc, 'application/json'
+
+    @Request.application
+    def __call__(self, request):
+        if not self.doc:
+            return NoApplicableCode("Output was not generated")
+        return make_response(self.doc, content_type=self.content_type, headers=self.headers, http_request=request)
@@ -1,9 +1,8 @@
-import json
 
 from werkzeug.wrappers import Request
 
 import pywps.configuration as config
-from pywps import __version__
+from pywps import __version__, serializer
 from pywps.app.basic import get_json_indent, get_response_type, make_response
 from pywps.exceptions import NoApplicableCode
 
@@ -17,13 +16,15 @@ class CapabilitiesResponse(WPSResponse):
         super(CapabilitiesResponse, self).__init__(wps_request, uuid, version)
 
         self.processes = kwargs["processes"]
+        # rendered documents by (version, language, mimetype)
+        self.cache = kwargs.get("cache")
 
     @property
     def json(self):
         """Convert the response to JSON structure
         """
 
-        processes = [p.json for p in self.processes.values()]
+        processes = [self.processes.description(identifier) for identifier in self.processes]
         return {
             'pywps_version': __version__,
             'version': self.version,
@@ -68,14 +69,20 @@ class CapabilitiesResponse(WPSResponse):
         return jdoc
 
     def _construct_doc(self):
-        doc = self.json
         json_response, mimetype = get_response_type(
             self.wps_request.http_request.accept_mimetypes, self.wps_request.default_mimetype)
+        key = (self.version, self.wps_request.language, mimetype)
+        if self.cache is not None and key in self.cache:
+            return self.cache[key], mimetype
+
+        doc = self.json
         if json_response:
-            doc = json.dumps(self._render_json_response(doc), indent=get_json_indent())
+            doc = serializer.dumps(self._render_json_response(doc), indent=get_json_indent())
         else:
             template = self.template_env.get_template(self.version + '/capabilities/main.xml')
             doc = template.render(**doc)
+        if self.cache is not None:
+            self.cache[key] = doc
         return doc, mimetype
 
     @Request.application
@@ -83,7 +90,7 @@ class CapabilitiesResponse(WPSResponse):
         # This function must return a valid response.
         try:
             doc, content_type = self.get_response_doc()
-            return make_response(doc, content_type=content_type)
+            return make_response(doc, content_type=content_type, headers=self.headers, http_request=request)
         except NoApplicableCode as e:
             return e
         except Exception as e:
@@ -1,9 +1,8 @@
-import json
 
 from werkzeug.wrappers import Request
 
 import pywps.configuration as config
-from pywps import __version__
+from pywps import __version__, serializer
 from pywps.app.basic import get_json_indent, get_response_type, make_response
 from pywps.exceptions import (
     InvalidParameterValue,
@@ -24,25 +23,27 @@ class DescribeResponse(WPSResponse):
         if "identifiers" in kwargs:
             self.identifiers = kwargs["identifiers"]
         self.processes = kwargs["processes"]
+        # rendered process descriptions by (identifier, version, language, mimetype)
+        self.cache = kwargs.get("cache")
 
-    @property
-    def json(self):
-
-        processes = []
+    def _get_identifiers(self):
+        """Return the identifiers of the requested processes."""
 
         if 'all' in (ident.lower() for ident in self.identifiers):
-            processes = (self.processes[p].json for p in self.processes)
-        else:
-            for identifier in self.identifiers:
-                if identifier not in self.processes:
-                    msg = "Unknown process {}".format(identifier)
-                    raise InvalidParameterValue(msg, "identifier")
-                else:
-                    processes.append(self.processes[identifier].json)
+            return list(self.processes)
+
+        for identifier in self.identifiers:
+            if identifier not in self.processes:
+                msg = "Unknown process {}".format(identifier)
+                raise InvalidParameterValue(msg, "identifier")
+        return self.identifiers
+
+    @property
+    def json(self):
 
         return {
             'pywps_version': __version__,
-            'processes': processes,
+            'processes': [self.processes[identifier].json for identifier in self._get_identifiers()],
             'language': self.wps_request.language,
         }
 
@@ -50,19 +51,43 @@ class DescribeResponse(WPSResponse):
     def _render_json_response(jdoc):
         return jdoc
 
+    def _describe_process(self, identifier, json_response, mimetype):
+        """Return the description of one process, either the JSON object or the XML fragment.
+
+        Descriptions are rendered only once if the response has a cache.
+        """
+        process = self.processes[identifier]
+        key = (identifier, process.version, self.wps_request.language, mimetype)
+        if self.cache is not None and key in self.cache:
+            return self.cache[key]
+
+        description = process.json
+        if not json_response:
+            template = self.template_env.get_template(self.version + '/describe/process.xml')
+            max_size = int(config.get_size_mb(config.get_config_value('server', 'maxsingleinputsize')))
+            description = template.render(process=description, language=self.wps_request.language,
+                                          max_size=max_size)
+        if self.cache is not None:
+            self.cache[key] = description
+        return description
+
     def _construct_doc(self):
         if not self.identifiers:
             raise MissingParameterValue('Missing parameter value "identifier"', 'identifier')
 
-        doc = self.json
         json_response, mimetype = get_response_type(
             self.wps_request.http_request.accept_mimetypes, self.wps_request.default_mimetype)
+        doc = {
+            'pywps_version': __version__,
+            'processes': [self._describe_process(identifier, json_response, mimetype)
+                          for identifier in self._get_identifiers()],
+            'language': self.wps_request.language,
+        }
         if json_response:
-            doc = json.dumps(self._render_json_response(doc), indent=get_json_indent())
+            doc = serializer.dumps(self._render_json_response(doc), indent=get_json_indent())
         else:
             template = self.template_env.get_template(self.version + '/describe/main.xml')
-            max_size = int(config.get_size_mb(config.get_config_value('server', 'maxsingleinputsize')))
-            doc = template.render(max_size=max_size, **doc)
+            doc = template.render(**doc)
         return doc, mimetype
 
     @Request.application
@@ -70,7 +95,7 @@ class DescribeResponse(WPSResponse):
         # This function must return a valid response.
         try:
             doc, content_type = self.get_response_doc()
-            return make_response(doc, content_type=content_type)
+            return make_response(doc, content_type=content_type, headers=self.headers, http_request=request)
         except NoApplicableCode as e:
             return e
         except Exception as e:
@@ -3,23 +3,38 @@
 # licensed under MIT, Please consult LICENSE.txt for details     #
 ##################################################################
 
-import json
+import io
 import logging
+import os
+import threading
 import time
 import urllib.parse as urlparse
+import uuid as _uuid
+import zlib
 from urllib.parse import urlencode
 
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import (
+    http_date,
+    is_resource_modified,
+    parse_date,
+    parse_etags,
+    parse_if_range_header,
+    parse_range_header,
+)
 from werkzeug.wrappers import Request, Response
+from werkzeug.wsgi import wrap_file
 
 import pywps.configuration as config
-from pywps import get_ElementMakerForVersion
+from pywps import get_ElementMakerForVersion, metrics, serializer, status_writer
+from pywps.compression import CHUNK_SIZE, compress_response
 from pywps.app.basic import (
     get_default_response_mimetype,
     get_json_indent,
     get_response_type,
 )
+from pywps.dblog import store_status
 from pywps.exceptions import NoApplicableCode
-from pywps.inout.array_encode import ArrayEncoder
 from pywps.inout.formats import FORMATS
 from pywps.response.status import WPS_STATUS
 
@@ -30,6 +45,91 @@ LOGGER = logging.getLogger("PYWPS")
 WPS, OWS = get_ElementMakerForVersion("1.0.0")
 
 
+class _OutputFile(io.FileIO):
+    """Output file of a raw response, calls `on_close` once it is closed."""
+
+    def __init__(self, name, on_close=None):
+        super(_OutputFile, self).__init__(name, 'rb')
+        self._on_close = on_close
+
+    def close(self):
+        try:
+            super(_OutputFile, self).close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class _LazyOutputs(object):
+    """JSON of the outputs of a streamed document, built one output at a time
+    while the document is rendered.
+    """
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def __iter__(self):
+        return (output.json for output in self.outputs.values())
+
+
+def _buffered(chunks, size=CHUNK_SIZE):
+    """Join the small `chunks` rendered by a template in pieces of about `size` characters."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _file_etag(filename, stat):
+    """Strong ETag of a file, from its name, size and modification time.
+
+    The outputs written in the working directory of each execution get a new
+    name, even if the inode of a removed one is reused.
+    """
+    return '{:x}-{:x}-{:x}'.format(zlib.adler32(os.fsencode(filename)), stat.st_size, stat.st_mtime_ns)
+
+
+def _if_range_matches(environ, etag, last_modified):
+    """Whether the ``If-Range`` condition of the request holds, it does without the header."""
+    if_range = parse_if_range_header(environ.get('HTTP_IF_RANGE'))
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == parse_date(last_modified)
+    return True
+
+
+def _multiple_ranges(environ, length):
+    """Byte ranges of a request for several ranges of a content of `length` bytes.
+
+    :returns: list of (start, stop) tuples of the satisfiable ranges, None if
+        the request does not ask for several ranges
+    """
+    byte_range = parse_range_header(environ.get('HTTP_RANGE'))
+    if byte_range is None or len(byte_range.ranges) < 2:
+        return None
+    ranges = []
+    for start, stop in byte_range.ranges:
+        if start < 0:
+            start, stop = max(length + start, 0), length
+        elif stop is None or stop > length:
+            stop = length
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
 class ExecuteResponse(WPSResponse):
 
     def __init__(self, wps_request, uuid, **kwargs):
@@ -45,6 +145,19 @@ class ExecuteResponse(WPSResponse):
         self.process = kwargs["process"]
         self.outputs = {o.identifier: o for o in self.process.outputs}
         self.store_status_file = False
+        # rendered head of the XML status documents, with the process description
+        self._xml_head = None
+        # progress updates are written in the background, at most once per interval
+        self._status_interval = float(config.get_config_value('server', 'status_update_interval') or 0)
+        self._status_written = 0.0
+        # _status_lock guards the status while it is read by the writer,
+        # _write_lock keeps the writes in order
+        self._status_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # the working directory is removed once the raw output file has been sent
+        self._clean_on_close = False
+        # the final document is rendered while it is sent, see _generate_doc
+        self._stream_doc = False
 
     # override WPSResponse._update_status
     def _update_status(self, status, message, status_percentage, clean=True):
@@ -55,15 +168,29 @@ class ExecuteResponse(WPSResponse):
         * Updates the status file (if requested).
         * Cleans the working directory when process has finished.
 
-        This method is *only* called by pywps internally.
+        This method is *only* called by pywps internally. The status is
+        written at once, a pending progress update is dropped.
         """
-        super(ExecuteResponse, self)._update_status(status, message, status_percentage)
-        LOGGER.debug("_update_status: status={}, clean={}".format(status, clean))
-        self._update_status_doc()
-        if self.store_status_file:
-            self._update_status_file()
+        with self._write_lock:
+            status_writer.discard(self)
+            # a streamed document is only rendered once the status is stored,
+            # what could fail it is done before
+            stream_doc = self._can_stream_doc(status)
+            if stream_doc:
+                self._prepare_stream_doc()
+            super(ExecuteResponse, self)._update_status(status, message, status_percentage)
+            LOGGER.debug("_update_status: status={}, clean={}".format(status, clean))
+            self._stream_doc = stream_doc
+            self._update_status_doc()
+            if self.store_status_file:
+                self._update_status_file()
+            self._status_written = time.monotonic()
         if clean:
-            if self.status == WPS_STATUS.SUCCEEDED or self.status == WPS_STATUS.FAILED:
+            if self.status == WPS_STATUS.SUCCEEDED and self._served_in_process() \
+                    and (self._stream_doc or self._raw_file_output() is not None):
+                LOGGER.debug("clean workdir once the response is sent")
+                self._clean_on_close = True
+            elif self.status == WPS_STATUS.SUCCEEDED or self.status == WPS_STATUS.FAILED:
                 LOGGER.debug("clean workdir: status={}".format(status))
                 self.process.clean()
 
@@ -74,15 +201,96 @@ class ExecuteResponse(WPSResponse):
         This method is *only* called by the user provided process.
         The status is handled internally in pywps.
 
+        The update is stored in the background, rapid updates are coalesced
+        to one write every ``status_update_interval`` seconds.
+
         :param str message: Message you need to share with the client
         :param int status_percentage: Percent done (number betwen <0-100>)
         """
         if status_percentage is None:
             status_percentage = self.status_percentage
-        self._update_status(self.status, message, status_percentage, False)
+        if self._status_interval <= 0:
+            self._update_status(self.status, message, status_percentage, False)
+            return
+        with self._status_lock:
+            self.message = message
+            self.status_percentage = status_percentage
+        status_writer.submit(self, self._status_interval)
+
+    def _write_status(self):
+        """Store the current status, called by the status writer.
+
+        The write may have been taken by the writer before the final status
+        discarded it, the final status is kept.
+        """
+        with self._write_lock:
+            if self.status in (WPS_STATUS.SUCCEEDED, WPS_STATUS.FAILED):
+                return
+            with self._status_lock:
+                status, message, status_percentage = self.status, self.message, self.status_percentage
+                self._update_status_doc()
+            store_status(self.uuid, status, message, status_percentage)
+            if self.store_status_file:
+                self._update_status_file()
+            self._status_written = time.monotonic()
+
+    def _served_in_process(self):
+        """Whether the response is sent by this process once the execution is done.
+
+        The responses to asynchronous executions are sent before, only the
+        status file is written once they are done.
+        """
+        return not self.store_status_file and not getattr(self.process, 'async_', False)
+
+    def _raw_file_output(self):
+        """The output of a raw response when it is a file, which is sent
+        without reading it, None otherwise.
+        """
+        if not getattr(self.wps_request, 'raw', False):
+            return None
+        output = self.outputs.get(next(iter(self.wps_request.outputs), None))
+        if getattr(output, 'prop', None) == 'file':
+            return output
+        return None
+
+    def _can_stream_doc(self, status):
+        """Whether the final XML document, of the response with `status`, can
+        be rendered while it is sent, instead of being built in memory.
+
+        It can when the document is only sent to the client: not stored
+        as status file nor in the result cache.
+        """
+        if status != WPS_STATUS.SUCCEEDED or not self._served_in_process() or getattr(self.wps_request, 'raw', False) \
+                or self.process.cache_key is not None \
+                or not config.get_config_value('server', 'stream_execute_response'):
+            return False
+        return not self._response_type()[0]
+
+    def _prepare_stream_doc(self):
+        """Preprocess the outputs of a streamed document and check that their
+        files can be read.
+
+        The process fails here, instead of sending a truncated document.
+        """
+        try:
+            self._preprocess_outputs(WPS_STATUS.SUCCEEDED)
+            for output in self.outputs.values():
+                if getattr(output, 'prop', None) == 'file':
+                    with open(output.file, 'rb'):
+                        pass
+        except Exception as e:
+            raise NoApplicableCode('Building Response Document failed with : {}'.format(e))
 
     def _update_status_doc(self):
+        if self._stream_doc:
+            self.doc, self.content_type = None, self._response_type()[1]
+            return
         try:
+            if getattr(self.wps_request, 'raw', False) and self.status == WPS_STATUS.SUCCEEDED \
+                    and not self.store_status_file:
+                # the response is the output itself, the document would read the outputs into memory
+                self._preprocess_outputs()
+                return
             # rebuild the doc
             self.doc, self.content_type = self._construct_doc()
         except Exception as e:
@@ -153,33 +361,61 @@ class ExecuteResponse(WPSResponse):
         url_parts[4] = urlencode(query)
         return urlparse.urlunparse(url_parts).replace("&", "&amp;")
 
-    @property
-    def json(self):
+    def _head_json(self, describe_io=True):
+        """The parts of the document which do not change while the process runs.
+
+        :param bool describe_io: include the JSON of the inputs and outputs
+            in the description of the process, the XML documents do not use them
+        """
+        if describe_io:
+            process = self.process.json
+        else:
+            process = {key: getattr(self.process, key)
+                       for key in ('identifier', 'title', 'abstract', 'version', 'profile', 'translations')}
         data = {
             "language": self.wps_request.language,
             "service_instance": self._get_serviceinstance(),
-            "process": self.process.json
+            "process": process
         }
 
         if self.store_status_file:
             if self.process.status_location:
                 data["status_location"] = self.process.status_url
+        return data
 
+    def _status_json(self):
         if self.status == WPS_STATUS.ACCEPTED:
             self.message = 'PyWPS Process {} accepted'.format(self.process.identifier)
-            data["status"] = self._process_accepted()
+            return self._process_accepted()
         elif self.status == WPS_STATUS.STARTED:
-            data["status"] = self._process_started()
+            return self._process_started()
         elif self.status == WPS_STATUS.FAILED:
             # check if process failed and display fail message
-            data["status"] = self._process_failed()
+            return self._process_failed()
         elif self.status == WPS_STATUS.PAUSED:
             # TODO: handle paused status
-            data["status"] = self._process_paused()
+            return self._process_paused()
         elif self.status == WPS_STATUS.SUCCEEDED:
-            data["status"] = self._process_succeeded()
+            return self._process_succeeded()
+
+    @property
+    def json(self):
+        return self._json()
+
+    def _json(self, lazy_outputs=False):
+        """The document as dictionary.
+
+        :param bool lazy_outputs: the JSON of the outputs is only built
+            while they are iterated, see :class:`_LazyOutputs`
+        """
+        data = self._head_json(describe_io=not lazy_outputs)
+        status = self._status_json()
+        if status is not None:
+            data["status"] = status
+        if self.status == WPS_STATUS.SUCCEEDED:
             # Process outputs XML
-            data["outputs"] = [self.outputs[o].json for o in self.outputs]
+            data["outputs"] = _LazyOutputs(self.outputs) if lazy_outputs else \
+                [self.outputs[o].json for o in self.outputs]
         # lineage: add optional lineage when process has finished
         if self.status in [WPS_STATUS.SUCCEEDED, WPS_STATUS.FAILED]:
             # DataInputs and DataOutputs definition XML if lineage=true
@@ -192,7 +428,8 @@ class ExecuteResponse(WPSResponse):
                 except Exception as e:
                     LOGGER.error("Failed to update lineage for input parameter. {}".format(e))
 
-                data["output_definitions"] = [self.outputs[o].json for o in self.outputs]
+                data["output_definitions"] = _LazyOutputs(self.outputs) if lazy_outputs else \
+                    [self.outputs[o].json for o in self.outputs]
         return data
 
     @staticmethod
@@ -212,27 +449,76 @@ class ExecuteResponse(WPSResponse):
         response['outputs'] = d
         return response
 
-    def _construct_doc(self):
-        if self.status == WPS_STATUS.SUCCEEDED and \
+    def _preprocess_outputs(self, status=None):
+        """Apply the ``preprocess_response`` of the request to the outputs.
+
+        :param status: status of the response, the current one by default
+        """
+        if (self.status if status is None else status) == WPS_STATUS.SUCCEEDED and \
                 hasattr(self.wps_request, 'preprocess_response') and \
                 self.wps_request.preprocess_response:
             self.outputs = self.wps_request.preprocess_response(self.outputs,
                                                                 request=self.wps_request,
                                                                 http_request=self.wps_request.http_request)
-        doc = self.json
+
+    def _construct_status_xml(self):
+        """Render the XML document of a running process.
+
+        The head, with the process description, is rendered once, only the
+        status is rendered for each update. The document is the same as the
+        one of the ``execute/main.xml`` template, which includes the same
+        templates.
+        """
+        key = (self.store_status_file, self.wps_request.language)
+        if self._xml_head is None or self._xml_head[0] != key:
+            template = self.template_env.get_template(self.version + '/execute/process.xml')
+            self._xml_head = key, template.render(**self._head_json())
+        template = self.template_env.get_template(self.version + '/execute/status.xml')
+        status = template.render(status=self._status_json(), language=self.wps_request.language)
+        # no lineage nor outputs before the process has finished
+        return '{}\n{}\n</wps:ExecuteResponse>'.format(self._xml_head[1], status)
+
+    def _response_type(self):
+        """Whether the document is JSON, and its mimetype."""
         try:
-            json_response, mimetype = get_response_type(
-                self.wps_request.http_request.accept_mimetypes, self.wps_request.default_mimetype)
+            return get_response_type(self.wps_request.http_request.accept_mimetypes, self.wps_request.default_mimetype)
         except Exception:
             mimetype = get_default_response_mimetype()
-            json_response = 'json' in mimetype
+            return 'json' in mimetype, mimetype
+
+    @metrics.timed('render')
+    def _construct_doc(self):
+        self._preprocess_outputs()
+        json_response, mimetype = self._response_type()
+        if self.status in (WPS_STATUS.ACCEPTED, WPS_STATUS.STARTED, WPS_STATUS.PAUSED):
+            # status updates of a running process, only the status changes
+            if not json_response:
+                return self._construct_status_xml(), mimetype
+            doc = {'status': self._status_json(), 'process': {'outputs': [o.json for o in self.process.outputs]}}
+            return serializer.dumps(self._render_json_response(doc), indent=get_json_indent()), mimetype
+        doc = self.json
         if json_response:
-            doc = json.dumps(self._render_json_response(doc), cls=ArrayEncoder, indent=get_json_indent())
+            doc = serializer.dumps(self._render_json_response(doc), indent=get_json_indent())
         else:
             template = self.template_env.get_template(self.version + '/execute/main.xml')
             doc = template.render(**doc)
         return doc, mimetype
 
+    def _generate_doc(self):
+        """Render the final XML document in chunks, while it is sent.
+
+        The outputs are read one at a time, only the data of one inline
+        output is in memory instead of the whole document. The outputs are
+        preprocessed already, see :meth:`_prepare_stream_doc`.
+        """
+        template = self.template_env.get_template(self.version + '/execute/main.xml')
+        try:
+            yield from _buffered(template.generate(**self._json(lazy_outputs=True)))
+        except Exception:
+            # the headers are sent already, the client gets a truncated document
+            LOGGER.exception('Rendering the response of {} failed'.format(self.uuid))
+            raise
+
     @Request.application
     def __call__(self, request):
         accept_json_response, accepted_mimetype = get_response_type(
@@ -243,8 +529,10 @@ class ExecuteResponse(WPSResponse):
             else:
                 wps_output_identifier = next(iter(self.wps_request.outputs))  # get the first key only
                 wps_output_value = self.outputs[wps_output_identifier]
-                response = wps_output_value.data
-                if response is None:
+                # files are sent as they are, without reading them into memory
+                file_output = self._raw_file_output() is wps_output_value
+                response = None if file_output else wps_output_value.data
+                if response is None and not file_output:
                     return NoApplicableCode("Expected output was not generated")
                 suffix = ''
                 # if isinstance(wps_output_value, ComplexOutput):
@@ -262,22 +550,107 @@ class ExecuteResponse(WPSResponse):
                 else:
                     # like LitearlOutput
                     mimetype = self.wps_request.outputs[wps_output_identifier].get('mimetype', None)
-                if not isinstance(response, (str, bytes, bytearray)):
+                if not file_output and not isinstance(response, (str, bytes, bytearray)):
                     if not mimetype:
                         mimetype = accepted_mimetype
                     json_response = mimetype and 'json' in mimetype
                     if json_response:
                         mimetype = 'application/json'
                         suffix = '.json'
-                        response = json.dumps(response, cls=ArrayEncoder, indent=get_json_indent())
+                        response = serializer.dumps(response, indent=get_json_indent())
                     else:
                         response = str(response)
                 if not mimetype:
                     mimetype = None
-                return Response(response, mimetype=mimetype,
-                                headers={'Content-Disposition': 'attachment; filename="{}"'
-                                         .format(wps_output_identifier + suffix)})
+                headers = {'Content-Disposition': 'attachment; filename="{}"'.format(wps_output_identifier + suffix)}
+                if file_output:
+                    return self._file_response(request, wps_output_value.file, mimetype, headers)
+                return compress_response(Response(response, mimetype=mimetype, headers=headers), request)
         else:
+            if self._stream_doc:
+                response = Response(self._generate_doc(), mimetype=accepted_mimetype)
+                if self._clean_on_close:
+                    response.call_on_close(self.process.clean)
+                return compress_response(response, request)
             if not self.doc:
                 return NoApplicableCode("Output was not generated")
-            return Response(self.doc, mimetype=accepted_mimetype)
+            return compress_response(Response(self.doc, mimetype=accepted_mimetype), request)
+
+    def _file_response(self, request, filename, mimetype, headers):
+        """Response streaming the file `filename`, with the ``wsgi.file_wrapper``
+        of the server if there is one, so that it can use ``sendfile``.
+
+        GET requests can be conditional (``If-None-Match``,
+        ``If-Modified-Since``) and ask for one or several byte ranges,
+        ``If-Range`` is compared with the ``ETag`` or ``Last-Modified`` of the
+        file. A not modified file is a 304 response, even for range requests.
+        """
+        on_close = self.process.clean if self._clean_on_close else None
+        try:
+            output_file = _OutputFile(filename, on_close)
+        except OSError as e:
+            LOGGER.error('Output file {} cannot be read: {}'.format(filename, e))
+            if on_close is not None:
+                on_close()
+            return NoApplicableCode("Expected output was not generated")
+        stat = os.fstat(output_file.fileno())
+        etag = _file_etag(filename, stat)
+        headers = dict(headers, **{'ETag': '"{}"'.format(etag), 'Last-Modified': http_date(stat.st_mtime)})
+        environ = request.environ
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD') and \
+                not is_resource_modified(environ, etag=etag, last_modified=headers['Last-Modified']):
+            # the conditional headers are evaluated before the Range header
+            output_file.close()
+            status = 412 if parse_etags(environ.get('HTTP_IF_MATCH')) else 304
+            return Response(status=status, headers=headers)
+        if environ['REQUEST_METHOD'] == 'GET' and stat.st_size and \
+                _if_range_matches(environ, etag, headers['Last-Modified']):
+            ranges = _multiple_ranges(environ, stat.st_size)
+            if ranges == []:
+                output_file.close()
+                return RequestedRangeNotSatisfiable(length=stat.st_size)
+            if ranges:
+                return self._multipart_response(output_file, ranges, stat.st_size, mimetype,
+                                                dict(headers, **{'Accept-Ranges': 'bytes'}))
+
+        response = Response(wrap_file(environ, output_file), mimetype=mimetype, headers=headers,
+                            direct_passthrough=True)
+        response.content_length = stat.st_size
+        try:
+            # single range and conditional requests
+            response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+        except RequestedRangeNotSatisfiable as e:
+            response.close()
+            return e
+        return response
+
+    @staticmethod
+    def _multipart_response(output_file, ranges, length, mimetype, headers):
+        """``multipart/byteranges`` response with the `ranges` of `output_file`."""
+        boundary = _uuid.uuid4().hex
+        part_headers = [
+            '--{}\r\nContent-Type: {}\r\nContent-Range: bytes {}-{}/{}\r\n\r\n'.format(
+                boundary, mimetype or 'application/octet-stream', start, stop - 1, length).encode('latin-1')
+            for start, stop in ranges]
+        end = '--{}--\r\n'.format(boundary).encode('latin-1')
+
+        def parts():
+            for part_header, (start, stop) in zip(part_headers, ranges):
+                yield part_header
+                output_file.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    chunk = output_file.read(min(remaining, 64 * 1024))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+                yield b'\r\n'
+            yield end
+
+        response = Response(parts(), status=206, headers=headers,
+                            content_type='multipart/byteranges; boundary={}'.format(boundary))
+        response.content_length = sum(len(part_header) + stop - start + 2
+                                      for part_header, (start, stop) in zip(part_headers, ranges)) + len(end)
+        response.call_on_close(output_file.close)
+        return response
@@ -0,0 +1,285 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Cache of the execution results of deterministic processes
+
+Processes created with ``cacheable=True`` answer an Execute request, which
+is the same as a previous successful one, with the response document of
+that execution, without running the handler again. Requests are the same
+when they have the same hash, see :func:`request_key`, which covers the
+process, the inputs and the requested outputs and response.
+
+The documents are written with the storage of the server, see
+:class:`pywps.inout.storage.builder.StorageBuilder`, and indexed in the
+database. They expire after the ``cache_ttl`` of the process, and the least
+recently used ones are removed when the documents exceed the
+``result_cache_size`` option of the ``server`` section. Output files stored
+by reference are not removed.
+
+Raw outputs (``RawDataOutput``) and stored (asynchronous) executions are
+not cached.
+"""
+
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import requests
+from sqlalchemy import func
+
+import pywps.configuration as config
+from pywps import dblog, metrics
+from pywps.app.basic import get_response_type
+from pywps.inout.formats import FORMATS
+from pywps.inout.inputs import BoundingBoxInput, ComplexInput
+from pywps.inout.prefetch import Prefetcher, iter_inputs
+from pywps.inout.storage.builder import StorageBuilder
+
+LOGGER = logging.getLogger("PYWPS")
+
+CHUNK_SIZE = 64 * 1024
+
+#: seconds to wait for the ``HEAD`` request validating a reference
+HEAD_TIMEOUT = 2
+#: number of concurrent ``HEAD`` requests when the prefetching of the inputs is disabled
+HEAD_WORKERS = 4
+#: number of references whose validators are kept
+VALIDATORS_SIZE = 1024
+#: number of cached results removed per query when evicting
+EVICT_BATCH = 100
+
+# validators of the references by URL: (time they expire, validator or None)
+_validators = collections.OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def max_size():
+    """Get the maximal size of the cached documents in bytes, 0 when the cache is disabled."""
+    return int(config.get_size_mb(config.get_config_value('server', 'result_cache_size') or '0') * 1024 * 1024)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _head_validator(url):
+    """Get the ``ETag`` or ``Last-Modified`` header of `url`, None when there is none."""
+    try:
+        head = requests.head(url, allow_redirects=True, timeout=HEAD_TIMEOUT)
+        if head.ok:
+            for header in ('ETag', 'Last-Modified'):
+                if head.headers.get(header):
+                    return [header, head.headers[header], head.headers.get('Content-Length')]
+    except requests.RequestException as e:
+        LOGGER.debug('HEAD {} failed: {}'.format(url, e))
+    return None
+
+
+def _get_validator(url):
+    """Get the validator of `url`, the answers of the server are kept for
+    ``result_cache_reference_ttl`` seconds.
+    """
+    ttl = float(config.get_config_value('server', 'result_cache_reference_ttl') or 0)
+    now = time.monotonic()
+    with _validators_lock:
+        cached = _validators.get(url)
+        if cached is not None and cached[0] > now:
+            _validators.move_to_end(url)
+            return cached[1]
+    validator = _head_validator(url)
+    if ttl > 0:
+        with _validators_lock:
+            _validators[url] = (now + ttl, validator)
+            _validators.move_to_end(url)
+            while len(_validators) > VALIDATORS_SIZE:
+                _validators.popitem(last=False)
+    return validator
+
+
+def _get_validators(inputs):
+    """Get the validators of the references of `inputs` which are fetched
+    with ``GET``, the ``HEAD`` requests are sent concurrently.
+
+    :returns: dictionary of the validators by URL
+    """
+    urls = sorted({inpt.url for inpt in inputs
+                   if isinstance(inpt, ComplexInput) and inpt.prop == 'url' and inpt.post_data is None})
+    prefetcher = Prefetcher.from_config()
+    if not prefetcher.enabled:
+        prefetcher = Prefetcher(HEAD_WORKERS)
+    with prefetcher:
+        return dict(zip(urls, prefetcher.map(_get_validator, urls)))
+
+
+def _reference_version(inpt, validators):
+    """Identify the content of a referenced input, without downloading it if possible.
+
+    The ``ETag`` or ``Last-Modified`` headers of the reference are used, the
+    content is downloaded and hashed when the server sends neither.
+
+    :param validators: validators of the references by URL, see :func:`_get_validators`
+    """
+    if inpt.post_data is None:
+        validator = validators.get(inpt.url)
+        if validator is not None:
+            return validator
+    # downloaded once, the process reads the same file
+    return ['sha256', _file_digest(inpt.file)]
+
+
+def _input_parts(inpt, validators):
+    """Get the parts of an input its hash is computed from."""
+    if isinstance(inpt, ComplexInput):
+        data_format = inpt.data_format
+        parts = [data_format.mime_type, data_format.encoding, data_format.schema]
+        if inpt.prop == 'url':
+            return parts + ['url', inpt.url, inpt.post_data, _reference_version(inpt, validators)]
+        if inpt.prop == 'file':
+            return parts + ['sha256', _file_digest(inpt.file)]
+        data = inpt.data
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return parts + ['sha256', hashlib.sha256(data or b'').hexdigest()]
+    if isinstance(inpt, BoundingBoxInput):
+        return [inpt.data, inpt.crs, inpt.dimensions]
+    uom = inpt.uom.json if inpt.uom else None
+    return [inpt.data, uom, inpt.data_type]
+
+
+def request_key(process, wps_request):
+    """Compute the hash of an Execute request, with its inputs set up for execution.
+
+    References are identified by their URL and the version of their content,
+    other inputs by their value.
+
+    :returns: hexadecimal SHA-256 hash, None if the request can not be cached
+    """
+    if wps_request.raw or wps_request.store_execute == 'true':
+        return None
+    _, mimetype = get_response_type(wps_request.http_request.accept_mimetypes, wps_request.default_mimetype)
+    parts = [process.identifier, process.version, wps_request.version, wps_request.language, mimetype,
+             wps_request.lineage, wps_request.store_execute, wps_request.status, wps_request.outputs]
+    validators = _get_validators(iter_inputs(wps_request.inputs))
+    for identifier in sorted(wps_request.inputs):
+        parts.append([identifier] + [_input_parts(inpt, validators) for inpt in wps_request.inputs[identifier]])
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@metrics.timed('result_cache_lookup')
+def lookup(process, wps_request):
+    """Get the cached response document of an Execute request.
+
+    The key of the request is kept as ``cache_key`` of the process, for
+    :func:`store` to cache the result of the execution.
+
+    :returns: the document and its content type, None if it is not cached
+    """
+    if not process.cacheable or not max_size():
+        return None
+    key = process.cache_key = request_key(process, wps_request)
+    if key is None:
+        return None
+
+    now = datetime.datetime.now()
+    session = dblog.get_session()
+    try:
+        entry = session.query(dblog.CachedResult).filter_by(key=key).first()
+        if entry is None or (entry.time_expires is not None and entry.time_expires < now):
+            return None
+        try:
+            doc = StorageBuilder.buildStorage().read(entry.destination)
+        except Exception as e:
+            # removed meanwhile, the result is cached again after the execution
+            LOGGER.warning('Cached result {} can not be read: {}'.format(entry.destination, e))
+            return None
+        entry.time_used = now
+        session.commit()
+        LOGGER.info('Result of process {} taken from the cache'.format(process.identifier))
+        return doc, entry.content_type
+    finally:
+        session.close()
+
+
+def store(process, wps_response):
+    """Cache the final response document of a successful execution.
+
+    Errors are logged, a result which can not be cached does not fail the
+    execution.
+    """
+    try:
+        _store(process.cache_key, process, wps_response.doc, wps_response.content_type)
+    except Exception as e:
+        LOGGER.warning('Result of process {} not cached: {}'.format(process.identifier, e))
+
+
+def _store(key, process, doc, content_type):
+    maxsize = max_size()
+    size = len(doc.encode('utf-8'))
+    if size > maxsize:
+        LOGGER.debug('Result of process {} is too large to be cached'.format(process.identifier))
+        return
+
+    storage = StorageBuilder.buildStorage()
+    json_doc = 'json' in (content_type or '')
+    destination = 'cache_{}{}'.format(key, '.json' if json_doc else '.xml')
+    storage.write(doc, destination, data_format=FORMATS.JSON if json_doc else FORMATS.XML)
+
+    now = datetime.datetime.now()
+    expires = None
+    if process.cache_ttl is not None:
+        expires = now + datetime.timedelta(seconds=process.cache_ttl)
+    session = dblog.get_session()
+    try:
+        session.merge(dblog.CachedResult(
+            key=key, identifier=process.identifier, destination=destination, content_type=content_type,
+            size=size, time_created=now, time_expires=expires, time_used=now))
+        session.commit()
+        _evict(session, storage, maxsize, now)
+    finally:
+        session.close()
+
+
+def _remove(session, storage, entries):
+    """Remove the cached results `entries`, returns the size they took."""
+    size = 0
+    for entry in entries:
+        LOGGER.debug('Removing cached result {}'.format(entry.destination))
+        storage.delete(entry.destination)
+        session.delete(entry)
+        size += entry.size
+    session.commit()
+    return size
+
+
+def _evict(session, storage, maxsize, now):
+    """Remove the expired results, then the least recently used ones above `maxsize` bytes.
+
+    Only the results to remove are read, by batches.
+    """
+    CachedResult = dblog.CachedResult
+    while _remove(session, storage, session.query(CachedResult).filter(
+            CachedResult.time_expires < now).limit(EVICT_BATCH).all()):
+        pass
+    excess = (session.query(func.sum(CachedResult.size)).scalar() or 0) - maxsize
+    while excess > 0:
+        entries = []
+        for entry in session.query(CachedResult).order_by(CachedResult.time_used).limit(EVICT_BATCH):
+            if excess <= 0:
+                break
+            entries.append(entry)
+            excess -= entry.size
+        if not entries:
+            break
+        _remove(session, storage, entries)
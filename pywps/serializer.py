@@ -0,0 +1,123 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+JSON serializers of the documents
+
+The JSON documents (responses, requests and jobs) are serialized with the
+serializer named by the ``json_serializer`` option of the ``server``
+section: ``orjson`` when the package is installed, ``json`` for the
+standard library, or ``auto`` (default) for the fastest available one.
+Other serializers can be added with :func:`register_serializer`.
+
+Both serialize NumPy arrays and scalars, objects with a ``tolist`` method
+(:class:`array.array`), dates and times (ISO 8601) and decimal numbers. The
+``orjson`` serializer encodes C-contiguous NumPy arrays directly, without
+converting them to lists of Python numbers first.
+"""
+
+import datetime
+import decimal
+import json
+import logging
+
+import pywps.configuration as config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOGGER = logging.getLogger("PYWPS")
+
+
+def _default(obj):
+    """Encode the objects the serializers do not know."""
+    if hasattr(obj, 'tolist'):
+        # this will work for array.array, numpy.ndarray and numpy scalars
+        return obj.tolist()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(obj).__name__))
+
+
+class JSONSerializer(object):
+    """Serializer of the standard library :mod:`json` module."""
+
+    name = 'json'
+
+    def dumps(self, obj, indent=None, sort_keys=False, allow_nan=True):
+        """Serialize `obj` to a JSON document.
+
+        :param obj: object to serialize
+        :param indent: number of spaces of the indentation, None for a compact document
+        :param sort_keys: sort the keys of the objects
+        :param allow_nan: whether NaN and infinite numbers, which are not valid
+            JSON, are written as such. Otherwise :class:`ValueError` is raised.
+        :returns: str
+        """
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys, allow_nan=allow_nan, default=_default)
+
+
+class OrjsonSerializer(JSONSerializer):
+    """Serializer of the :mod:`orjson` package.
+
+    It only indents with 2 spaces, writes NaN and infinite numbers as
+    ``null`` and encodes integers of at most 64 bits. The other documents
+    (other indentations, `allow_nan` False, larger integers) are serialized
+    by the standard library.
+    """
+
+    name = 'orjson'
+
+    def dumps(self, obj, indent=None, sort_keys=False, allow_nan=True):
+        if indent not in (None, 2) or not allow_nan:
+            return JSONSerializer.dumps(self, obj, indent=indent, sort_keys=sort_keys, allow_nan=allow_nan)
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return JSONSerializer.dumps(self, obj, indent=indent, sort_keys=sort_keys, allow_nan=allow_nan)
+
+
+# available serializers by name, in order of preference
+SERIALIZERS = {}
+if orjson is not None:
+    SERIALIZERS[OrjsonSerializer.name] = OrjsonSerializer()
+SERIALIZERS[JSONSerializer.name] = JSONSerializer()
+
+
+def register_serializer(serializer):
+    """Make `serializer` available under its ``name``, for the ``json_serializer`` option.
+
+    :param serializer: instance of a :class:`JSONSerializer` subclass
+    """
+    SERIALIZERS[serializer.name] = serializer
+
+
+def get_serializer():
+    """The serializer of the ``json_serializer`` option of the ``server`` section."""
+    name = config.get_config_value('server', 'json_serializer') or 'auto'
+    if name == 'auto':
+        return next(iter(SERIALIZERS.values()))
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        LOGGER.warning('JSON serializer {} is not available, using {}'.format(name, JSONSerializer.name))
+        return SERIALIZERS[JSONSerializer.name]
+
+
+def dumps(obj, indent=None, sort_keys=False, allow_nan=True):
+    """Serialize `obj` to a JSON document with the configured serializer.
+
+    See :meth:`JSONSerializer.dumps`.
+    """
+    return get_serializer().dumps(obj, indent=indent, sort_keys=sort_keys, allow_nan=allow_nan)
@@ -0,0 +1,137 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+"""
+Coalescing writer of the status updates of running processes
+
+The progress a process reports with
+:meth:`pywps.response.execute.ExecuteResponse.update_status` is stored in the
+database and in the status file by a background thread, at most once every
+``status_update_interval`` seconds (see the ``server`` section) for each
+job. Updates arriving in the meantime replace the pending one, only the
+latest state is written.
+
+Changes of the status itself (accepted, started, succeeded, failed) are
+written at once by the thread of the process and cancel the pending
+update.
+"""
+
+import logging
+import os
+import threading
+import time
+
+LOGGER = logging.getLogger("PYWPS")
+
+
+class StatusWriter(object):
+    """Write the status of responses in a background thread, at most once
+    per interval for each response.
+
+    The thread is started on demand and stops once it has been idle for
+    `idle_timeout` seconds. The responses are written with their
+    ``_write_status`` method.
+
+    :param idle_timeout: seconds the thread waits for new updates
+    """
+
+    def __init__(self, idle_timeout=1.0):
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        # time of the next write by response
+        self._due = {}
+        self._writing = False
+        self._thread = None
+
+    def submit(self, response, interval):
+        """Write the status of `response` in the background, `interval`
+        seconds after its last write at the earliest.
+        """
+        with self._cond:
+            if response in self._due:
+                # the pending write picks up the latest state
+                return
+            self._due[response] = max(time.monotonic(), response._status_written + interval)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pywps-status-writer')
+                self._thread.start()
+            self._cond.notify_all()
+
+    def discard(self, response):
+        """Cancel the pending write of `response`."""
+        with self._cond:
+            self._due.pop(response, None)
+
+    def join(self):
+        """Write the pending updates now and wait until they are done."""
+        with self._cond:
+            now = time.monotonic()
+            for response in self._due:
+                self._due[response] = now
+            self._cond.notify_all()
+            while self._due or self._writing:
+                self._cond.wait()
+
+    def _next(self):
+        """Wait for the next due response, None when idle for too long."""
+        with self._cond:
+            while True:
+                if not self._due:
+                    self._cond.wait(self.idle_timeout)
+                    if not self._due:
+                        self._thread = None
+                        return None
+                    continue
+                response = min(self._due, key=self._due.get)
+                delay = self._due[response] - time.monotonic()
+                if delay <= 0:
+                    del self._due[response]
+                    self._writing = True
+                    return response
+                self._cond.wait(delay)
+
+    def _run(self):
+        while True:
+            response = self._next()
+            if response is None:
+                return
+            try:
+                response._write_status()
+            except Exception:
+                LOGGER.exception('Writing the status of {} failed'.format(response.uuid))
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+_writer = StatusWriter()
+
+
+def _after_fork():
+    # the thread and the pending updates belong to the parent
+    global _writer
+    _writer = StatusWriter()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def submit(response, interval):
+    """Write the status of `response` in the background, at most once every
+    `interval` seconds.
+    """
+    _writer.submit(response, interval)
+
+
+def discard(response):
+    """Cancel the pending background write of `response`."""
+    _writer.discard(response)
+
+
+def join():
+    """Write the pending status updates and wait until they are done."""
+    _writer.join()
@@ -119,8 +119,10 @@ class WpsTestResponse(Response):
 
     def __init__(self, *args):
         super(WpsTestResponse, self).__init__(*args)
-        if re.match(r'text/xml(;\s*charset=.*)?', self.headers.get('Content-Type')):
+        if re.match(r'text/xml(;\s*charset=.*)?', self.headers.get('Content-Type', '')):
             self.xml = etree.fromstring(self.get_data())
+            # the whole document is read, like a server closes the response once sent
+            self.close()
 
     def xpath(self, path):
         version = self.xml.attrib["version"]
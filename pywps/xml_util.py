@@ -5,6 +5,9 @@ PARSER = _etree.XMLParser(
 )
 
 tostring = _etree.tostring
+xmlfile = _etree.xmlfile
+XPath = _etree.XPath
+TreeBuilder = _etree.TreeBuilder
 
 
 def fromstring(text):
@@ -13,3 +16,7 @@ def fromstring(text):
 
 def parse(source):
     return _etree.parse(source, parser=PARSER)
+
+
+def target_parser(target):
+    return _etree.XMLParser(target=target, resolve_entities=False)
@@ -18,7 +18,9 @@ import test_describe
 import test_execute
 import test_exceptions
 import test_inout
+import test_janitor
 import test_literaltypes
+import test_metrics
 import validator
 import test_ows
 import test_formats
@@ -26,9 +28,20 @@ import test_dblog
 import test_wpsrequest
 import test_service
 import test_process
+import test_prefetch
+import test_spool
+import test_result_cache
+import test_compression
+import test_batch
+import test_templates
+import test_status_writer
+import test_raw_output
+import test_serializer
+import test_process_registry
 import test_processing
 import test_assync
 import test_grass_location
+import test_grass_pool
 import test_storage
 import test_filestorage
 import test_s3storage
@@ -81,9 +94,11 @@ def load_tests(loader=None, tests=None, pattern=None):
         test_execute.load_tests(),
         test_describe.load_tests(),
         test_inout.load_tests(),
+        test_janitor.load_tests(),
         test_exceptions.load_tests(),
         test_ows.load_tests(),
         test_literaltypes.load_tests(),
+        test_metrics.load_tests(),
         test_complexvalidators.load_tests(),
         test_literalvalidators.load_tests(),
         test_formats.load_tests(),
@@ -91,9 +106,20 @@ def load_tests(loader=None, tests=None, pattern=None):
         test_wpsrequest.load_tests(),
         test_service.load_tests(),
         test_process.load_tests(),
+        test_process_registry.load_tests(),
+        test_prefetch.load_tests(),
+        test_spool.load_tests(),
+        test_result_cache.load_tests(),
+        test_compression.load_tests(),
+        test_batch.load_tests(),
+        test_templates.load_tests(),
+        test_status_writer.load_tests(),
+        test_raw_output.load_tests(),
+        test_serializer.load_tests(),
         test_processing.load_tests(),
         test_assync.load_tests(),
         test_grass_location.load_tests(),
+        test_grass_pool.load_tests(),
         test_storage.load_tests(),
         test_filestorage.load_tests(),
         test_s3storage.load_tests(),
@@ -0,0 +1,168 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import base64
+import json
+import os
+
+from basic import TestBase
+
+from pywps import (
+    FORMATS,
+    ComplexInput,
+    ComplexOutput,
+    LiteralInput,
+    LiteralOutput,
+    Process,
+    Service,
+    configuration,
+    dblog,
+    janitor,
+)
+from pywps.app.exceptions import ProcessError
+from pywps.tests import client_for
+
+
+def handler(request, response):
+    a, b = request.inputs['a'][0].data, request.inputs['b'][0].data
+    if a == 13:
+        raise ProcessError('Unlucky number')
+    # a file in the working directory, the same name for each input set
+    with open(os.path.join(request.inputs['a'][0].workdir, 'sum.txt'), 'w') as f:
+        f.write(str(a + b))
+    response.outputs['sum'].data = a + b
+    response.outputs['file'].file = f.name
+    return response
+
+
+class BatchTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        process = Process(handler, 'sum', 'Sum',
+                          inputs=[LiteralInput('a', 'A', data_type='integer'),
+                                  LiteralInput('b', 'B', data_type='integer')],
+                          outputs=[LiteralOutput('sum', 'Sum', data_type='integer'),
+                                   ComplexOutput('file', 'File', supported_formats=[FORMATS.TEXT])],
+                          store_supported=True)
+        self.client = client_for(Service(processes=[process]))
+
+    def tearDown(self):
+        janitor.join()
+        super().tearDown()
+
+    def execute(self, batch, **kwargs):
+        doc = dict({'identifier': 'sum', 'version': '1.0.0', 'operation': 'execute', 'batch': batch}, **kwargs)
+        return self.client.post_json(doc=doc)
+
+    def test_execute(self):
+        resp = self.execute([{'a': i, 'b': 1} for i in range(10)])
+        assert resp.status_code == 200
+        assert resp.headers['Content-Type'] == 'application/json'
+        result = json.loads(resp.data)
+        assert result['identifier'] == 'sum'
+        assert result['succeeded'] == 10 and result['failed'] == 0
+        assert [item['outputs']['sum'] for item in result['results']] == list(range(1, 11))
+        assert [item['outputs']['file'] for item in result['results']] == \
+            ['<![CDATA[{}]]>'.format(i) for i in range(1, 11)]
+        assert all(item['status']['status'] == 'succeeded' for item in result['results'])
+
+    def test_shared_inputs(self):
+        resp = self.execute([{'a': 1}, {'a': 2, 'b': 0}], inputs={'b': 100})
+        result = json.loads(resp.data)
+        assert [item['outputs']['sum'] for item in result['results']] == [101, 2]
+
+    def test_references(self):
+        outputs = {'file': {'asReference': 'true'}}
+        resp = self.execute([{'a': 1, 'b': 1}, {'a': 2, 'b': 2}], outputs=outputs)
+        result = json.loads(resp.data)
+        assert result['succeeded'] == 2
+        # the files of the input sets are stored before their working directories are removed
+        outputpath = configuration.get_config_value('server', 'outputpath')
+        contents = []
+        for directory, _, names in os.walk(outputpath):
+            for name in names:
+                with open(os.path.join(directory, name)) as f:
+                    contents.append(f.read())
+        assert sorted(contents) == ['2', '4']
+
+    def test_failures(self):
+        resp = self.execute([{'a': 1, 'b': 1}, {'a': 13, 'b': 1}, {'a': 1}, {'a': 'one', 'b': 1}, {'a': 2, 'b': 2}])
+        assert resp.status_code == 200
+        result = json.loads(resp.data)
+        assert result['succeeded'] == 2 and result['failed'] == 3
+        statuses = [item['status'] for item in result['results']]
+        assert [status['status'] for status in statuses] == ['succeeded', 'failed', 'failed', 'failed', 'succeeded']
+        assert statuses[1]['message'] == 'Process error: Unlucky number'
+        assert statuses[2]['code'] == 'MissingParameterValue'
+        assert statuses[2]['locator'] == 'b'
+        assert statuses[3]['code'] == 'InvalidParameterValue'
+        assert result['results'][4]['outputs']['sum'] == 4
+
+    def test_workdir(self):
+        self.execute([{'a': i, 'b': 1} for i in range(3)])
+        janitor.join()
+        assert os.listdir(configuration.get_config_value('server', 'workdir')) == []
+
+    def test_logged_once(self):
+        self.execute([{'a': i, 'b': 1} for i in range(5)])
+        session = dblog.get_session()
+        try:
+            requests = session.query(dblog.ProcessInstance).all()
+        finally:
+            session.close()
+        assert len(requests) == 1
+        assert requests[0].status == dblog.WPS_STATUS.SUCCEEDED
+
+    def test_spooled_shared_inputs(self):
+        configuration.CONFIG.set('server', 'inline_spool_size', '1kb')
+
+        def length(request, response):
+            response.outputs['length'].data = len(request.inputs['text'][0].data) + request.inputs['n'][0].data
+            return response
+
+        process = Process(length, 'length', 'Length',
+                          inputs=[ComplexInput('text', 'Text', supported_formats=[FORMATS.TEXT]),
+                                  LiteralInput('n', 'N', data_type='integer')],
+                          outputs=[LiteralOutput('length', 'Length', data_type='integer')])
+        client = client_for(Service(processes=[process]))
+        text = {'type': 'complex', 'mimeType': 'text/plain', 'encoding': 'base64',
+                'data': base64.b64encode(b'x' * 4096).decode()}
+        resp = client.post_json(doc={'identifier': 'length', 'version': '1.0.0', 'operation': 'execute',
+                                     'inputs': {'text': text}, 'batch': [{'n': i} for i in range(3)]})
+        result = json.loads(resp.data)
+        assert [item['outputs']['length'] for item in result['results']] == [4096, 4097, 4098]
+
+    def test_running(self):
+        running = []
+
+        def count(request, response):
+            running.append(dblog.get_process_counts()[0])
+            return response
+
+        process = Process(count, 'count', 'Count', inputs=[LiteralInput('a', 'A', data_type='integer')])
+        client = client_for(Service(processes=[process]))
+        client.post_json(doc={'identifier': 'count', 'version': '1.0.0', 'operation': 'execute',
+                              'batch': [{'a': 1}, {'a': 2}]})
+        # counted against parallelprocesses
+        assert running == [1, 1]
+        assert dblog.get_process_counts()[0] == 0
+
+    def test_invalid(self):
+        assert self.execute({'a': 1, 'b': 1}).status_code == 400
+        assert self.execute([1, 2]).status_code == 400
+        assert self.execute([{'a': 1, 'b': 1}], raw=True, outputs={'sum': {}}).status_code == 400
+        assert self.execute([{'a': 1, 'b': 1}], identifier='unknown').status_code == 400
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(BatchTest),
+    ]
+    return unittest.TestSuite(suite_list)
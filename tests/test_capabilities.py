@@ -3,6 +3,8 @@
 # licensed under MIT, Please consult LICENSE.txt for details     #
 ##################################################################
 
+import time
+
 from basic import TestBase
 from pywps import configuration
 from pywps.app import Process, Service
@@ -49,27 +51,26 @@ class CapabilitiesTest(TestBase):
 
         def pr1(): pass
         def pr2(): pass
-        self.client = client_for(
-            Service(
-                processes=[
-                    Process(
-                        pr1,
-                        "pr1",
-                        "Process 1",
-                        abstract="Process 1",
-                        keywords=["kw1a", "kw1b"],
-                        metadata=[Metadata("pr1 metadata")],
-                    ),
-                    Process(
-                        pr2,
-                        "pr2",
-                        "Process 2",
-                        keywords=["kw2a"],
-                        metadata=[Metadata("pr2 metadata")],
-                    ),
-                ]
-            )
+        self.service = Service(
+            processes=[
+                Process(
+                    pr1,
+                    "pr1",
+                    "Process 1",
+                    abstract="Process 1",
+                    keywords=["kw1a", "kw1b"],
+                    metadata=[Metadata("pr1 metadata")],
+                ),
+                Process(
+                    pr2,
+                    "pr2",
+                    "Process 2",
+                    keywords=["kw2a"],
+                    metadata=[Metadata("pr2 metadata")],
+                ),
+            ]
         )
+        self.client = client_for(self.service)
 
     def check_capabilities_response(self, resp):
 
@@ -137,6 +138,68 @@ class CapabilitiesTest(TestBase):
         resp = self.client.get('?service=WPS&request=GetCapabilities&acceptversions=2.0.0')
         assert_wps_version(resp, version="2.0.0")
 
+    def test_cached(self):
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        self.check_capabilities_response(resp)
+        cache = self.service._get_cache('capabilities')
+        assert list(cache) == [('1.0.0', 'en-US', 'text/xml')]
+
+        cache[('1.0.0', 'en-US', 'text/xml')] = '<cached/>'
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        assert resp.get_data(as_text=True) == '<cached/>'
+
+    def test_cache_invalidated_by_configuration(self):
+        self.client.get('?Request=GetCapabilities&service=WPS')
+        configuration.CONFIG.set('metadata:main', 'identification_title', 'Changed title')
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        title = resp.xpath_text('/wps:Capabilities/ows:ServiceIdentification/ows:Title')
+        assert title == 'Changed title'
+
+    def test_not_modified(self):
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        etag = resp.headers['ETag']
+        last_modified = resp.headers['Last-Modified']
+
+        resp = self.client.get('?Request=GetCapabilities&service=WPS', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.headers['ETag'] == etag
+        assert resp.get_data() == b''
+
+        resp = self.client.get('?Request=GetCapabilities&service=WPS',
+                               headers={'If-Modified-Since': last_modified})
+        assert resp.status_code == 304
+
+    def test_etag_changes(self):
+        etag = self.client.get('?Request=GetCapabilities&service=WPS').headers['ETag']
+        assert etag == self.client.get('?Request=GetCapabilities&service=WPS').headers['ETag']
+        assert etag != self.client.get('?Request=GetCapabilities&service=WPS&f=json').headers['ETag']
+
+        configuration.CONFIG.set('metadata:main', 'identification_title', 'Changed title')
+        resp = self.client.get('?Request=GetCapabilities&service=WPS', headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+
+    def test_etag_environment_option(self):
+        configuration.CONFIG.set('DEFAULT', 'wps_title', 'Title')
+        configuration.CONFIG.set('metadata:main', 'wps_title', 'Title')
+        etag = self.client.get('?Request=GetCapabilities&service=WPS').headers['ETag']
+
+        configuration.CONFIG.set('metadata:main', 'wps_title', 'Changed title')
+        assert etag != self.client.get('?Request=GetCapabilities&service=WPS').headers['ETag']
+
+    def test_last_modified_stable(self):
+        last_modified = self.client.get('?Request=GetCapabilities&service=WPS').headers['Last-Modified']
+        time.sleep(1)
+        client = client_for(Service(processes=[process for _, process in self.service.processes.entries()]))
+        assert last_modified == client.get('?Request=GetCapabilities&service=WPS').headers['Last-Modified']
+
+    def test_cache_invalidated_by_processes(self):
+        self.client.get('?Request=GetCapabilities&service=WPS')
+        del self.service.processes['pr2']
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        names = resp.xpath_text('/wps:Capabilities/wps:ProcessOfferings/wps:Process/ows:Identifier')
+        assert names.split() == ['pr1']
+
 
 class CapabilitiesTranslationsTest(TestBase):
     def setUp(self):
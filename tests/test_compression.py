@@ -0,0 +1,232 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import gzip
+import json
+import unittest
+import zlib
+from io import BytesIO
+
+from basic import TestBase
+from werkzeug.test import Client, EnvironBuilder
+from werkzeug.wrappers import Request, Response
+
+from pywps import FORMATS, ComplexInput, LiteralOutput, Process, Service, configuration, get_ElementMakerForVersion
+from pywps import xml_util as etree
+from pywps.compression import (
+    COMPRESSORS,
+    STREAM_SIZE,
+    DecompressingReader,
+    LimitedReader,
+    compress_response,
+)
+from pywps.exceptions import FileSizeExceeded
+from pywps.tests import assert_response_success, client_for
+
+WPS, OWS = get_ElementMakerForVersion("1.0.0")
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ReaderTest(TestBase):
+
+    def test_limited(self):
+        reader = LimitedReader(BytesIO(b'x' * 100), 100)
+        assert reader.read(10) == b'x' * 10
+        assert reader.read() == b'x' * 90
+        assert reader.read() == b''
+        with self.assertRaises(FileSizeExceeded):
+            LimitedReader(BytesIO(b'x' * 101), 100).read()
+
+    def test_decompress(self):
+        data = b''.join(b'line %d\n' % i for i in range(100000))
+        for encoding, compressed in (('gzip', gzip.compress(data)),
+                                     ('deflate', zlib.compress(data)),
+                                     ('deflate', raw_deflate(data))):
+            reader = DecompressingReader(BytesIO(compressed), encoding, len(data))
+            assert reader.read(1000) == data[:1000]
+            assert reader.read() == data[1000:]
+            assert reader.read() == b''
+
+    def test_bomb(self):
+        compressed = gzip.compress(b'\0' * 100 * 1024 * 1024)
+        reader = DecompressingReader(BytesIO(compressed), 'gzip', 1024 * 1024)
+        with self.assertRaises(FileSizeExceeded):
+            reader.read()
+        # the output is bounded, the rest of the body is not decompressed
+        assert reader.count < 2 * 1024 * 1024
+
+    def test_truncated(self):
+        compressed = gzip.compress(b'data' * 1000)
+        with self.assertRaises(ValueError):
+            DecompressingReader(BytesIO(compressed[:-20]), 'gzip', 10000).read()
+        with self.assertRaises(zlib.error):
+            DecompressingReader(BytesIO(b'not compressed'), 'gzip', 10000).read()
+
+
+class CompressedRequestTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+
+        def handler(request, response):
+            response.outputs['size'].data = len(request.inputs['data'][0].data)
+            return response
+
+        process = Process(handler, 'size', 'Size',
+                          inputs=[ComplexInput('data', 'Data', supported_formats=[FORMATS.TEXT])],
+                          outputs=[LiteralOutput('size', 'Size', data_type='integer')])
+        self.client = client_for(Service(processes=[process]))
+
+    def request(self, size):
+        doc = WPS.Execute(
+            OWS.Identifier('size'),
+            WPS.DataInputs(WPS.Input(OWS.Identifier('data'),
+                                     WPS.Data(WPS.ComplexData('x' * size, mimeType='text/plain')))),
+            version='1.0.0', service='WPS')
+        return etree.tostring(doc)
+
+    def post(self, data, encoding, **kwargs):
+        return self.client.post('/', data=data, headers={'Content-Encoding': encoding}, **kwargs)
+
+    def assert_size(self, resp, size):
+        assert_response_success(resp)
+        assert resp.xpath_text('//wps:ProcessOutputs/wps:Output/wps:Data/wps:LiteralData') == str(size)
+
+    def test_gzip(self):
+        self.assert_size(self.post(gzip.compress(self.request(100000)), 'gzip'), 100000)
+
+    def test_deflate(self):
+        self.assert_size(self.post(zlib.compress(self.request(1000)), 'deflate'), 1000)
+        self.assert_size(self.post(raw_deflate(self.request(1000)), 'deflate'), 1000)
+
+    def test_spooled(self):
+        configuration.CONFIG.set('server', 'inline_spool_size', '1kb')
+        self.assert_size(self.post(gzip.compress(self.request(100000)), 'gzip'), 100000)
+
+    def test_json(self):
+        doc = {'identifier': 'size', 'version': '1.0.0', 'operation': 'execute',
+               'inputs': {'data': [{'data': 'x' * 1000, 'mimeType': 'text/plain'}]}}
+        resp = self.post(gzip.compress(json.dumps(doc).encode('utf-8')), 'gzip', content_type='application/json')
+        self.assert_size(resp, 1000)
+
+    def test_maxrequestsize(self):
+        configuration.CONFIG.set('server', 'maxrequestsize', '1mb')
+        for spool_size in ('0', '1kb'):
+            configuration.CONFIG.set('server', 'inline_spool_size', spool_size)
+            resp = self.post(gzip.compress(self.request(2 * 1024 * 1024)), 'gzip')
+            assert resp.status_code == 400
+            assert b'FileSizeExceeded' in resp.data
+
+    def test_invalid(self):
+        assert self.post(self.request(1000), 'br').status_code == 400
+        assert self.post(self.request(1000), 'gzip').status_code == 400
+
+
+class CompressedResponseTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+
+        def handler(request, response):
+            response.outputs['text'].data = 'x' * 2000
+            return response
+
+        process = Process(handler, 'text', 'Text', outputs=[LiteralOutput('text', 'Text', data_type='string')])
+        self.client = Client(Service(processes=[process]), Response)
+        self.capabilities = '?service=wps&request=getcapabilities'
+
+    def request(self, accept_encoding=None):
+        headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+        return Request(EnvironBuilder(headers=headers).get_environ())
+
+    def test_capabilities(self):
+        plain = self.client.get(self.capabilities)
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.headers['Vary'] == 'Accept-Encoding'
+        resp = self.client.get(self.capabilities, headers={'Accept-Encoding': 'gzip, deflate'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.headers['Vary'] == 'Accept-Encoding'
+        assert int(resp.headers['Content-Length']) == len(resp.data) < len(plain.data)
+        assert gzip.decompress(resp.data) == plain.data
+
+    def test_not_modified(self):
+        resp = self.client.get(self.capabilities, headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['ETag'].startswith('W/')
+        resp = self.client.get(self.capabilities, headers={'Accept-Encoding': 'gzip',
+                                                           'If-None-Match': resp.headers['ETag']})
+        assert resp.status_code == 304
+
+    def test_execute(self):
+        url = '?service=wps&version=1.0.0&request=execute&identifier=text'
+        resp = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert b'x' * 2000 in gzip.decompress(resp.data)
+        resp = self.client.get(url + '&rawdataoutput=text', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(resp.data) == b'x' * 2000
+
+    @unittest.skipIf('br' not in COMPRESSORS or 'zstd' not in COMPRESSORS, 'brotli or zstandard not installed')
+    def test_codings(self):
+        import brotli
+        import zstandard
+
+        data = 'x' * 2000
+        resp = compress_response(Response(data, mimetype='text/xml'), self.request('gzip, br, zstd'))
+        assert resp.headers['Content-Encoding'] == 'zstd'
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(resp.get_data()) == data.encode()
+        resp = compress_response(Response(data, mimetype='text/xml'), self.request('gzip, br, zstd;q=0.5'))
+        assert resp.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(resp.get_data()) == data.encode()
+
+    def test_disabled(self):
+        configuration.CONFIG.set('server', 'compression_codings', '')
+        resp = self.client.get(self.capabilities, headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in resp.headers
+
+    def test_not_accepted(self):
+        for accept_encoding in ('identity', 'gzip;q=0', 'deflate'):
+            resp = compress_response(Response('x' * 2000, mimetype='text/xml'), self.request(accept_encoding))
+            assert 'Content-Encoding' not in resp.headers
+            assert resp.get_data() == b'x' * 2000
+
+    def test_small(self):
+        resp = compress_response(Response('x' * 100, mimetype='text/xml'), self.request('gzip'))
+        assert 'Content-Encoding' not in resp.headers
+        assert 'Vary' not in resp.headers
+
+    def test_binary(self):
+        resp = compress_response(Response(b'x' * 2000, mimetype='image/png'), self.request('gzip'))
+        assert 'Content-Encoding' not in resp.headers
+
+    def test_stream(self):
+        data = ''.join('line {}\n'.format(i) for i in range(STREAM_SIZE // 5))
+        resp = compress_response(Response(data, mimetype='application/json'), self.request('gzip'))
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in resp.headers
+        assert resp.is_streamed
+        assert gzip.decompress(b''.join(resp.iter_encoded())) == data.encode()
+
+        chunks = ('<line>{}</line>'.format(i) for i in range(1000))
+        resp = compress_response(Response(chunks, mimetype='text/xml'), self.request('gzip'))
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(b''.join(resp.iter_encoded())) == \
+            ''.join('<line>{}</line>'.format(i) for i in range(1000)).encode()
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(ReaderTest),
+        loader.loadTestsFromTestCase(CompressedRequestTest),
+        loader.loadTestsFromTestCase(CompressedResponseTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -52,6 +52,25 @@ class TestEnvInterpolation(TestBase):
         assert key == configuration.CONFIG["envinterpolationsection"]["user"]
 
 
+class TestConfigGeneration(TestBase):
+    """Test cases for the tracking of configuration changes."""
+
+    def test_set_changes_generation(self):
+        generation = configuration.get_config_generation()
+        configuration.CONFIG.set('server', 'url', 'http://example.org/wps')
+        assert configuration.get_config_generation() != generation
+
+    def test_read_string_changes_generation(self):
+        generation = configuration.get_config_generation()
+        configuration.CONFIG.read_string("[server]\nurl=http://example.org/wps")
+        assert configuration.get_config_generation() != generation
+
+    def test_get_keeps_generation(self):
+        generation = configuration.get_config_generation()
+        configuration.get_config_value('server', 'url')
+        assert configuration.get_config_generation() == generation
+
+
 def load_tests(loader=None, tests=None, pattern=None):
     """Load the tests and return the test suite for this file."""
     import unittest
@@ -60,5 +79,6 @@ def load_tests(loader=None, tests=None, pattern=None):
         loader = unittest.TestLoader()
     suite_list = [
         loader.loadTestsFromTestCase(TestEnvInterpolation),
+        loader.loadTestsFromTestCase(TestConfigGeneration),
     ]
     return unittest.TestSuite(suite_list)
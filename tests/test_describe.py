@@ -114,7 +114,8 @@ class DescribeProcessTest(TestBase):
                          role='http://www.opengis.net/spec/wps/2.0/def/process/description/documentation')]),
             Process(ping, 'ping', 'Process Ping', metadata=[Metadata('ping metadata', 'http://example.org/ping')]),
         ]
-        self.client = client_for(Service(processes=processes))
+        self.service = Service(processes=processes)
+        self.client = client_for(self.service)
 
     def test_get_request_all_args(self):
         resp = self.client.get('?Request=DescribeProcess&service=wps&version=1.0.0&identifier=all')
@@ -162,6 +163,42 @@ class DescribeProcessTest(TestBase):
         # print(b"\n".join(resp.response).decode("utf-8"))
         assert [pr.identifier for pr in result] == ['hello', 'ping']
 
+    def test_cached_descriptions(self):
+        self.client.get('?Request=DescribeProcess&service=wps&version=1.0.0&identifier=ping')
+        cache = self.service._get_cache('describe')
+        assert list(cache) == [('ping', 'None', 'en-US', 'text/xml')]
+        assert cache[('ping', 'None', 'en-US', 'text/xml')].startswith('<ProcessDescription')
+
+        self.client.get('?Request=DescribeProcess&service=wps&version=1.0.0&identifier=all')
+        assert sorted(cache) == [('hello', 'None', 'en-US', 'text/xml'), ('ping', 'None', 'en-US', 'text/xml')]
+
+        cache[('hello', 'None', 'en-US', 'text/xml')] = cache[('ping', 'None', 'en-US', 'text/xml')]
+        resp = self.client.get('?Request=DescribeProcess&service=wps&version=1.0.0&identifier=hello,ping')
+        assert [desc.identifier for desc in get_describe_result(resp)] == ['ping', 'ping']
+
+    def test_not_modified(self):
+        url = '?Request=DescribeProcess&service=wps&version=1.0.0&identifier=ping'
+        etag = self.client.get(url).headers['ETag']
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+
+        resp = self.client.get(url + ',hello', headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+
+    def test_cached_json_descriptions(self):
+        resp = self.client.get('?Request=DescribeProcess&service=wps&version=1.0.0&identifier=all&f=json')
+        assert [p['identifier'] for p in resp.json['processes']] == ['hello', 'ping']
+        cache = self.service._get_cache('describe')
+        assert cache[('ping', 'None', 'en-US', 'application/json')]['identifier'] == 'ping'
+
+    def test_cached_description_version(self):
+        url = '?Request=DescribeProcess&service=wps&version=1.0.0&identifier=ping&f=json'
+        assert self.client.get(url).json['processes'][0]['version'] == 'None'
+        # a new version of the process under the same identifier
+        self.service.processes['ping'].version = '2.0'
+        assert self.client.get(url).json['processes'][0]['version'] == '2.0'
+
 
 class DescribeProcessTranslationsTest(TestBase):
 
@@ -7,8 +7,12 @@ from basic import TestBase
 import pytest
 from pywps import xml_util as etree
 import json
+import re
+from unittest import mock
 
 import os.path
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
 from pywps import Service, Process, LiteralOutput, LiteralInput,\
     BoundingBoxOutput, BoundingBoxInput, Format, ComplexInput, ComplexOutput, FORMATS
 from pywps.validator.base import emptyvalidator
@@ -18,7 +22,11 @@ from pywps import get_inputs_from_xml
 from pywps import E, get_ElementMakerForVersion
 from pywps.app.basic import get_xpath_ns
 from pywps.tests import client_for, assert_response_success, assert_response_success_json
-from pywps import configuration
+from pywps import configuration, janitor
+from pywps.app.WPSRequest import WPSRequest
+from pywps.compression import CHUNK_SIZE
+from pywps.response.execute import ExecuteResponse
+from pywps.response.status import WPS_STATUS
 
 from io import StringIO
 
@@ -645,6 +653,172 @@ class ExecuteTranslationsTest(TestBase):
         assert output_abstract == ["Description"]
 
 
+class ExecuteStatusTest(TestBase):
+    """Tests for the status documents of running processes
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.json_calls = 0
+        test = self
+
+        class CountingProcess(Process):
+            @property
+            def json(self):
+                test.json_calls += 1
+                return super().json
+
+        def greeter(request, response):
+            response.outputs['message'].data = "Hello {}!".format(request.inputs['name'][0].data)
+            return response
+
+        self.process = CountingProcess(greeter, 'greeter', 'Greeter',
+                                       inputs=[LiteralInput('name', 'Input name', data_type='string')],
+                                       outputs=[LiteralOutput('message', 'Output message', data_type='string')],
+                                       store_supported=True, status_supported=True)
+        self.process._set_uuid('status-uuid')
+
+    def response(self, accept='text/xml'):
+        wps_request = WPSRequest()
+        wps_request.http_request = Request(EnvironBuilder(headers={'Accept': accept}).get_environ())
+        wps_request.language = 'en-US'
+        wps_request.version = '1.0.0'
+        return ExecuteResponse(wps_request, uuid='status-uuid', process=self.process)
+
+    def full_doc(self, response):
+        template = response.template_env.get_template('1.0.0/execute/main.xml')
+        return template.render(**response.json)
+
+    @staticmethod
+    def without_time(doc):
+        return re.sub('creationTime="[^"]*"', '', doc)
+
+    def test_incremental_xml(self):
+        for store_status_file in (False, True):
+            response = self.response()
+            response.store_status_file = store_status_file
+            for status, percentage in ((WPS_STATUS.ACCEPTED, 0), (WPS_STATUS.STARTED, 10),
+                                       (WPS_STATUS.STARTED, 50), (WPS_STATUS.PAUSED, 60)):
+                response.status, response.message, response.status_percentage = status, 'Working', percentage
+                doc, mimetype = response._construct_doc()
+                assert mimetype == 'text/xml'
+                assert self.without_time(doc) == self.without_time(self.full_doc(response))
+                assert (self.process.status_url in doc) == store_status_file
+
+    def test_process_rendered_once(self):
+        response = self.response()
+        response.status = WPS_STATUS.STARTED
+        for percentage in range(0, 100, 10):
+            response.status_percentage = percentage
+            doc, _ = response._construct_doc()
+            assert 'percentCompleted="{}"'.format(percentage) in doc
+        assert self.json_calls == 1
+
+    def test_incremental_json(self):
+        response = self.response('application/json')
+        response.status, response.status_percentage = WPS_STATUS.STARTED, 30
+        doc, mimetype = response._construct_doc()
+        assert mimetype == 'application/json'
+        assert json.loads(doc)['status']['percent_done'] == '30'
+        assert self.json_calls == 0
+
+
+class ExecuteStreamTest(TestBase):
+    """Tests for the final documents rendered while they are sent
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.text = 'line of text\n' * 20000
+        self.json_calls = 0
+        test = self
+
+        class CountingOutput(ComplexOutput):
+            @property
+            def json(self):
+                test.json_calls += 1
+                return super().json
+
+        def handler(request, response):
+            response.outputs['text'].data = self.text
+            response.outputs['message'].data = 'done'
+            return response
+
+        self.process = Process(handler, 'text', 'Text',
+                               outputs=[CountingOutput('text', 'Text', supported_formats=[FORMATS.TEXT]),
+                                        LiteralOutput('message', 'Message', data_type='string')],
+                               store_supported=True, status_supported=True)
+        self.url = '?service=wps&version=1.0.0&request=execute&identifier=text'
+
+    def call(self, url):
+        environ = EnvironBuilder(url, headers={'Accept': 'text/xml'}).get_environ()
+        start_response = mock.Mock()
+        app_iter = Service(processes=[self.process])(environ, start_response)
+        return app_iter, dict(start_response.call_args[0][1])
+
+    def workdir_content(self):
+        janitor.join()
+        return os.listdir(configuration.get_config_value('server', 'workdir'))
+
+    def test_streamed(self):
+        app_iter, headers = self.call(self.url)
+        assert 'Content-Length' not in headers
+        assert headers['Content-Type'].startswith('text/xml')
+        # nothing rendered yet, the outputs are still in the working directory
+        json_calls = self.json_calls
+        assert self.workdir_content()
+        chunks = list(app_iter)
+        app_iter.close()
+        assert self.json_calls == json_calls + 1
+        assert self.workdir_content() == []
+        assert len(chunks) > 1
+        assert max(len(chunk) for chunk in chunks) < len(self.text) + CHUNK_SIZE
+        doc = etree.fromstring(b''.join(chunks))
+        assert get_output(doc) == {'text': self.text, 'message': 'done'}
+
+    def test_same_document(self):
+        docs = []
+        for stream in ('true', 'false'):
+            configuration.CONFIG.set('server', 'stream_execute_response', stream)
+            app_iter, headers = self.call(self.url)
+            assert ('Content-Length' in headers) == (stream == 'false')
+            docs.append(re.sub(b'creationTime="[^"]*"', b'', b''.join(app_iter)))
+            app_iter.close()
+        assert docs[0] == docs[1]
+
+    def test_status_file_not_streamed(self):
+        # the execution runs in this process, instead of a child one
+        def run_async(process, wps_request, wps_response):
+            process._run_process(wps_request, wps_response)
+            self.status_location = process.status_location
+
+        with mock.patch.object(Process, '_run_async', run_async):
+            app_iter, headers = self.call(self.url + '&storeExecuteResponse=true&status=true')
+        assert 'Content-Length' in headers
+        app_iter.close()
+        with open(self.status_location, 'rb') as f:
+            doc = etree.fromstring(f.read())
+        assert get_output(doc) == {'text': self.text, 'message': 'done'}
+
+    def test_failure(self):
+        def handler(request, response):
+            response.outputs['text'].file = os.path.join(self.tmpdir.name, 'missing.txt')
+            return response
+
+        self.process.handler = handler
+        # the process fails before it is reported succeeded, like when the document is not streamed
+        docs = []
+        for stream in ('true', 'false'):
+            configuration.CONFIG.set('server', 'stream_execute_response', stream)
+            with mock.patch('pywps.response.basic.store_status') as store_status:
+                app_iter, headers = self.call(self.url)
+                docs.append(b''.join(app_iter))
+                app_iter.close()
+            assert [c[0][1] for c in store_status.call_args_list][-1] == WPS_STATUS.FAILED
+        assert b'NoApplicableCode' in docs[0]
+        assert docs[0] == docs[1]
+
+
 class ExecuteXmlParserTest(TestBase):
     """Tests for Execute request XML Parser
     """
@@ -826,6 +1000,8 @@ def load_tests(loader=None, tests=None, pattern=None):
         loader = unittest.TestLoader()
     suite_list = [
         loader.loadTestsFromTestCase(ExecuteTest),
+        loader.loadTestsFromTestCase(ExecuteStatusTest),
+        loader.loadTestsFromTestCase(ExecuteStreamTest),
         loader.loadTestsFromTestCase(ExecuteTranslationsTest),
         loader.loadTestsFromTestCase(ExecuteXmlParserTest),
     ]
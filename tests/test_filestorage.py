@@ -42,6 +42,25 @@ class FileStorageTests(TestBase):
         with open(Path(self.tmp_dir) / store_str) as f:
             self.assertEqual(f.read(), "Hello World!")
 
+    def test_store_duplicate(self):
+        configuration.CONFIG.set('server', 'outputpath', self.tmp_dir)
+        storage = FileStorageBuilder().build()
+        names = []
+        for i, workdir in enumerate(['a', 'b']):
+            (Path(self.tmp_dir) / workdir).mkdir()
+            output = ComplexOutput('testme', 'Test', supported_formats=[FORMATS.TEXT],
+                                   workdir=str(Path(self.tmp_dir) / workdir))
+            output.uuid = 'request'
+            output.data = "Hello {}".format(i)
+            names.append(storage._do_store(output)[1])
+
+        self.assertEqual(names[0], 'input.txt')
+        self.assertTrue(names[1].startswith(str(Path(self.tmp_dir) / 'request' / 'input_')))
+        self.assertTrue(names[1].endswith('.txt'))
+        for i, name in enumerate(names):
+            with open(Path(self.tmp_dir) / 'request' / name) as f:
+                self.assertEqual(f.read(), "Hello {}".format(i))
+
     def test_write(self):
         configuration.CONFIG.set('server', 'outputpath', self.tmp_dir)
         configuration.CONFIG.set('server', 'outputurl', file_uri(self.tmp_dir))
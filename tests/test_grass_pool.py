@@ -0,0 +1,105 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+import sys
+from unittest import mock
+
+from basic import TestBase
+
+from pywps import LiteralOutput, Process, Service, configuration, grass_pool, janitor
+from pywps.tests import assert_response_success, client_for
+
+
+class GrassPoolTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        # a location needs nothing more than the default region to get mapsets
+        self.location = os.path.join(self.tmpdir.name, 'grassdata', 'location')
+        os.makedirs(os.path.join(self.location, 'PERMANENT'))
+        with open(os.path.join(self.location, 'PERMANENT', 'DEFAULT_WIND'), 'w') as f:
+            f.write('proj: 0\n')
+
+    def tearDown(self):
+        janitor.join()
+        super().tearDown()
+
+    def mapsets(self, prefix):
+        return [name for name in os.listdir(self.location) if name.startswith(prefix)]
+
+    def test_setup_environment_once(self):
+        with mock.patch.dict(os.environ), mock.patch.object(grass_pool, '_environment', None), \
+                mock.patch('sys.path', list(sys.path)):
+            grass_pool.setup_environment('/opt/grass')
+            path = os.environ['PATH']
+            grass_pool.setup_environment('/opt/grass')
+            assert os.environ['PATH'] == path
+            assert path.endswith(':/opt/grass/bin:/opt/grass/scripts')
+            assert os.environ['GISBASE'] == '/opt/grass'
+
+    def test_lease(self):
+        mapset = grass_pool.lease_mapset(self.location)
+        assert os.path.dirname(mapset) == self.location
+        assert os.path.basename(mapset).startswith(grass_pool.MAPSET_PREFIX)
+        assert os.path.isfile(os.path.join(mapset, 'WIND'))
+        assert self.mapsets(grass_pool.POOL_PREFIX) == []
+        grass_pool.release_mapset(mapset)
+        janitor.join()
+        assert not os.path.exists(mapset)
+
+    def test_pool(self):
+        configuration.CONFIG.set('grass', 'mapset_pool_size', '2')
+        first = grass_pool.lease_mapset(self.location)
+        janitor.join()
+        pooled = self.mapsets(grass_pool.POOL_PREFIX)
+        assert len(pooled) == 2
+        second = grass_pool.lease_mapset(self.location)
+        assert os.path.basename(second).replace(grass_pool.MAPSET_PREFIX, grass_pool.POOL_PREFIX) in pooled
+        assert os.path.isfile(os.path.join(second, 'WIND'))
+        janitor.join()
+        assert len(self.mapsets(grass_pool.POOL_PREFIX)) == 2
+        assert sorted(self.mapsets(grass_pool.MAPSET_PREFIX)) == sorted(map(os.path.basename, [first, second]))
+        # no pool for a location used once
+        grass_pool.lease_mapset(self.location, pooled=False)
+        janitor.join()
+        assert len(self.mapsets(grass_pool.POOL_PREFIX)) == 2
+
+    def test_existing_epsg_location(self):
+        configuration.CONFIG.set('grass', 'locations_path', os.path.dirname(self.location))
+        os.rename(self.location, os.path.join(os.path.dirname(self.location), 'epsg_4326'))
+        self.location = os.path.join(os.path.dirname(self.location), 'epsg_4326')
+        assert grass_pool.epsg_location('4326') == self.location
+
+    def test_process_in_existing_location(self):
+        def handler(request, response):
+            with open(os.environ['GISRC']) as f:
+                response.outputs['gisrc'].data = f.read()
+            return response
+
+        process = Process(handler, 'grass', 'GRASS', grass_location=self.location,
+                          outputs=[LiteralOutput('gisrc', 'GISRC', data_type='string')])
+        with mock.patch.dict(os.environ):
+            resp = client_for(Service(processes=[process])).get(
+                '?service=WPS&request=Execute&version=1.0.0&identifier=grass')
+        assert_response_success(resp)
+        gisrc = dict(line.split(': ') for line in
+                     resp.xpath_text('//wps:ProcessOutputs/wps:Output/wps:Data/wps:LiteralData').splitlines())
+        assert gisrc['GISDBASE'] == os.path.dirname(self.location)
+        assert gisrc['LOCATION_NAME'] == 'location'
+        assert gisrc['MAPSET'].startswith(grass_pool.MAPSET_PREFIX)
+        janitor.join()
+        assert self.mapsets(grass_pool.MAPSET_PREFIX) == []
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(GrassPoolTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,131 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+import time
+from unittest import mock
+
+from basic import TestBase
+
+from pywps import LiteralInput, LiteralOutput, Process, Service, configuration, janitor
+from pywps.inout.basic import IOHandler
+from pywps.tests import client_for
+
+
+def create_greeter():
+    def greeter(request, response):
+        with open(os.path.join(response.process.workdir, 'name.txt'), 'w') as f:
+            f.write(request.inputs['name'][0].data)
+        response.outputs['message'].data = 'Hello {}'.format(request.inputs['name'][0].data)
+        return response
+
+    return Process(handler=greeter,
+                   identifier='greeter',
+                   title='Greeter',
+                   inputs=[LiteralInput('name', 'Input name', data_type='string')],
+                   outputs=[LiteralOutput('message', 'Output message', data_type='string')],
+                   store_supported=True, status_supported=True)
+
+
+class JanitorTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.workdir = configuration.get_config_value('server', 'workdir')
+        self.service = Service(processes=[create_greeter()])
+
+    def tearDown(self):
+        janitor.join()
+        janitor._discard_pool()
+        super().tearDown()
+
+    def test_lazy_workdir(self):
+        process = self.service.prepare_process_for_execution('greeter')
+        path = process._workdir
+        assert os.path.dirname(path) == self.workdir
+        assert not os.path.exists(path)
+
+        assert process.inputs[0].workdir == path
+        assert os.path.isdir(path)
+        assert os.stat(path).st_mode & 0o777 == 0o700
+
+    def test_iohandler_lazy_workdir(self):
+        path = os.path.join(self.workdir, 'iohandler')
+        iohandler = IOHandler(workdir=path)
+        assert not os.path.exists(path)
+        assert iohandler.workdir == path
+        assert os.path.isdir(path)
+        assert os.stat(path).st_mode & 0o777 == 0o700
+
+    def test_execute_cleans_workdir(self):
+        client = client_for(self.service)
+        resp = client.get('?service=WPS&request=Execute&version=1.0.0&identifier=greeter&datainputs=name=foo')
+        assert resp.status_code == 200
+        janitor.join()
+        assert os.listdir(self.workdir) == []
+
+    def test_detached_execution_cleans_workdir(self):
+        configuration.CONFIG.set('processing', 'mode', 'detachprocessing')
+        remove = janitor._remove
+
+        def slow_remove(path):
+            time.sleep(0.2)
+            remove(path)
+
+        client = client_for(self.service)
+        # the removal is still pending when the detached process is done
+        with mock.patch.object(janitor, '_remove', slow_remove):
+            resp = client.get('?service=WPS&request=Execute&version=1.0.0&identifier=greeter&datainputs=name=foo'
+                              '&storeExecuteResponse=true&status=true')
+        assert resp.status_code == 200
+        status_file = os.path.join(configuration.get_config_value('server', 'outputpath'),
+                                   resp.xml.get('statusLocation').split('/')[-1])
+        for _ in range(100):
+            with open(status_file) as f:
+                if 'ProcessSucceeded' in f.read():
+                    break
+            time.sleep(0.05)
+        # the detached process exits once the directory is removed
+        for _ in range(40):
+            if os.listdir(self.workdir) == []:
+                break
+            time.sleep(0.05)
+        assert os.listdir(self.workdir) == []
+
+    def test_remove(self):
+        path = os.path.join(self.workdir, 'remove_me')
+        os.makedirs(os.path.join(path, 'subdir'))
+        janitor.remove(path)
+        janitor.join()
+        assert not os.path.exists(path)
+
+    def test_pool(self):
+        configuration.CONFIG.set('server', 'workdir_pool_size', '2')
+        first = janitor.acquire_workdir(self.workdir)
+        assert not os.path.exists(first)
+
+        janitor.join()
+        pooled = sorted(os.listdir(self.workdir))
+        assert len(pooled) == 2
+
+        second = janitor.acquire_workdir(self.workdir)
+        assert os.path.isdir(second)
+        assert os.path.basename(second) in pooled
+        janitor.join()
+        assert len(os.listdir(self.workdir)) == 3
+
+        janitor._discard_pool()
+        assert os.listdir(self.workdir) == [os.path.basename(second)]
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(JanitorTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,157 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import multiprocessing
+import os
+
+from basic import TestBase
+
+from pywps import LiteralInput, LiteralOutput, Process, Service, configuration, metrics
+from pywps.tests import client_for
+
+
+def create_greeter():
+    def greeter(request, response):
+        if request.inputs['name'][0].data == 'fail':
+            raise Exception('Failing on purpose')
+        response.outputs['message'].data = 'Hello {}'.format(request.inputs['name'][0].data)
+        return response
+
+    return Process(handler=greeter,
+                   identifier='greeter',
+                   title='Greeter',
+                   inputs=[LiteralInput('name', 'Input name', data_type='string')],
+                   outputs=[LiteralOutput('message', 'Output message', data_type='string')])
+
+
+def _child_observe(path):
+    configuration.load_hardcoded_configuration()
+    configuration.CONFIG.set('metrics', 'enabled', 'true')
+    configuration.CONFIG.set('metrics', 'path', path)
+    with metrics.labels('execute', 'greeter'):
+        metrics.observe('handler', 0.2)
+    metrics.flush()
+
+
+class MetricsTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        metrics._reset()
+        configuration.CONFIG.set('metrics', 'enabled', 'true')
+        self.client = client_for(Service(processes=[create_greeter()]))
+
+    def tearDown(self):
+        metrics._reset()
+        # nothing to dump at exit in the removed directory
+        configuration.load_hardcoded_configuration()
+        super().tearDown()
+
+    def _count(self, phase, operation, process=''):
+        durations, _ = metrics.collect()
+        values = durations.get((phase, operation, process))
+        return sum(values[:-1]) if values else 0
+
+    def test_disabled(self):
+        configuration.CONFIG.set('metrics', 'enabled', 'false')
+        self.client.get('?service=WPS&request=GetCapabilities')
+        assert metrics.collect() == ({}, {})
+
+    def test_request_phases(self):
+        self.client.get('?service=WPS&request=GetCapabilities')
+        assert self._count('request', 'getcapabilities') == 1
+        assert self._count('parse', 'getcapabilities') == 1
+        assert self._count('log_request', 'getcapabilities') == 1
+
+    def test_execute_phases(self):
+        self.client.get('?service=WPS&request=Execute&version=1.0.0&identifier=greeter&datainputs=name=foo')
+        for phase in ('request', 'parse', 'log_request', 'store_status', 'handler', 'render'):
+            assert self._count(phase, 'execute', 'greeter') >= 1, phase
+        assert metrics.collect()[1] == {}
+
+        self.client.get('?service=WPS&request=Execute&version=1.0.0&identifier=greeter&datainputs=name=fail')
+        assert metrics.collect()[1] == {('handler', 'execute', 'greeter'): 1}
+
+    def test_unknown_process_not_labelled(self):
+        self.client.get('?service=WPS&request=Execute&version=1.0.0&identifier=foo&datainputs=name=foo')
+        assert self._count('request', 'execute') == 1
+        assert not any(key[2] == 'foo' for key in metrics.collect()[0])
+
+    def test_render(self):
+        with metrics.labels('execute', 'greeter'):
+            metrics.observe('handler', 0.003)
+            metrics.observe('handler', 20)
+        text = metrics.render()
+        labels = 'phase="handler",operation="execute",process="greeter"'
+        assert 'pywps_phase_duration_seconds_bucket{%s,le="0.001"} 0' % labels in text
+        assert 'pywps_phase_duration_seconds_bucket{%s,le="0.005"} 1' % labels in text
+        assert 'pywps_phase_duration_seconds_bucket{%s,le="+Inf"} 2' % labels in text
+        assert 'pywps_phase_duration_seconds_count{%s} 2' % labels in text
+        assert 'pywps_phase_duration_seconds_sum{%s} 20.003' % labels in text
+
+    def test_application(self):
+        client = client_for(metrics.application)
+        resp = client.get('/metrics')
+        assert resp.status_code == 200
+        assert resp.headers['Content-Type'] == metrics.CONTENT_TYPE
+        assert '# TYPE pywps_phase_duration_seconds histogram' in resp.get_data(as_text=True)
+
+    def test_aggregate_processes(self):
+        path = os.path.join(self.tmpdir.name, 'metrics')
+        configuration.CONFIG.set('metrics', 'path', path)
+        with metrics.labels('execute', 'greeter'):
+            metrics.observe('handler', 0.1)
+
+        child = multiprocessing.get_context('fork').Process(target=_child_observe, args=(path,))
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+
+        assert self._count('handler', 'execute', 'greeter') == 2
+        metrics.flush()
+        # the file of the terminated child is merged into the one of the terminated processes
+        assert sorted(os.listdir(path)) == ['pywps_metrics_{}.json'.format(os.getpid()),
+                                            'pywps_metrics_lock', 'pywps_metrics_terminated.json']
+        assert self._count('handler', 'execute', 'greeter') == 2
+
+    def test_flush_interval(self):
+        path = os.path.join(self.tmpdir.name, 'metrics')
+        configuration.CONFIG.set('metrics', 'path', path)
+        filename = os.path.join(path, 'pywps_metrics_{}.json'.format(os.getpid()))
+        metrics.observe('handler', 0.1)
+        metrics.flush()
+        mtime = os.stat(filename).st_mtime_ns
+        os.utime(filename, ns=(0, 0))
+        metrics.observe('handler', 0.1)
+        metrics.flush()
+        # not dumped again within the interval
+        assert os.stat(filename).st_mtime_ns == 0
+        metrics.flush(force=True)
+        assert os.stat(filename).st_mtime_ns >= mtime
+
+    def test_previous_process_file(self):
+        # left by a terminated process with the same pid
+        path = os.path.join(self.tmpdir.name, 'metrics')
+        configuration.CONFIG.set('metrics', 'path', path)
+        with metrics.labels('execute', 'greeter'):
+            metrics.observe('handler', 0.1)
+        metrics.flush()
+        metrics._reset()
+        assert self._count('handler', 'execute', 'greeter') == 1
+        with metrics.labels('execute', 'greeter'):
+            metrics.observe('handler', 0.1)
+        metrics.flush()
+        assert self._count('handler', 'execute', 'greeter') == 2
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(MetricsTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,147 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from basic import TestBase
+
+from pywps import FORMATS, ComplexInput, LiteralOutput, Process, Service, configuration
+from pywps.exceptions import FileSizeExceeded, NoApplicableCode
+from pywps.inout.prefetch import Prefetcher
+from pywps.tests import assert_response_success, client_for
+from pywps.validator.mode import MODE
+
+PARALLEL = 3
+
+
+class ReferenceHandler(BaseHTTPRequestHandler):
+    # requests to /parallel/ only succeed if PARALLEL of them arrive at once
+    barrier = None
+
+    def do_GET(self):
+        if self.path.startswith('/parallel/'):
+            try:
+                self.barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                self.send_error(500)
+                return
+        body = (self.path * 100).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class PrefetchTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        configuration.CONFIG.set('server', 'input_prefetch_workers', str(PARALLEL))
+        ReferenceHandler.barrier = threading.Barrier(PARALLEL)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ReferenceHandler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def make_input(self, path, identifier='complex'):
+        inpt = ComplexInput(identifier, 'Complex', supported_formats=[FORMATS.TEXT],
+                            workdir=self.tmpdir.name)
+        inpt.url = self.url + path
+        return inpt
+
+    def test_concurrent(self):
+        inputs = [self.make_input('/parallel/{}.txt'.format(i)) for i in range(PARALLEL)]
+        with Prefetcher.from_config() as prefetcher:
+            prefetcher.fetch(inputs)
+            prefetcher.wait()
+            for i, inpt in enumerate(inputs):
+                assert inpt.data == '/parallel/{}.txt'.format(i) * 100
+        assert len({inpt.file for inpt in inputs}) == PARALLEL
+
+    def test_same_file_names(self):
+        inputs = [self.make_input('/same.txt') for i in range(10)]
+        with Prefetcher.from_config() as prefetcher:
+            prefetcher.fetch(inputs)
+            prefetcher.wait()
+        assert len({inpt.file for inpt in inputs}) == 10
+
+    def test_max_size(self):
+        configuration.CONFIG.set('server', 'maxsingleinputsize', '1kb')
+        small, large = self.make_input('/small'), self.make_input('/large' * 10)
+        with Prefetcher.from_config() as prefetcher:
+            prefetcher.fetch([small, large])
+            prefetcher.wait()
+            assert small.data == '/small' * 100
+            with self.assertRaises(FileSizeExceeded):
+                large.file
+
+    def test_lazy_errors(self):
+        broken = self.make_input('/broken')
+        broken.url = 'http://127.0.0.1:{}/broken'.format(closed_port())
+        with Prefetcher.from_config() as prefetcher:
+            prefetcher.fetch([broken])
+            prefetcher.wait()
+            with self.assertRaises(NoApplicableCode):
+                broken.file
+
+    def test_disabled(self):
+        configuration.CONFIG.set('server', 'input_prefetch_workers', '0')
+        inpt = self.make_input('/disabled')
+        with Prefetcher.from_config() as prefetcher:
+            prefetcher.fetch([inpt])
+        assert inpt._iohandler._fetch is None
+        assert inpt.data == '/disabled' * 100
+
+    def execute(self, data_format=FORMATS.TEXT, mode=MODE.NONE):
+        def handler(request, response):
+            response.outputs['output'].data = ''.join(inpt.data for inpt in request.inputs['parallel'])
+            return response
+
+        process = Process(handler, 'prefetch', 'Prefetch',
+                          inputs=[ComplexInput('parallel', 'Parallel', supported_formats=[data_format],
+                                               max_occurs=PARALLEL, mode=mode),
+                                  ComplexInput('unused', 'Unused', supported_formats=[FORMATS.TEXT])],
+                          outputs=[LiteralOutput('output', 'Output', data_type='string')])
+        client = client_for(Service(processes=[process]))
+        references = ';'.join('parallel=@xlink:href={}/parallel/{}.txt'.format(self.url, i) for i in range(PARALLEL))
+        unused = 'unused=@xlink:href=http://127.0.0.1:{}/broken'.format(closed_port())
+        resp = client.get('?service=WPS&request=Execute&version=1.0.0&identifier=prefetch'
+                          '&datainputs={};{}'.format(references, unused))
+        assert_response_success(resp)
+        output = resp.xpath_text('//wps:ProcessOutputs/wps:Output/wps:Data/wps:LiteralData')
+        assert output == ''.join('/parallel/{}.txt'.format(i) * 100 for i in range(PARALLEL))
+
+    def test_execute(self):
+        self.execute()
+
+    def test_execute_validated(self):
+        # the references are downloaded for validation, before the handler runs
+        self.execute(FORMATS.JSON, mode=MODE.SIMPLE)
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(PrefetchTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -74,6 +74,38 @@ class ProcessTestCase(TestBase):
         identifier = get_translation(self.process, "identifier", "fr-CA")
         assert identifier == self.process.identifier
 
+    def test_clone(self):
+        process = self.process.clone()
+        self.assertIsNot(process, self.process)
+        self.assertIs(process.metadata, self.process.metadata)
+        self.assertIs(process.translations, self.process.translations)
+        for inpt, orig in zip(process.inputs, self.process.inputs):
+            self.assertIsNot(inpt, orig)
+            self.assertEqual(inpt.identifier, orig.identifier)
+        vector = process.inputs[2]
+        self.assertIs(vector.supported_formats, self.process.inputs[2].supported_formats)
+
+        process.set_workdir(self.tmpdir.name)
+        vector.data = '<gml/>'
+        self.assertEqual(vector.workdir, self.tmpdir.name)
+        self.assertIsNone(self.process.workdir)
+        self.assertIsNone(self.process.inputs[2].workdir)
+        self.assertIsNone(self.process.inputs[2].data)
+
+    def test_clone_rebinds_handler(self):
+        class Handler(Process):
+            def __init__(self):
+                super().__init__(self._handler, "handler", title="Handler")
+
+            def _handler(self, request, response):
+                return self
+
+        process = Handler()
+        clone = process.clone()
+        self.assertIs(clone.handler(None, None), clone)
+        self.assertIs(process.handler(None, None), process)
+
+
 def load_tests(loader=None, tests=None, pattern=None):
     """Load local tests
     """
@@ -0,0 +1,69 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+from basic import TestBase
+from processes import Greeter, UltimateQuestion
+
+from pywps import LazyProcess, Service, get_ElementMakerForVersion
+from pywps.app.ProcessRegistry import ProcessRegistry
+from pywps.tests import assert_response_success, client_for
+
+WPS, OWS = get_ElementMakerForVersion("1.0.0")
+
+
+class ProcessRegistryTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.greeter = LazyProcess('greeter', 'processes:Greeter')
+        self.question = LazyProcess('ultimate_question', 'processes:UltimateQuestion',
+                                    description=UltimateQuestion().json)
+        self.service = Service(processes=[self.greeter, self.question])
+        self.client = client_for(self.service)
+
+    def test_registry(self):
+        registry = ProcessRegistry([Greeter(), LazyProcess('ultimate_question', 'processes:UltimateQuestion')])
+        assert list(registry) == ['greeter', 'ultimate_question']
+        assert 'ultimate_question' in registry
+        assert not registry.entries()[1][1].loaded
+        assert isinstance(registry['ultimate_question'], UltimateQuestion)
+        assert registry['ultimate_question'] is registry['ultimate_question']
+        del registry['greeter']
+        assert list(registry) == ['ultimate_question']
+
+    def test_wrong_identifier(self):
+        with self.assertRaises(ValueError):
+            LazyProcess('foo', 'processes:Greeter').load()
+
+    def test_capabilities_with_description(self):
+        resp = self.client.get('?Request=GetCapabilities&service=WPS')
+        names = resp.xpath_text('/wps:Capabilities/wps:ProcessOfferings/wps:Process/ows:Identifier')
+        assert names.split() == ['greeter', 'ultimate_question']
+        # without description the process needs to be imported
+        assert self.greeter.loaded
+        assert not self.question.loaded
+
+    def test_describe_imports(self):
+        resp = self.client.get('?Request=DescribeProcess&service=WPS&identifier=ultimate_question&version=1.0.0')
+        assert resp.status_code == 200
+        assert self.question.loaded
+        assert not self.greeter.loaded
+
+    def test_execute_imports(self):
+        resp = self.client.get('?service=WPS&request=Execute&version=1.0.0&identifier=greeter&datainputs=name=foo')
+        assert_response_success(resp)
+        assert self.greeter.loaded
+        assert not self.question.loaded
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(ProcessRegistryTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,212 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+import uuid
+from unittest import mock
+
+from basic import TestBase
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from pywps import FORMATS, ComplexOutput, LiteralOutput, Process, Service, configuration, janitor
+from pywps.app.WPSRequest import WPSRequest
+from pywps.inout.basic import FileHandler
+from pywps.response.status import WPS_STATUS
+from pywps.tests import client_for
+
+DATA = b'\x00\x01binary data\n' * 1000
+
+
+def handler(request, response):
+    path = os.path.join(response.process.workdir, 'output.bin')
+    with open(path, 'wb') as f:
+        f.write(DATA)
+    response.outputs['file'].file = path
+    response.outputs['literal'].data = 'text'
+    return response
+
+
+class FileWrapper(object):
+    """wsgi.file_wrapper of a server"""
+
+    def __init__(self, f, buffer_size=8192):
+        self.file = f
+
+    def __iter__(self):
+        return iter(lambda: self.file.read(8192), b'')
+
+    def close(self):
+        self.file.close()
+
+
+class RawOutputTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        # an output file which does not change between the executions
+        self.stable_file = os.path.join(self.tmpdir.name, 'stable.bin')
+        with open(self.stable_file, 'wb') as f:
+            f.write(DATA)
+
+        def stable(request, response):
+            response.outputs['file'].file = self.stable_file
+            return response
+
+        process = Process(handler, 'raw', 'Raw',
+                          outputs=[ComplexOutput('file', 'File', supported_formats=[FORMATS.NETCDF]),
+                                   LiteralOutput('literal', 'Literal', data_type='string')],
+                          store_supported=True, status_supported=True)
+        stable_process = Process(stable, 'stable', 'Stable',
+                                 outputs=[ComplexOutput('file', 'File', supported_formats=[FORMATS.NETCDF])])
+        self.service = Service(processes=[process, stable_process])
+        self.url = '?service=wps&version=1.0.0&request=execute&identifier=raw&rawdataoutput={}'
+        self.stable_url = '?service=wps&version=1.0.0&request=execute&identifier=stable&rawdataoutput=file'
+
+    def tearDown(self):
+        janitor.join()
+        super().tearDown()
+
+    def workdir_content(self):
+        janitor.join()
+        return list(os.walk(configuration.get_config_value('server', 'workdir')))[1:]
+
+    def test_file(self):
+        client = client_for(self.service)
+        # the file is never read into memory
+        with mock.patch.object(FileHandler, 'data', new_callable=mock.PropertyMock, side_effect=AssertionError):
+            resp = client.get(self.url.format('file'))
+            assert resp.status_code == 200
+            assert resp.headers['Content-Length'] == str(len(DATA))
+            assert resp.headers['Content-Type'] == 'application/x-netcdf'
+            assert resp.headers['Content-Disposition'] == 'attachment; filename="file.nc"'
+            # the working directory is kept until the file is sent
+            assert self.workdir_content()
+            assert resp.get_data() == DATA
+            resp.close()
+        assert self.workdir_content() == []
+
+    def test_async(self):
+        # the process running an asynchronous execution, e.g. a queued one, does not send the output
+        done = []
+
+        def run_async(process, wps_request, wps_response):
+            process._run_process(wps_request, wps_response)
+            janitor.join()
+            done.append((wps_response.status, os.path.exists(process._workdir)))
+
+        wps_request = WPSRequest(Request(EnvironBuilder(self.url.format('file')).get_environ()))
+        wps_request.store_execute = wps_request.status = 'true'
+        with mock.patch.object(Process, '_run_async', run_async):
+            self.service.execute('raw', wps_request, uuid.uuid1())
+        assert done == [(WPS_STATUS.SUCCEEDED, False)]
+
+    def test_preprocess_response(self):
+        def preprocess_response(outputs, request, http_request):
+            outputs['literal'].data = 'changed'
+            return outputs
+
+        service = Service(processes=[self.service.processes['raw']],
+                          preprocessors={'alias': ('raw', None, preprocess_response)})
+        resp = client_for(service).post_json(doc={'identifier': 'alias', 'outputs': 'literal'})
+        assert resp.status_code == 200
+        assert resp.get_data() == b'changed'
+
+    def test_file_wrapper(self):
+        environ = EnvironBuilder(self.url.format('file')).get_environ()
+        environ['wsgi.file_wrapper'] = FileWrapper
+        start_response = mock.Mock()
+        app_iter = self.service(environ, start_response)
+        assert isinstance(app_iter, FileWrapper)
+        assert ('Content-Length', str(len(DATA))) in start_response.call_args[0][1]
+        assert b''.join(app_iter) == DATA
+        app_iter.close()
+        assert self.workdir_content() == []
+
+    def test_range(self):
+        client = client_for(self.service)
+        resp = client.get(self.url.format('file'), headers={'Range': 'bytes=10-19'})
+        assert resp.status_code == 206
+        assert resp.headers['Content-Range'] == 'bytes 10-19/{}'.format(len(DATA))
+        assert resp.headers['Content-Length'] == '10'
+        assert resp.get_data() == DATA[10:20]
+        resp.close()
+        assert self.workdir_content() == []
+
+        resp = client.get(self.url.format('file'), headers={'Range': 'bytes=-5'})
+        assert resp.status_code == 206
+        assert resp.get_data() == DATA[-5:]
+
+    def test_multiple_ranges(self):
+        client = client_for(self.service)
+        resp = client.get(self.url.format('file'), headers={'Range': 'bytes=0-9,100-109,13990-20000'})
+        assert resp.status_code == 206
+        content_type, boundary = resp.headers['Content-Type'].split('; boundary=')
+        assert content_type == 'multipart/byteranges'
+        expected = b''.join(
+            '--{}\r\nContent-Type: application/x-netcdf\r\nContent-Range: bytes {}-{}/{}\r\n\r\n'.format(
+                boundary, start, stop - 1, len(DATA)).encode() + DATA[start:stop] + b'\r\n'
+            for start, stop in ((0, 10), (100, 110), (13990, 14000))) + '--{}--\r\n'.format(boundary).encode()
+        body = resp.get_data()
+        assert body == expected
+        assert resp.headers['Content-Length'] == str(len(body))
+        resp.close()
+        assert self.workdir_content() == []
+
+    def test_unsatisfiable(self):
+        client = client_for(self.service)
+        for byte_range in ('bytes=20000-', 'bytes=20000-20010,30000-'):
+            resp = client.get(self.url.format('file'), headers={'Range': byte_range})
+            assert resp.status_code == 416
+            assert resp.headers['Content-Range'] == 'bytes */{}'.format(len(DATA))
+            resp.close()
+        assert self.workdir_content() == []
+
+    def test_if_range(self):
+        client = client_for(self.service)
+        etag = client.get(self.stable_url).headers['ETag']
+        resp = client.get(self.stable_url, headers={'Range': 'bytes=100-', 'If-Range': etag})
+        assert resp.status_code == 206
+        assert resp.get_data() == DATA[100:]
+        resp = client.get(self.stable_url, headers={'Range': 'bytes=0-9,100-', 'If-Range': etag})
+        assert resp.status_code == 206
+        # the file changed since the first part was downloaded, it is sent again
+        for byte_range in ('bytes=100-', 'bytes=0-9,100-'):
+            resp = client.get(self.stable_url, headers={'Range': byte_range, 'If-Range': '"other"'})
+            assert resp.status_code == 200
+            assert resp.get_data() == DATA
+
+    def test_if_none_match(self):
+        client = client_for(self.service)
+        etag = client.get(self.stable_url).headers['ETag']
+        resp = client.get(self.stable_url, headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.get_data() == b''
+        for byte_range in ('bytes=100-', 'bytes=0-9,100-'):
+            resp = client.get(self.stable_url, headers={'Range': byte_range, 'If-None-Match': etag})
+            assert resp.status_code == 304
+            assert resp.headers['ETag'] == etag
+            assert resp.get_data() == b''
+        # the outputs of each execution are new files
+        etag = client.get(self.url.format('file')).headers['ETag']
+        assert client.get(self.url.format('file'), headers={'If-None-Match': etag}).status_code == 200
+
+    def test_literal(self):
+        client = client_for(self.service)
+        resp = client.get(self.url.format('literal'))
+        assert resp.status_code == 200
+        assert resp.get_data() == b'text'
+        assert self.workdir_content() == []
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(RawOutputTest),
+    ]
+    return unittest.TestSuite(suite_list)
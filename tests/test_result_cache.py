@@ -0,0 +1,190 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+import threading
+import time
+from unittest import mock
+
+import requests
+from basic import TestBase
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from pywps import (
+    FORMATS,
+    ComplexInput,
+    LiteralInput,
+    LiteralOutput,
+    Process,
+    Service,
+    configuration,
+    dblog,
+    result_cache,
+)
+from pywps.app.WPSRequest import WPSRequest
+from pywps.tests import assert_response_success, client_for
+
+
+class ResultCacheTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = 0
+        result_cache._validators.clear()
+
+    def create_client(self, **kwargs):
+        def handler(request, response):
+            self.calls += 1
+            response.outputs['output'].data = 'Hello {} ({})'.format(request.inputs['name'][0].data, self.calls)
+            return response
+
+        kwargs.setdefault('cacheable', True)
+        process = Process(handler, 'hello', 'Hello',
+                          inputs=[LiteralInput('name', 'Name', data_type='string')],
+                          outputs=[LiteralOutput('output', 'Output', data_type='string')], **kwargs)
+        return client_for(Service(processes=[process]))
+
+    def execute(self, client, name='World', query=''):
+        resp = client.get('?service=WPS&request=Execute&version=1.0.0&identifier=hello'
+                          '&datainputs=name={}{}'.format(name, query))
+        assert resp.status_code == 200
+        return resp
+
+    def output(self, resp):
+        assert_response_success(resp)
+        return resp.xpath_text('//wps:ProcessOutputs/wps:Output/wps:Data/wps:LiteralData')
+
+    def cached_keys(self):
+        session = dblog.get_session()
+        try:
+            return [entry.key for entry in session.query(dblog.CachedResult)]
+        finally:
+            session.close()
+
+    def test_hit(self):
+        client = self.create_client()
+        first = self.execute(client)
+        second = self.execute(client)
+        assert self.output(first) == self.output(second) == 'Hello World (1)'
+        assert self.calls == 1
+        assert second.headers['Content-Type'] == first.headers['Content-Type']
+
+    def test_inputs(self):
+        client = self.create_client()
+        assert self.output(self.execute(client, 'World')) == 'Hello World (1)'
+        assert self.output(self.execute(client, 'Moon')) == 'Hello Moon (2)'
+        assert self.output(self.execute(client, 'World')) == 'Hello World (1)'
+        assert self.calls == 2
+
+    def test_not_cacheable(self):
+        client = self.create_client(cacheable=False)
+        self.execute(client)
+        self.execute(client)
+        assert self.calls == 2
+        assert self.cached_keys() == []
+
+    def test_disabled(self):
+        configuration.CONFIG.set('server', 'result_cache_size', '0')
+        client = self.create_client()
+        self.execute(client)
+        self.execute(client)
+        assert self.calls == 2
+
+    def test_ttl(self):
+        client = self.create_client(cache_ttl=0)
+        self.execute(client)
+        time.sleep(0.01)
+        assert self.output(self.execute(client)) == 'Hello World (2)'
+
+    def test_raw(self):
+        client = self.create_client()
+        for _ in range(2):
+            resp = self.execute(client, query='&rawdataoutput=output')
+            assert resp.data.startswith(b'Hello World')
+        assert self.calls == 2
+        assert self.cached_keys() == []
+
+    def test_evict(self):
+        client = self.create_client()
+        size = len(self.execute(client, 'a').data)
+        # room for two documents
+        configuration.CONFIG.set('server', 'result_cache_size', str((size * 2 + 100) / 1024 / 1024))
+        self.execute(client, 'b')
+        self.execute(client, 'a')
+        self.execute(client, 'c')
+        assert len(self.cached_keys()) == 2
+        assert self.calls == 3
+        # 'b' is the least recently used
+        assert self.output(self.execute(client, 'a')) == 'Hello a (1)'
+        assert self.output(self.execute(client, 'c')) == 'Hello c (3)'
+        assert self.output(self.execute(client, 'b')) == 'Hello b (4)'
+        cached = [name for name in os.listdir(self.tmpdir.name + '/outputpath') if name.startswith('cache_')]
+        assert len(cached) == 2
+
+    def test_reference_validators(self):
+        url = 'http://example.org/data.csv'
+        with mock.patch('pywps.result_cache.requests.head') as head:
+            head.return_value = mock.Mock(ok=True, headers={'ETag': '"v1"'})
+            assert result_cache._get_validator(url) == ['ETag', '"v1"', None]
+            assert result_cache._get_validator(url) == ['ETag', '"v1"', None]
+            assert head.call_count == 1
+            assert head.call_args[1]['timeout'] == result_cache.HEAD_TIMEOUT
+
+            # an unreachable server is not asked again either
+            head.side_effect = requests.ConnectionError()
+            assert result_cache._get_validator(url + '?other') is None
+            assert result_cache._get_validator(url + '?other') is None
+            assert head.call_count == 2
+
+            configuration.CONFIG.set('server', 'result_cache_reference_ttl', '0')
+            assert result_cache._get_validator(url + '?again') is None
+            assert result_cache._get_validator(url + '?again') is None
+            assert head.call_count == 4
+
+    def test_concurrent_validators(self):
+        # each HEAD request waits for the others
+        barrier = threading.Barrier(3, timeout=5)
+
+        def head_validator(url):
+            barrier.wait()
+            return ['ETag', url, None]
+
+        process = Process(lambda request, response: response, 'references', 'References',
+                          inputs=[ComplexInput('ref', 'Reference', supported_formats=[FORMATS.TEXT], max_occurs=3)])
+        wps_request = WPSRequest()
+        wps_request.http_request = Request(EnvironBuilder().get_environ())
+        wps_request.raw, wps_request.store_execute = False, 'false'
+        wps_request.inputs = {'ref': []}
+        for i in range(3):
+            inpt = process.inputs[0].clone()
+            inpt.url = 'http://example.org/{}.txt'.format(i)
+            wps_request.inputs['ref'].append(inpt)
+        with mock.patch('pywps.result_cache._head_validator', side_effect=head_validator) as head:
+            key = result_cache.request_key(process, wps_request)
+        assert head.call_count == 3
+        wps_request.inputs['ref'][0].url = 'http://example.org/other.txt'
+        with mock.patch('pywps.result_cache._head_validator', return_value=['ETag', '"v1"', None]):
+            assert result_cache.request_key(process, wps_request) != key
+
+    def test_missing_document(self):
+        client = self.create_client()
+        self.execute(client)
+        for name in os.listdir(self.tmpdir.name + '/outputpath'):
+            if name.startswith('cache_'):
+                os.remove(os.path.join(self.tmpdir.name, 'outputpath', name))
+        assert self.output(self.execute(client)) == 'Hello World (2)'
+        assert self.output(self.execute(client)) == 'Hello World (2)'
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(ResultCacheTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,142 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import array
+import datetime
+import decimal
+import json
+import unittest
+
+from basic import TestBase
+
+from pywps import FORMATS, ComplexOutput, Process, Service, configuration, serializer
+from pywps.serializer import SERIALIZERS, JSONSerializer
+from pywps.tests import client_for
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DOC = {
+    'array': array.array('d', [1.5, 2.5]),
+    'date': datetime.date(2020, 1, 2),
+    'datetime': datetime.datetime(2020, 1, 2, 3, 4, 5),
+    'time': datetime.time(3, 4, 5),
+    'decimal': decimal.Decimal('1.25'),
+    'text': 'Grüße',
+    1: 'one',
+}
+
+EXPECTED = {
+    'array': [1.5, 2.5],
+    'date': '2020-01-02',
+    'datetime': '2020-01-02T03:04:05',
+    'time': '03:04:05',
+    'decimal': 1.25,
+    'text': 'Grüße',
+    '1': 'one',
+}
+
+
+class UpperSerializer(JSONSerializer):
+    name = 'upper'
+
+    def dumps(self, obj, indent=None, sort_keys=False, allow_nan=True):
+        return super().dumps(obj, indent, sort_keys, allow_nan).upper()
+
+
+class SerializerTest(TestBase):
+
+    def dumps(self, obj, **kwargs):
+        """Documents of all the serializers, checked to be equivalent."""
+        docs = {name: serializer.dumps(obj, **kwargs) for name, serializer in SERIALIZERS.items()}
+        values = [json.loads(doc) for doc in docs.values()]
+        assert all(value == values[0] for value in values)
+        return docs
+
+    def test_types(self):
+        for doc in self.dumps(DOC).values():
+            assert json.loads(doc) == EXPECTED
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_numpy(self):
+        obj = {
+            'matrix': numpy.arange(6, dtype='float64').reshape(2, 3),
+            'ints': numpy.arange(3, dtype='int32'),
+            # not contiguous
+            'column': numpy.arange(6).reshape(2, 3)[:, 1],
+            'scalars': [numpy.float32(0.5), numpy.int64(3), numpy.bool_(True)],
+        }
+        for doc in self.dumps(obj).values():
+            assert json.loads(doc) == {
+                'matrix': [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]],
+                'ints': [0, 1, 2],
+                'column': [1, 4],
+                'scalars': [0.5, 3, True],
+            }
+
+    def test_indent(self):
+        for name, doc in self.dumps({'b': [1], 'a': 2}, indent=2, sort_keys=True).items():
+            assert doc == '{\n  "a": 2,\n  "b": [\n    1\n  ]\n}', name
+        for name, doc in self.dumps({'a': 1}, indent=4).items():
+            assert doc == '{\n    "a": 1\n}', name
+
+    def test_nan(self):
+        for name, serializer_ in SERIALIZERS.items():
+            with self.assertRaises(ValueError):
+                serializer_.dumps({'a': float('nan')}, allow_nan=False)
+            assert json.loads(serializer_.dumps([float('inf')]))[0] in (None, float('inf')), name
+
+    def test_large_integer(self):
+        for doc in self.dumps({'a': 2 ** 70}).values():
+            assert json.loads(doc) == {'a': 2 ** 70}
+
+    def test_unknown_type(self):
+        for serializer_ in SERIALIZERS.values():
+            with self.assertRaises(TypeError):
+                serializer_.dumps({'a': object()})
+
+    def test_config(self):
+        configuration.CONFIG.set('server', 'json_serializer', 'json')
+        assert serializer.get_serializer() is SERIALIZERS['json']
+        configuration.CONFIG.set('server', 'json_serializer', 'auto')
+        assert serializer.get_serializer() is next(iter(SERIALIZERS.values()))
+        configuration.CONFIG.set('server', 'json_serializer', 'unknown')
+        assert serializer.get_serializer() is SERIALIZERS['json']
+
+    def test_register(self):
+        serializer.register_serializer(UpperSerializer())
+        try:
+            configuration.CONFIG.set('server', 'json_serializer', 'upper')
+            assert serializer.dumps({'a': 'b'}) == '{"A": "B"}'
+        finally:
+            del SERIALIZERS['upper']
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_raw_output(self):
+        def handler(request, response):
+            response.outputs['array'].data = numpy.arange(4).reshape(2, 2)
+            return response
+
+        process = Process(handler, 'array', 'Array',
+                          outputs=[ComplexOutput('array', 'Array', supported_formats=[FORMATS.JSON])])
+        client = client_for(Service(processes=[process]))
+        for name in SERIALIZERS:
+            configuration.CONFIG.set('server', 'json_serializer', name)
+            resp = client.get('?service=wps&version=1.0.0&request=execute&identifier=array&rawdataoutput=array')
+            assert resp.status_code == 200
+            assert json.loads(resp.data) == [[0, 1], [2, 3]]
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(SerializerTest),
+    ]
+    return unittest.TestSuite(suite_list)
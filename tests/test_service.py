@@ -1,8 +1,17 @@
+import asyncio
+import threading
+from unittest import mock
+
+import lxml.etree
 from basic import TestBase
 
+from pywps import LiteralInput, LiteralOutput, configuration, get_ElementMakerForVersion, namespaces100
+from pywps.app import Process, Service
 from pywps.app.Service import _validate_file_input
 from pywps.exceptions import FileURLNotSupported
 
+WPS, OWS = get_ElementMakerForVersion("1.0.0")
+
 
 class ServiceTest(TestBase):
 
@@ -15,6 +24,153 @@ class ServiceTest(TestBase):
             self.assertTrue(False, 'should raise exception FileURLNotSupported')
 
 
+def asgi_request(app, method='GET', query_string=b'', body=b'', headers=(), chunk_size=None, received=None):
+    """Drive the ASGI `app` for a single request and return status, headers and body.
+
+    :param received: list the received request chunks are appended to
+    """
+    chunk_size = chunk_size or max(len(body), 1)
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if received is not None:
+            received.append(messages[0]['body'])
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': '/wps',
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+        'server': ('localhost', 5000),
+        'client': ('127.0.0.1', 12345),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    assert start['type'] == 'http.response.start'
+    assert not sent[-1].get('more_body')
+    body = b''.join(message['body'] for message in sent[1:])
+    return start['status'], {k.decode(): v.decode() for k, v in start['headers']}, body
+
+
+class AsgiTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+
+        def greet(request, response):
+            response.outputs['message'].data = 'Hello {}'.format(request.inputs['name'][0].data)
+            return response
+        self.service = Service(processes=[
+            Process(greet, 'greet', 'Greet', inputs=[LiteralInput('name', 'Name')],
+                    outputs=[LiteralOutput('message', 'Message')])
+        ])
+
+    def test_get_capabilities(self):
+        status, headers, body = asgi_request(self.service.asgi,
+                                             query_string=b'service=WPS&request=GetCapabilities')
+        assert status == 200
+        assert headers['content-type'] == 'text/xml'
+        doc = lxml.etree.fromstring(body)
+        assert doc.xpath('//ows:Identifier/text()', namespaces=namespaces100) == ['greet']
+
+    def test_not_modified(self):
+        query = b'service=WPS&request=DescribeProcess&identifier=greet&version=1.0.0'
+        status, headers, _ = asgi_request(self.service.asgi, query_string=query)
+        assert status == 200
+        status, _, body = asgi_request(self.service.asgi, query_string=query,
+                                       headers=[('If-None-Match', headers['etag'])])
+        assert status == 304
+        assert body == b''
+
+    def test_cached_on_event_loop(self):
+        queries = [b'service=WPS&request=GetCapabilities', b'service=WPS&request=DescribeProcess&identifier=greet',
+                   b'service=WPS&request=DescribeProcess&identifier=all&version=1.0.0']
+        first = [asgi_request(self.service.asgi, query_string=query) for query in queries]
+
+        logged = []
+
+        def log_request(uuid, wps_request):
+            logged.append((wps_request.operation, threading.current_thread()))
+
+        with mock.patch.object(Service, '_asgi_response', side_effect=AssertionError('not on the event loop')), \
+                mock.patch('pywps.app.Service.log_request', log_request):
+            for query, expected in zip(queries, first):
+                assert asgi_request(self.service.asgi, query_string=query) == expected
+            status, _, _ = asgi_request(self.service.asgi, query_string=queries[0],
+                                        headers=[('If-None-Match', first[0][1]['etag'])])
+            assert status == 304
+        assert [operation for operation, _ in logged] == ['getcapabilities', 'describeprocess', 'describeprocess']
+        # the database is used in the executor
+        assert all(thread is not threading.main_thread() for _, thread in logged)
+
+    def test_not_cached(self):
+        asgi_request(self.service.asgi, query_string=b'service=WPS&request=GetCapabilities')
+        with mock.patch.object(Service, '_asgi_response', wraps=self.service._asgi_response) as response:
+            status, _, _ = asgi_request(self.service.asgi,
+                                        query_string=b'service=WPS&request=DescribeProcess&identifier=greet')
+            assert status == 200
+            status, _, body = asgi_request(self.service.asgi,
+                                           query_string=b'service=WPS&request=DescribeProcess&identifier=foo')
+            assert status == 400
+        # the description is rendered, and the error reported, by call
+        assert response.call_count == 2
+
+    def test_post_execute(self):
+        request_doc = WPS.Execute(
+            OWS.Identifier('greet'),
+            WPS.DataInputs(WPS.Input(OWS.Identifier('name'), WPS.Data(WPS.LiteralData('ASGI')))),
+            version='1.0.0'
+        )
+        body = lxml.etree.tostring(request_doc)
+        status, _, body = asgi_request(self.service.asgi, method='POST', body=body, chunk_size=64,
+                                       headers=[('Content-Type', 'text/xml')])
+        assert status == 200
+        doc = lxml.etree.fromstring(body)
+        assert doc.xpath('//wps:LiteralData/text()', namespaces=namespaces100) == ['Hello ASGI']
+
+    def test_request_too_large(self):
+        configuration.CONFIG.set('server', 'maxrequestsize', '10kb')
+        body = b'<a>' + b' ' * 1024 * 1024 + b'</a>'
+        for headers in ([('Content-Type', 'text/xml')],
+                        [('Content-Type', 'text/xml'), ('Content-Length', str(len(body)))]):
+            received = []
+            status, _, response = asgi_request(self.service.asgi, method='POST', body=body, chunk_size=1024,
+                                               headers=headers, received=received)
+            assert status == 400
+            assert b'FileSizeExceeded' in response
+            # the rest of the body is not received
+            assert len(received) < 20
+
+    def test_bad_request(self):
+        status, _, body = asgi_request(self.service.asgi, query_string=b'service=WPS&request=Foo')
+        assert status == 400
+        assert b'ExceptionReport' in body
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.service.asgi({'type': 'lifespan'}, receive, send))
+        assert sent == [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}]
+
+
 def load_tests(loader=None, tests=None, pattern=None):
     import unittest
 
@@ -22,5 +178,6 @@ def load_tests(loader=None, tests=None, pattern=None):
         loader = unittest.TestLoader()
     suite_list = [
         loader.loadTestsFromTestCase(ServiceTest),
+        loader.loadTestsFromTestCase(AsgiTest),
     ]
     return unittest.TestSuite(suite_list)
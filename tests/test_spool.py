@@ -0,0 +1,292 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import base64
+import io
+import json
+import os
+from io import BytesIO
+from unittest import mock
+
+from basic import TestBase
+from lxml.builder import ElementMaker
+
+from pywps import (
+    FORMATS,
+    ComplexInput,
+    LiteralOutput,
+    Process,
+    Service,
+    configuration,
+    get_ElementMakerForVersion,
+    janitor,
+)
+from pywps import xml_util as etree
+from pywps.app.WPSRequest import _iterparse, get_inputs_from_xml
+from pywps.inout import spool as spool_module
+from pywps.inout.spool import INPUT_VALUES, Base64Decoder, Spool, SpooledFile, decode_base64, load_json
+from pywps.tests import assert_response_success, assert_response_success_json, client_for
+
+WPS, OWS = get_ElementMakerForVersion("1.0.0")
+GML = ElementMaker(namespace='http://www.opengis.net/gml', nsmap={'gml': 'http://www.opengis.net/gml'})
+
+
+def feature_collection(count):
+    return GML.FeatureCollection(
+        *[GML.featureMember(GML.Point(GML.pos('{} {}'.format(i, i)))) for i in range(count)],
+        fid='collection')
+
+
+def execute_request(*complex_datas):
+    return WPS.Execute(
+        OWS.Identifier('spool'),
+        WPS.DataInputs(*[
+            WPS.Input(OWS.Identifier('data'), WPS.Data(complex_data))
+            for complex_data in complex_datas]),
+        version='1.0.0', service='WPS')
+
+
+class SpoolTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.workdir = configuration.get_config_value('server', 'workdir')
+
+    def tearDown(self):
+        janitor.join()
+        super().tearDown()
+
+    def parse(self, doc, size=1024):
+        spool = Spool(size)
+        root, spooled = _iterparse(BytesIO(etree.tostring(doc)), spool)
+        return spool, get_inputs_from_xml(root, spooled)['data']
+
+    def test_embedded_xml(self):
+        spool, [small, large] = self.parse(execute_request(
+            WPS.ComplexData(feature_collection(1), mimeType='application/gml+xml'),
+            WPS.ComplexData(feature_collection(500), mimeType='application/gml+xml')))
+        assert not isinstance(small['data'], SpooledFile)
+        assert isinstance(large['data'], SpooledFile)
+        assert large['mimeType'] == 'application/gml+xml'
+        assert os.path.dirname(large['data']) == spool.workdir
+        assert os.path.dirname(spool.workdir) == os.path.abspath(self.workdir)
+
+        with open(large['data'], 'rb') as f:
+            collection = etree.fromstring(f.read())
+        assert collection.tag == '{http://www.opengis.net/gml}FeatureCollection'
+        assert collection.attrib['fid'] == 'collection'
+        assert len(collection) == 500
+        assert collection[499][0][0].text == '499 499'
+
+    def test_raw_value(self):
+        text = 'x' * 2000
+        spool, [small, large, encoded] = self.parse(execute_request(
+            WPS.ComplexData('small'),
+            WPS.ComplexData(text),
+            WPS.ComplexData(base64.b64encode(text.encode()).decode(), encoding='base64')))
+        assert small['data'] == 'small'
+        with open(large['data']) as f:
+            assert f.read() == text
+        with open(encoded['data']) as f:
+            assert f.read() == text
+
+    def test_base64(self):
+        # decoded chunk by chunk, text nodes larger than 10 MB are accepted
+        data = os.urandom(8 * 1024 * 1024)
+        spool, [encoded, invalid] = self.parse(execute_request(
+            WPS.ComplexData(base64.encodebytes(data).decode(), encoding='base64'),
+            WPS.ComplexData('not base64 ' * 201, encoding='base64')))
+        with open(encoded['data'], 'rb') as f:
+            assert f.read() == data
+        # incorrect padding, kept as it is like inputs which are not spooled
+        with open(invalid['data']) as f:
+            assert f.read() == 'not base64 ' * 201
+
+    def test_limits(self):
+        # the libxml2 limits on the tree are kept
+        deep = GML.pos('0 0')
+        for _ in range(300):
+            deep = GML.featureMember(deep)
+        with self.assertRaises(ValueError):
+            self.parse(execute_request(WPS.ComplexData(deep)))
+        text = 'x' * (11 * 1024 * 1024)
+        spool, [large] = self.parse(execute_request(WPS.ComplexData(text)))
+        assert os.path.getsize(large['data']) == len(text)
+
+    def test_base64_decoder(self):
+        # same result as the decoding of the inputs which are not spooled
+        texts = [base64.encodebytes(b'spooled input ' * 10).decode(), 'not base64! ' * 10, 'QQ==QUJD',
+                 'QU=JD', 'QUJD=QUJD', '\u00e9QUJD', 'QUJ', 'Q===', '']
+        for text in texts:
+            try:
+                expected = base64.b64decode(text)
+            except ValueError:
+                expected = ValueError
+            for size in (1, 3, 4, 7):
+                target = io.BytesIO()
+                decoder = Base64Decoder(target)
+                try:
+                    for start in range(0, len(text), size):
+                        decoder.write(text[start:start + size])
+                    decoder.close()
+                except ValueError:
+                    assert expected is ValueError, text
+                else:
+                    assert target.getvalue() == expected, text
+
+    def test_nothing_spooled(self):
+        spool, [small] = self.parse(execute_request(WPS.ComplexData(feature_collection(2))))
+        assert spool.workdir is None
+        assert not isinstance(small['data'], SpooledFile)
+
+    def test_execute(self):
+        configuration.CONFIG.set('server', 'inline_spool_size', '1kb')
+
+        def handler(request, response):
+            inpt = request.inputs['data'][0]
+            assert inpt.prop == 'file'
+            assert os.path.dirname(inpt.file) == inpt.workdir
+            response.outputs['count'].data = len(etree.fromstring(inpt.stream.read()))
+            return response
+
+        process = Process(handler, 'spool', 'Spool',
+                          inputs=[ComplexInput('data', 'Data', supported_formats=[FORMATS.GML])],
+                          outputs=[LiteralOutput('count', 'Count', data_type='integer')])
+        client = client_for(Service(processes=[process]))
+        resp = client.post_xml(doc=execute_request(
+            WPS.ComplexData(feature_collection(500), mimeType=FORMATS.GML.mime_type)))
+        assert_response_success(resp)
+        assert resp.xpath_text('//wps:ProcessOutputs/wps:Output/wps:Data/wps:LiteralData') == '500'
+        janitor.join()
+        assert os.listdir(self.workdir) == []
+
+    def test_unknown_process(self):
+        configuration.CONFIG.set('server', 'inline_spool_size', '1kb')
+        client = client_for(Service(processes=[]))
+        resp = client.post_xml(doc=execute_request(WPS.ComplexData(feature_collection(500))))
+        assert resp.status_code == 400
+        janitor.join()
+        assert os.listdir(self.workdir) == []
+
+
+class JsonSpoolTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.workdir = configuration.get_config_value('server', 'workdir')
+        self.geojson = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'properties': {'name': 'f\u00e9 [{"' + str(i)},
+             'geometry': {'type': 'Point', 'coordinates': [i, -i]}} for i in range(100)]}
+
+    def tearDown(self):
+        janitor.join()
+        super().tearDown()
+
+    def test_decode(self):
+        doc = {'a': [1, 2.5e3, -1, True, False, None, 'x\u00e9\U0001f600\n"\\ /'], 'b': {}, 'c': [],
+               'data': {'k': [1, {'z': ']}"\\'}]}, 'd': {'data': 'data'}, 'e': ''}
+        body = json.dumps(doc).encode('utf-8')
+        # values split in any place by the chunks
+        for chunk_size in (1, 3, 7, 1024):
+            with mock.patch.object(spool_module, 'CHUNK_SIZE', chunk_size):
+                assert load_json(BytesIO(body), Spool(0)) == doc
+                assert load_json(BytesIO(body), Spool(1024)) == doc
+
+    def test_invalid(self):
+        for body in ('{"a": 1', '{"a" 1}', '[1,]', '"abc', '{"a": tru}', '[1] x', '{"a": "\\x"}', '', '[1 2]'):
+            with self.assertRaises(ValueError):
+                load_json(BytesIO(body.encode('utf-8')), Spool(0))
+
+    def test_spooled(self):
+        text = 'x\u00e9"' * 1000
+        spool = Spool(1024)
+        doc = load_json(BytesIO(json.dumps({'inputs': {
+            'text': {'data': text},
+            'geojson': {'data': self.geojson},
+            'small': {'data': {'a': 'b'}}}}).encode('utf-8')), spool)['inputs']
+        assert isinstance(doc['text']['data'], SpooledFile)
+        with open(doc['text']['data'], encoding='utf-8') as f:
+            assert f.read() == text
+        assert isinstance(doc['geojson']['data'], SpooledFile)
+        with open(doc['geojson']['data']) as f:
+            assert json.load(f) == self.geojson
+        assert doc['small']['data'] == {'a': 'b'}
+        assert os.path.dirname(doc['text']['data']) == spool.workdir
+
+    def test_spooled_paths(self):
+        text = 'x' * 2000
+        nested = {'data': text}
+        body = json.dumps({
+            'data': text,
+            'outputs': {'out': nested},
+            'inputs': {'single': {'data': text}, 'multiple': [{'data': text}, {'data': nested}]},
+            'batch': [{'set': {'data': text}}, {'set': [{'data': text}]}],
+        }).encode('utf-8')
+        doc = load_json(BytesIO(body), Spool(1024))
+        # only the values of the inputs
+        assert doc['data'] == text
+        assert doc['outputs']['out'] == nested
+        spooled = [doc['inputs']['single']['data'], doc['inputs']['multiple'][0]['data'],
+                   doc['inputs']['multiple'][1]['data'], doc['batch'][0]['set']['data'],
+                   doc['batch'][1]['set'][0]['data']]
+        assert all(isinstance(value, SpooledFile) for value in spooled)
+        # a data member inside a value is part of the value
+        with open(doc['inputs']['multiple'][1]['data']) as f:
+            assert json.load(f) == nested
+
+        doc = load_json(BytesIO(json.dumps({'single': {'data': text, 'uom': nested}}).encode('utf-8')),
+                        Spool(1024), INPUT_VALUES)
+        assert isinstance(doc['single']['data'], SpooledFile)
+        assert doc['single']['uom'] == nested
+
+    def test_decode_base64(self):
+        path = os.path.join(self.tmpdir.name, 'encoded')
+        data = os.urandom(1000)
+        with open(path, 'wb') as f:
+            f.write(base64.encodebytes(data))
+        with mock.patch.object(spool_module, 'CHUNK_SIZE', 10):
+            decoded = decode_base64(path)
+        with open(decoded, 'rb') as f:
+            assert f.read() == data
+        assert not os.path.exists(path)
+
+    def test_execute(self):
+        configuration.CONFIG.set('server', 'inline_spool_size', '1kb')
+
+        def handler(request, response):
+            geojson, encoded = request.inputs['geojson'][0], request.inputs['encoded'][0]
+            assert geojson.prop == encoded.prop == 'file'
+            response.outputs['count'].data = len(json.loads(geojson.data)['features'])
+            response.outputs['size'].data = len(encoded.data)
+            return response
+
+        process = Process(handler, 'spool', 'Spool',
+                          inputs=[ComplexInput('geojson', 'GeoJSON', supported_formats=[FORMATS.GEOJSON]),
+                                  ComplexInput('encoded', 'Encoded', supported_formats=[FORMATS.TEXT])],
+                          outputs=[LiteralOutput('count', 'Count', data_type='integer'),
+                                   LiteralOutput('size', 'Size', data_type='integer')])
+        client = client_for(Service(processes=[process]))
+        resp = client.post_json(doc={
+            'identifier': 'spool',
+            'version': '1.0.0',
+            'inputs': {
+                'geojson': {'type': 'complex', 'data': self.geojson, 'mimeType': FORMATS.GEOJSON.mime_type},
+                'encoded': {'type': 'complex', 'data': base64.b64encode(b'x' * 2000).decode(),
+                            'encoding': 'base64'}}})
+        assert_response_success_json(resp, {'count': 100, 'size': 2000})
+        janitor.join()
+        assert os.listdir(self.workdir) == []
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(SpoolTest),
+        loader.loadTestsFromTestCase(JsonSpoolTest),
+    ]
+    return unittest.TestSuite(suite_list)
@@ -0,0 +1,186 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+import time
+from unittest import mock
+
+from basic import TestBase
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from pywps import LiteralInput, LiteralOutput, Process, Service, configuration, status_writer
+from pywps.app.WPSRequest import WPSRequest
+from pywps.response.execute import ExecuteResponse
+from pywps.response.status import WPS_STATUS
+from pywps.status_writer import StatusWriter
+from pywps.tests import assert_response_success, client_for
+
+
+class FakeResponse(object):
+    uuid = 'fake'
+
+    def __init__(self):
+        self._status_written = 0.0
+        self.state = None
+        self.written = []
+
+    def _write_status(self):
+        self._status_written = time.monotonic()
+        self.written.append((self.state, self._status_written))
+
+
+def progress(request, response):
+    for i in range(200):
+        response.update_status('Step {}'.format(i), i // 2)
+    response.outputs['message'].data = 'done'
+    return response
+
+
+def create_progress_process():
+    return Process(progress, 'progress', 'Progress',
+                   inputs=[LiteralInput('name', 'Name', data_type='string', min_occurs=0)],
+                   outputs=[LiteralOutput('message', 'Message', data_type='string')],
+                   store_supported=True, status_supported=True)
+
+
+class StatusWriterTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.writer = StatusWriter(idle_timeout=0.1)
+
+    def test_coalesce(self):
+        response = FakeResponse()
+        response._status_written = time.monotonic()
+        for i in range(100):
+            response.state = i
+            self.writer.submit(response, 60)
+        self.writer.join()
+        assert [state for state, _ in response.written] == [99]
+
+    def test_interval(self):
+        response = FakeResponse()
+        self.writer.submit(response, 0.2)
+        # the first update is written at once
+        for _ in range(100):
+            if response.written:
+                break
+            time.sleep(0.01)
+        response.state = 'second'
+        self.writer.submit(response, 0.2)
+        for _ in range(100):
+            if len(response.written) == 2:
+                break
+            time.sleep(0.01)
+        assert response.written[1][0] == 'second'
+        # the interval is counted from the previous write
+        assert response.written[1][1] - response.written[0][1] >= 0.2
+
+    def test_discard(self):
+        response = FakeResponse()
+        response._status_written = time.monotonic()
+        self.writer.submit(response, 60)
+        self.writer.discard(response)
+        self.writer.join()
+        assert response.written == []
+
+    def test_error(self):
+        response = FakeResponse()
+        response._write_status = mock.Mock(side_effect=IOError('disk full'))
+        self.writer.submit(response, 0)
+        self.writer.join()
+        other = FakeResponse()
+        self.writer.submit(other, 0)
+        self.writer.join()
+        assert len(other.written) == 1
+
+
+class ExecuteResponseStatusTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        configuration.CONFIG.set('server', 'status_update_interval', '60')
+
+    def tearDown(self):
+        status_writer.join()
+        super().tearDown()
+
+    def response(self, process):
+        wps_request = WPSRequest()
+        wps_request.http_request = Request(EnvironBuilder(headers={'Accept': 'text/xml'}).get_environ())
+        wps_request.language = 'en-US'
+        wps_request.version = '1.0.0'
+        process._set_uuid('status-uuid')
+        response = ExecuteResponse(wps_request, uuid='status-uuid', process=process)
+        response.store_status_file = True
+        return response
+
+    def read_status_file(self, process):
+        with open(os.path.join(configuration.get_config_value('server', 'outputpath'), process.status_filename)) as f:
+            return f.read()
+
+    def test_terminal_status(self):
+        process = create_progress_process()
+        response = self.response(process)
+        response._update_status(WPS_STATUS.STARTED, 'Started', 0)
+        response.update_status('Half way', 50)
+        response.update_status('Almost', 90)
+        # the progress is written at the earliest 60 seconds after the start
+        assert 'Half way' not in self.read_status_file(process)
+        response._update_status(WPS_STATUS.SUCCEEDED, 'Finished', 100, clean=False)
+        status_writer.join()
+        doc = self.read_status_file(process)
+        assert 'ProcessSucceeded' in doc and 'Almost' not in doc
+
+    def test_write_after_terminal_status(self):
+        process = create_progress_process()
+        response = self.response(process)
+        response._update_status(WPS_STATUS.STARTED, 'Started', 0)
+        response.update_status('Almost', 90)
+        response._update_status(WPS_STATUS.SUCCEEDED, 'Finished', 100, clean=False)
+        # a write the writer took before the final status
+        with mock.patch('pywps.response.execute.store_status') as store_status, \
+                mock.patch.object(response, '_construct_doc') as construct_doc:
+            response._write_status()
+        assert not store_status.called and not construct_doc.called
+        assert 'ProcessSucceeded' in self.read_status_file(process)
+
+    def test_progress_written(self):
+        process = create_progress_process()
+        response = self.response(process)
+        response._update_status(WPS_STATUS.STARTED, 'Started', 0)
+        response.update_status('Half way', 50)
+        # join() writes the pending updates at once
+        status_writer.join()
+        assert 'percentCompleted="50">Half way' in self.read_status_file(process)
+
+    def test_execute(self):
+        client = client_for(Service(processes=[create_progress_process()]))
+        with mock.patch('pywps.response.execute.store_status') as store_status:
+            resp = client.get('?service=wps&version=1.0.0&request=execute&identifier=progress')
+            status_writer.join()
+        assert_response_success(resp)
+        assert store_status.call_count <= 2
+
+    def test_synchronous(self):
+        configuration.CONFIG.set('server', 'status_update_interval', '0')
+        client = client_for(Service(processes=[create_progress_process()]))
+        with mock.patch('pywps.response.basic.store_status') as store_status:
+            resp = client.get('?service=wps&version=1.0.0&request=execute&identifier=progress')
+        assert_response_success(resp)
+        assert store_status.call_count > 200
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(StatusWriterTest),
+        loader.loadTestsFromTestCase(ExecuteResponseStatusTest),
+    ]
+    return unittest.TestSuite(suite_list)
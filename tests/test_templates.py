@@ -0,0 +1,49 @@
+##################################################################
+# Copyright 2018 Open Source Geospatial Foundation and others    #
+# licensed under MIT, Please consult LICENSE.txt for details     #
+##################################################################
+
+import os
+from unittest import mock
+
+from basic import TestBase
+
+import pywps.response
+from pywps import Service, configuration
+from pywps.app.WPSRequest import WPSRequest
+from pywps.response.capabilities import CapabilitiesResponse
+from pywps.response.describe import DescribeResponse
+
+
+class TemplateEnvTest(TestBase):
+
+    def test_shared(self):
+        request = WPSRequest()
+        capabilities = CapabilitiesResponse(request, 'uuid', '1.0.0', processes={})
+        describe = DescribeResponse(request, 'uuid', processes={})
+        assert capabilities.template_env is describe.template_env is pywps.response.get_template_env()
+
+    def test_bytecode_cache(self):
+        path = os.path.join(self.tmpdir.name, 'templates')
+        configuration.CONFIG.set('server', 'template_cache_path', path)
+        shared = pywps.response.get_template_env()
+        with mock.patch('pywps.response._template_env', None):
+            # the templates are compiled when the service is created
+            Service()
+            template_env = pywps.response.get_template_env()
+        assert template_env is not shared
+        names = template_env.list_templates(extensions=['xml'])
+        assert '1.0.0/execute/main.xml' in names
+        # one bytecode file per template
+        assert len(os.listdir(path)) == len(names)
+
+
+def load_tests(loader=None, tests=None, pattern=None):
+    import unittest
+
+    if not loader:
+        loader = unittest.TestLoader()
+    suite_list = [
+        loader.loadTestsFromTestCase(TemplateEnvTest),
+    ]
+    return unittest.TestSuite(suite_list)
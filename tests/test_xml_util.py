@@ -1,6 +1,7 @@
 from basic import TestBase
 
 from pywps import xml_util as etree
+from pywps.app.basic import _compile_xpath, get_xpath_ns
 
 from io import StringIO
 
@@ -52,3 +53,15 @@ def test_etree_parse():
     # don't replace entities
     # https://lxml.de/parsing.html
     assert b"<wps:LiteralData>&xxe;</wps:LiteralData>" in xml
+
+
+def test_xpath_ns_compiled_once():
+    doc = etree.fromstring(XML_EXECUTE)
+    xpath_ns = get_xpath_ns('1.0.0')
+    [identifier] = xpath_ns(doc, './ows:Identifier')
+    assert identifier.text == 'test_process'
+    assert xpath_ns(doc, './wps:DataInputs/wps:Input/ows:Identifier')[0].text == 'name'
+    hits = _compile_xpath.cache_info().hits
+    assert xpath_ns(doc, './ows:Identifier') == [identifier]
+    assert _compile_xpath.cache_info().hits == hits + 1
+    assert get_xpath_ns('1.0.0') is xpath_ns